@@ -0,0 +1,349 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# AI接口准入控制：章节生成、标书生成、偏离表生成开销大，单个公司的突发请求不应拖慢其他公司
+# 第一层：按公司的令牌桶限速，桶空时直接返回429并给出 Retry-After（需要等待多久才能攒够令牌）
+# 第二层：进程内加权公平排队，全局并发槽位有限，等待中的请求按虚拟开始时间（SFQ）分配槽位，
+#         同一公司连续提交的请求虚拟时间递增，不会插到其他公司前面；权重越大分得的槽位越多
+# 公司排队数超过上限或排队超时同样返回429
+# 令牌桶可切换为Redis（RATE_LIMIT_URL=redis://...），多worker共享同一额度；并发槽位与排队按worker计，
+# 推理服务本身的并发上限由 LLMClient 控制
+# 共享后端不可用时放行请求（只记录错误数），限流故障不应导致AI功能整体不可用
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    # 格式：公司ID:权重,公司ID:权重
+    weights: Dict[str, float] = {}
+    for part in (value or "").split(","):
+        company_id, _, weight = part.strip().rpartition(":")
+        if company_id and weight:
+            weights[company_id] = float(weight)
+    return weights
+
+
+class TokenBuckets:
+    name = "base"
+
+    def __init__(self, rate_per_second: float, burst: float):
+        self.rate = rate_per_second
+        self.burst = burst
+        self._errors = 0
+
+    async def take(self, company_id: str, cost: float, weight: float = 1.0) -> float:
+        # 返回0表示已扣除令牌；否则返回需要等待的秒数（不扣除）
+        # 权重同时放大速率与桶容量；单次消耗不超过桶容量，否则永远无法放行
+        rate = self.rate * weight
+        burst = self.burst * weight
+        try:
+            return await self._take(company_id, min(cost, burst), rate, burst)
+        except Exception:
+            self._errors += 1
+            logger.warning("限流后端不可用，放行请求", exc_info=True)
+            return 0.0
+
+    async def _take(self, company_id: str, cost: float, rate: float, burst: float) -> float:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "rate_per_second": self.rate, "burst": self.burst, "errors": self._errors}
+
+
+class InMemoryTokenBuckets(TokenBuckets):
+    name = "memory"
+
+    def __init__(self, rate_per_second: float, burst: float):
+        super().__init__(rate_per_second, burst)
+        # 公司ID -> (剩余令牌, 更新时间)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def _take(self, company_id: str, cost: float, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(company_id, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            self._buckets[company_id] = (tokens - cost, now)
+            return 0.0
+        self._buckets[company_id] = (tokens, now)
+        return (cost - tokens) / rate if rate > 0 else float("inf")
+
+
+# 读取、补充、扣除在一个脚本内原子完成；时间取Redis服务器时间，避免各worker时钟偏差
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1])
+local updated = tonumber(state[2])
+if tokens == nil then
+    tokens = burst
+    updated = now
+end
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisTokenBuckets(TokenBuckets):
+    name = "redis"
+
+    def __init__(self, url: str, rate_per_second: float, burst: float, prefix: str = "medibid:ratelimit"):
+        import redis.asyncio as redis
+
+        super().__init__(rate_per_second, burst)
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefix = prefix
+
+    async def _take(self, company_id: str, cost: float, rate: float, burst: float) -> float:
+        if rate <= 0:
+            return float("inf")
+        wait = await self._script(keys=[f"{self.prefix}:{company_id}"], args=[rate, burst, cost])
+        return float(wait.decode() if isinstance(wait, bytes) else wait)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+def create_token_buckets(url: Optional[str], rate_per_second: float, burst: float) -> TokenBuckets:
+    if url and url.startswith("redis://"):
+        return RedisTokenBuckets(url, rate_per_second, burst)
+    return InMemoryTokenBuckets(rate_per_second, burst)
+
+
+class _Waiter:
+    __slots__ = ("company_id", "span", "future")
+
+    def __init__(self, company_id: str, span: float, future: asyncio.Future):
+        self.company_id = company_id
+        # 该请求在虚拟时间上占用的长度（消耗/权重）
+        self.span = span
+        self.future = future
+
+
+class FairQueue:
+    def __init__(self, capacity: int, max_queue: int, max_wait: float, weights: Optional[Dict[str, float]] = None):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.weights = weights or {}
+        self._heap: List[Tuple[float, int, _Waiter]] = []
+        self._seq = 0
+        # 系统虚拟时间：最近一次分配槽位的请求的虚拟开始时间
+        self._virtual = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._queued: Counter = Counter()
+        self._in_flight: Counter = Counter()
+        self._in_flight_total = 0
+        # 槽位平均占用时长（指数滑动平均），用于估算 Retry-After
+        self._hold_seconds = 1.0
+
+    def weight(self, company_id: str) -> float:
+        return self.weights.get(company_id, 1.0)
+
+    def queued(self, company_id: Optional[str] = None) -> int:
+        return self._queued[company_id] if company_id is not None else sum(self._queued.values())
+
+    def estimated_wait(self) -> float:
+        return self._hold_seconds * (self.queued() + 1) / max(1, self.capacity)
+
+    async def acquire(self, company_id: str, cost: float = 1.0) -> float:
+        # 返回排队等待的秒数；排队已满或超时抛出 AdmissionRejected
+        if self._queued[company_id] >= self.max_queue:
+            raise AdmissionRejected("queue_full", self.estimated_wait())
+        start = max(self._virtual, self._last_finish.get(company_id, 0.0))
+        span = cost / self.weight(company_id)
+        self._last_finish[company_id] = start + span
+        waiter = _Waiter(company_id, span, asyncio.get_running_loop().create_future())
+        self._seq += 1
+        heapq.heappush(self._heap, (start, self._seq, waiter))
+        self._queued[company_id] += 1
+        self._dispatch()
+        if waiter.future.done():
+            return 0.0
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise AdmissionRejected("queue_timeout", self.estimated_wait())
+        except asyncio.CancelledError:
+            # 客户端断开：已分配的槽位归还，未分配的从队列中撤出
+            self._abandon(waiter)
+            raise
+        return time.monotonic() - started
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        if waiter.future.done():
+            self.release(waiter.company_id, 0.0)
+            return
+        waiter.future.cancel()
+        self._queued[waiter.company_id] -= 1
+        if not self._queued[waiter.company_id]:
+            del self._queued[waiter.company_id]
+        # 撤出的请求不再占用该公司的虚拟时间
+        if waiter.company_id in self._last_finish:
+            self._last_finish[waiter.company_id] = max(self._virtual, self._last_finish[waiter.company_id] - waiter.span)
+
+    def release(self, company_id: str, held_seconds: Optional[float] = None) -> None:
+        self._in_flight[company_id] -= 1
+        self._in_flight_total -= 1
+        if not self._in_flight[company_id]:
+            del self._in_flight[company_id]
+        if held_seconds:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._in_flight_total < self.capacity and self._heap:
+            start, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            self._queued[waiter.company_id] -= 1
+            if not self._queued[waiter.company_id]:
+                del self._queued[waiter.company_id]
+            self._virtual = max(self._virtual, start)
+            self._in_flight[waiter.company_id] += 1
+            self._in_flight_total += 1
+            waiter.future.set_result(None)
+        if not self._heap and not self._in_flight_total:
+            # 完全空闲时重置虚拟时间，避免浮点数无限增长
+            self._virtual = 0.0
+            self._last_finish.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "max_queue": self.max_queue,
+            "max_wait": self.max_wait,
+            "in_flight": self._in_flight_total,
+            "queued": self.queued(),
+            "in_flight_by_tenant": {k: v for k, v in self._in_flight.items() if v},
+            "queued_by_tenant": {k: v for k, v in self._queued.items() if v},
+            "avg_hold_seconds": round(self._hold_seconds, 3),
+        }
+
+
+class Ticket:
+    # 准入凭证：释放可重复调用，流式响应在生成结束或连接断开时归还槽位
+    __slots__ = ("_queue", "company_id", "_acquired", "_released")
+
+    def __init__(self, queue: Optional[FairQueue], company_id: str):
+        self._queue = queue
+        self.company_id = company_id
+        self._acquired = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._queue is not None:
+            self._queue.release(self.company_id, time.monotonic() - self._acquired)
+
+    async def hold(self, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        # 包装流式响应的数据源：推送结束、出错或客户端断开（生成器被关闭）时释放
+        try:
+            async for event in events:
+                yield event
+        finally:
+            self.release()
+
+    async def __aenter__(self) -> "Ticket":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    def __init__(self, buckets: TokenBuckets, queue: FairQueue, costs: Optional[Dict[str, float]] = None):
+        self.buckets = buckets
+        self.queue = queue
+        self.costs = costs or {}
+        self._admitted: Counter = Counter()
+        self._rejected: Counter = Counter()
+        self._wait_seconds: Counter = Counter()
+
+    def _reject(self, company_id: str, kind: str, exc: AdmissionRejected) -> AdmissionRejected:
+        self._rejected[(company_id, kind, exc.reason)] += 1
+        return exc
+
+    async def check_rate(self, company_id: str, kind: str) -> None:
+        # 只限速不排队：请求本身很快、实际工作在后台调度器中执行的接口（标书生成）
+        wait = await self.buckets.take(company_id, self.costs.get(kind, 1.0), self.queue.weight(company_id))
+        if wait > 0:
+            raise self._reject(company_id, kind, AdmissionRejected("rate_limited", wait))
+        self._admitted[(company_id, kind)] += 1
+
+    async def admit(self, company_id: str, kind: str) -> Ticket:
+        cost = self.costs.get(kind, 1.0)
+        wait = await self.buckets.take(company_id, cost, self.queue.weight(company_id))
+        if wait > 0:
+            raise self._reject(company_id, kind, AdmissionRejected("rate_limited", wait))
+        try:
+            waited = await self.queue.acquire(company_id, cost)
+        except AdmissionRejected as e:
+            raise self._reject(company_id, kind, e)
+        self._admitted[(company_id, kind)] += 1
+        self._wait_seconds[company_id] += waited
+        return Ticket(self.queue, company_id)
+
+    async def close(self) -> None:
+        await self.buckets.close()
+
+    def stats(self) -> Dict[str, Any]:
+        rejected: Dict[str, int] = defaultdict(int)
+        for (_, _, reason), n in self._rejected.items():
+            rejected[reason] += n
+        return {
+            "rate_limit": self.buckets.stats(),
+            "queue": self.queue.stats(),
+            "costs": self.costs,
+            "weights": self.queue.weights,
+            "admitted": sum(self._admitted.values()),
+            "rejected": dict(rejected),
+        }
+
+    def collect(self) -> Iterable[Tuple[str, str, str, Sequence[str], Dict[Tuple, float]]]:
+        # 供 Metrics.add_collector 导出：(指标名, 类型, 说明, 标签名, {标签值: 数值})
+        yield ("ai_admission_queue_depth", "gauge", "AI接口排队中的请求数", ("tenant",),
+               {(k,): v for k, v in self.queue._queued.items() if v})
+        yield ("ai_admission_in_flight", "gauge", "AI接口占用槽位的请求数", ("tenant",),
+               {(k,): v for k, v in self.queue._in_flight.items() if v})
+        yield ("ai_admission_admitted_total", "counter", "AI接口放行的请求数", ("tenant", "kind"), dict(self._admitted))
+        yield ("ai_admission_rejected_total", "counter", "AI接口拒绝的请求数（429）", ("tenant", "kind", "reason"), dict(self._rejected))
+        yield ("ai_admission_wait_seconds_total", "counter", "AI接口排队等待总时长", ("tenant",),
+               {(k,): v for k, v in self._wait_seconds.items()})
@@ -0,0 +1,193 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# AI结果缓存：按公司隔离，LRU + TTL
+# 精确命中：键为 (作用域, 规范化文本)，作用域包含知识库版本号，知识库变化后旧结果自然失效
+# 语义命中：同一作用域内，查询向量与已缓存条目的余弦相似度不低于阈值即视为命中（默认关闭）
+# 语义命中只适用于检索类结果；生成内容中的数字承诺（年限、响应时间）不同但向量很接近，不能复用
+
+Scope = Tuple[Hashable, ...]
+
+TEXT_NOISE = re.compile(r"[\s，,。.;；:：!！?？、]+")
+
+
+def _strip_noise(match: "re.Match") -> str:
+    # 数字之间的标点是数值的一部分（1.5年、1,000台），保留为统一的分隔符，避免 1.5 与 15 得到同一个键
+    text, start, end = match.string, match.start(), match.end()
+    if 0 < start and end < len(text) and text[start - 1].isdigit() and text[end].isdigit():
+        return "." if "." in match.group() else ","
+    return ""
+
+
+def normalize_text(text: str) -> str:
+    return TEXT_NOISE.sub(_strip_noise, unicodedata.normalize("NFKC", text)).lower()
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "cost", "scope", "vector")
+
+    def __init__(self, value: Any, expires_at: float, cost: float, scope: Scope, vector: Optional[np.ndarray]):
+        self.value = value
+        self.expires_at = expires_at
+        # 生成该结果耗费的时间，命中时计入节省的推理时间
+        self.cost = cost
+        self.scope = scope
+        self.vector = vector
+
+
+class _TenantCache:
+    def __init__(self):
+        self.entries: "OrderedDict[Tuple[Scope, str], _Entry]" = OrderedDict()
+        # 作用域 -> {键: 单位向量}，用于语义匹配
+        self.vectors: Dict[Scope, Dict[Tuple[Scope, str], np.ndarray]] = {}
+        self.kb_version = 0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, similarity_threshold: float = 0.0):
+        # max_entries 为单个公司的条目上限；similarity_threshold 为0时关闭语义命中
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._tenants: Dict[str, _TenantCache] = {}
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def _tenant(self, company_id: str) -> _TenantCache:
+        tenant = self._tenants.get(company_id)
+        if tenant is None:
+            tenant = self._tenants[company_id] = _TenantCache()
+        return tenant
+
+    def kb_version(self, company_id: str) -> int:
+        return self._tenant(company_id).kb_version
+
+    def invalidate(self, company_id: str) -> None:
+        # 知识库变化：版本号递增并清空该公司的缓存
+        tenant = self._tenant(company_id)
+        tenant.kb_version += 1
+        tenant.entries.clear()
+        tenant.vectors.clear()
+        self._invalidations += 1
+
+    @staticmethod
+    def _unit(vector: Optional[Sequence[float]]) -> Optional[np.ndarray]:
+        if vector is None:
+            return None
+        v = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0 else None
+
+    def get(
+        self,
+        company_id: str,
+        scope: Scope,
+        text: str,
+        vector: Optional[Sequence[float]] = None,
+    ) -> Optional[Any]:
+        tenant = self._tenant(company_id)
+        now = time.monotonic()
+        key = (scope, normalize_text(text))
+        entry = tenant.entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            self._remove(tenant, key)
+            self._expirations += 1
+            entry = None
+        if entry is None and self.similarity_threshold > 0 and vector is not None:
+            key, entry = self._nearest(tenant, scope, self._unit(vector), now)
+            if entry is not None:
+                tenant.semantic_hits += 1
+        if entry is None:
+            tenant.misses += 1
+            return None
+        tenant.entries.move_to_end(key)
+        tenant.hits += 1
+        tenant.saved_seconds += entry.cost
+        return entry.value
+
+    def _nearest(self, tenant: _TenantCache, scope: Scope, query: Optional[np.ndarray], now: float):
+        candidates = tenant.vectors.get(scope)
+        if query is None or not candidates:
+            return None, None
+        keys = list(candidates)
+        matrix = np.stack([candidates[k] for k in keys])
+        if matrix.shape[1] != query.shape[0]:
+            return None, None
+        scores = matrix @ query
+        for i in np.argsort(-scores).tolist():
+            if scores[i] < self.similarity_threshold:
+                break
+            entry = tenant.entries.get(keys[i])
+            if entry is not None and entry.expires_at > now:
+                return keys[i], entry
+        return None, None
+
+    def put(
+        self,
+        company_id: str,
+        scope: Scope,
+        text: str,
+        value: Any,
+        cost: float = 0.0,
+        vector: Optional[Sequence[float]] = None,
+    ) -> None:
+        tenant = self._tenant(company_id)
+        key = (scope, normalize_text(text))
+        if key in tenant.entries:
+            self._remove(tenant, key)
+        unit = self._unit(vector) if self.similarity_threshold > 0 else None
+        tenant.entries[key] = _Entry(value, time.monotonic() + self.ttl, cost, scope, unit)
+        if unit is not None:
+            tenant.vectors.setdefault(scope, {})[key] = unit
+        while len(tenant.entries) > self.max_entries:
+            self._remove(tenant, next(iter(tenant.entries)))
+            self._evictions += 1
+
+    def _remove(self, tenant: _TenantCache, key: Tuple[Scope, str]) -> None:
+        entry = tenant.entries.pop(key, None)
+        if entry is None or entry.vector is None:
+            return
+        vectors = tenant.vectors.get(entry.scope)
+        if vectors is not None:
+            vectors.pop(key, None)
+            if not vectors:
+                del tenant.vectors[entry.scope]
+
+    def stats(self, company_id: Optional[str] = None) -> Dict[str, Any]:
+        tenants = [self._tenants[company_id]] if company_id in self._tenants else []
+        if company_id is None:
+            tenants = list(self._tenants.values())
+        hits = sum(t.hits for t in tenants)
+        misses = sum(t.misses for t in tenants)
+        result = {
+            "entries": sum(len(t.entries) for t in tenants),
+            "hits": hits,
+            "semantic_hits": sum(t.semantic_hits for t in tenants),
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "saved_inference_seconds": round(sum(t.saved_seconds for t in tenants), 3),
+        }
+        if company_id is None:
+            result.update({
+                "tenants": len(self._tenants),
+                "max_entries_per_tenant": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "similarity_threshold": self.similarity_threshold,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            })
+        else:
+            result["kb_version"] = self.kb_version(company_id)
+        return result
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from repository import Repository
+
+
+# 操作日志（审计日志）写入：请求中只追加到内存缓冲区，后台任务按批量或定时刷写
+# PostgreSQL 下批量写入使用 COPY，表按月分区（见 init_db.py）；查询走 (company_id, created_at) 时间索引
+# 月分区由 OperationLogPartitions 在启动时及每天滚动创建，始终保留未来若干个月；
+# DEFAULT 分区只作兜底，若其中已有某月的数据（分区创建滞后），先把这些行移入新分区再挂载
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    def __init__(
+        self,
+        repository: Repository,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 50000,
+    ):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # 缓冲区达到该长度时由写入方同步刷写（背压）；数据库长时间不可用时超出10倍即丢弃最旧的日志
+        self.max_pending = max_pending
+        self._buffer: List[Any] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        # 指标
+        self._written_total = 0
+        self._batches_total = 0
+        self._failures_total = 0
+        self._dropped_total = 0
+        self._last_flush_ms = 0.0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def record(self, log: Any) -> None:
+        self._buffer.append(log)
+        pending = len(self._buffer)
+        if pending >= self.max_pending * 10:
+            dropped = pending - self.max_pending * 10
+            del self._buffer[:dropped]
+            self._dropped_total += dropped
+        if pending >= self.max_pending or self._task is None:
+            # 后台刷写跟不上或尚未启动：由调用方直接写入
+            await self.flush()
+        elif pending >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while self._buffer:
+                batch = self._buffer[: self.batch_size]
+                del self._buffer[: len(batch)]
+                started = time.perf_counter()
+                try:
+                    await self.repository.append_many(batch)
+                except Exception:
+                    # 放回缓冲区头部，下次刷写重试
+                    self._buffer[:0] = batch
+                    self._failures_total += 1
+                    logger.exception("操作日志批量写入失败，%d 条待重试", len(self._buffer))
+                    return
+                self._last_flush_ms = (time.perf_counter() - started) * 1000
+                self._written_total += len(batch)
+                self._batches_total += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._buffer),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "written_total": self._written_total,
+            "batches_total": self._batches_total,
+            "failures_total": self._failures_total,
+            "dropped_total": self._dropped_total,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+        }
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class OperationLogPartitions:
+    def __init__(
+        self,
+        database: Any,
+        table: str = "operation_logs",
+        months_ahead: int = 12,
+        company_buckets: int = 4,
+        interval: float = 86400.0,
+    ):
+        self.database = database
+        self.table = table
+        self.months_ahead = months_ahead
+        self.company_buckets = company_buckets
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._created_total = 0
+        self._moved_rows_total = 0
+        self._failures_total = 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        await self.ensure()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def ensure(self, today: Optional[date] = None) -> int:
+        # 创建当月起 months_ahead 个月内缺失的分区，返回新建的个数
+        month = (today or date.today()).replace(day=1)
+        created = 0
+        for _ in range(self.months_ahead + 1):
+            try:
+                if await self._create(month):
+                    created += 1
+            except Exception:
+                self._failures_total += 1
+                logger.exception("创建操作日志分区失败：%s", month)
+            month = _next_month(month)
+        return created
+
+    async def _create(self, month: date) -> bool:
+        partition = f"{self.table}_{month:%Y%m}"
+        row = await self.database.fetchrow("SELECT to_regclass($1)::text", partition)
+        if row[0] is not None:
+            return False
+        start = datetime(month.year, month.month, 1)
+        end = datetime(*_next_month(month).timetuple()[:3])
+        async with self.database.transaction():
+            # 多个worker同时启动时只由一个创建
+            await self.database.execute("SELECT pg_advisory_xact_lock(hashtext($1))", partition)
+            row = await self.database.fetchrow("SELECT to_regclass($1)::text", partition)
+            if row[0] is not None:
+                return False
+            # 先建为独立表再挂载：DEFAULT 分区中属于该月的行在同一事务内移入，挂载时的范围校验才能通过
+            await self.database.execute(
+                f"CREATE TABLE {partition} (LIKE {self.table} INCLUDING DEFAULTS) PARTITION BY HASH (company_id)"
+            )
+            for bucket in range(self.company_buckets):
+                await self.database.execute(
+                    f"CREATE TABLE {partition}_{bucket} PARTITION OF {partition} "
+                    f"FOR VALUES WITH (MODULUS {self.company_buckets}, REMAINDER {bucket})"
+                )
+            status = await self.database.execute(
+                f"WITH moved AS (DELETE FROM {self.table}_default WHERE created_at >= $1 AND created_at < $2 RETURNING *) "
+                f"INSERT INTO {partition} SELECT * FROM moved",
+                start,
+                end,
+            )
+            await self.database.execute(
+                f"ALTER TABLE {self.table} ATTACH PARTITION {partition} FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            )
+        moved = int(status.split()[-1])
+        if moved:
+            logger.warning("操作日志分区 %s 创建滞后，已从DEFAULT分区移入 %d 行", partition, moved)
+        self._created_total += 1
+        self._moved_rows_total += moved
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.ensure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "months_ahead": self.months_ahead,
+            "created_total": self._created_total,
+            "moved_rows_total": self._moved_rows_total,
+            "failures_total": self._failures_total,
+        }
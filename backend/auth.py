@@ -0,0 +1,191 @@
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Set, Tuple
+
+
+# 认证：scrypt 口令哈希 + HS256 JWT
+# 令牌校验结果(含解析出的用户)放在LRU缓存中，命中时只需一次字典查找和吊销检查
+# 吊销信息保存在进程内；多worker部署时，其他worker在令牌过期前仍会接受已注销的令牌
+
+
+class AuthError(Exception):
+    pass
+
+
+# scrypt参数：单次约数十毫秒，应在线程池中调用
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+PASSWORD_PREFIX = "scrypt"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"{PASSWORD_PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def is_password_hash(value: str) -> bool:
+    return value.startswith(PASSWORD_PREFIX + "$")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    if not is_password_hash(stored):
+        # 兼容历史明文口令，登录成功后会被重新哈希
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = _b64decode(digest)
+        actual = hashlib.scrypt(password.encode(), salt=_b64decode(salt), n=int(n), r=int(r), p=int(p), dklen=len(expected))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+class TokenAuthenticator:
+    _header = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def __init__(
+        self,
+        secret: str,
+        resolve_user: Callable[[str], Any],
+        expires_seconds: int = 12 * 3600,
+        cache_size: int = 10000,
+    ):
+        self._secret = secret.encode()
+        # resolve_user(user_id) -> 用户字典或None（协程函数），走仓储的主键索引
+        self._resolve_user = resolve_user
+        self.expires_seconds = expires_seconds
+        self.cache_size = cache_size
+        # 令牌 -> (用户字典, 过期时间, jti, 签发时间)
+        self._cache: "OrderedDict[str, Tuple[Dict[str, Any], float, str, float]]" = OrderedDict()
+        self._user_tokens: Dict[str, Set[str]] = {}
+        # 已吊销的 jti -> 过期时间；用户ID -> 在此时间之前签发的令牌全部失效
+        self._revoked: Dict[str, float] = {}
+        self._not_before: Dict[str, float] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _sign(self, signing_input: str) -> str:
+        return _b64encode(hmac.new(self._secret, signing_input.encode(), hashlib.sha256).digest())
+
+    def issue(self, user: Dict[str, Any]) -> str:
+        now = time.time()
+        claims = {
+            "sub": user["id"],
+            "cid": user["company_id"],
+            # 向下取整到毫秒：向上舍入会使紧接着 revoke_user 之前签发的令牌显得晚于吊销时间
+            "iat": math.floor(now * 1000) / 1000,
+            "exp": int(now + self.expires_seconds),
+            "jti": uuid.uuid4().hex,
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{self._header}.{payload}"
+        return f"{signing_input}.{self._sign(signing_input)}"
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            header, payload, signature = token.split(".")
+        except ValueError:
+            raise AuthError("令牌格式错误")
+        # 按字节比较：compare_digest 不接受含非ASCII字符的str（请求头按latin-1解码，可能带入这类字符）
+        try:
+            valid = header == self._header and hmac.compare_digest(signature.encode(), self._sign(f"{header}.{payload}").encode())
+        except UnicodeEncodeError:
+            valid = False
+        if not valid:
+            raise AuthError("令牌签名无效")
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise AuthError("令牌格式错误")
+        if claims.get("exp", 0) <= time.time():
+            raise AuthError("令牌已过期")
+        return claims
+
+    def _is_revoked(self, user_id: str, jti: str, issued_at: float) -> bool:
+        return jti in self._revoked or issued_at < self._not_before.get(user_id, 0.0)
+
+    async def authenticate(self, token: str) -> Dict[str, Any]:
+        now = time.time()
+        cached = self._cache.get(token)
+        if cached is not None:
+            user, expires_at, jti, issued_at = cached
+            if expires_at > now and not self._is_revoked(user["id"], jti, issued_at):
+                self._cache.move_to_end(token)
+                self._hits += 1
+                return user
+            self._evict(token)
+            raise AuthError("令牌已失效")
+        self._misses += 1
+        claims = self.decode(token)
+        if self._is_revoked(claims["sub"], claims["jti"], claims["iat"]):
+            raise AuthError("令牌已失效")
+        user = await self._resolve_user(claims["sub"])
+        if user is None:
+            raise AuthError("用户不存在")
+        self._cache[token] = (user, claims["exp"], claims["jti"], claims["iat"])
+        self._user_tokens.setdefault(user["id"], set()).add(token)
+        while len(self._cache) > self.cache_size:
+            self._evict(next(iter(self._cache)))
+        return user
+
+    def _evict(self, token: str) -> None:
+        entry = self._cache.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._user_tokens.get(entry[0]["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._user_tokens[entry[0]["id"]]
+
+    def revoke(self, token: str) -> None:
+        # 注销单个令牌
+        claims = self.decode(token)
+        self._revoked[claims["jti"]] = claims["exp"]
+        self._evict(token)
+        self._purge()
+
+    def revoke_user(self, user_id: str) -> None:
+        # 删除用户或修改口令：此前签发的令牌全部失效
+        self._not_before[user_id] = time.time()
+        self.invalidate_user(user_id)
+
+    def invalidate_user(self, user_id: str) -> None:
+        # 用户信息(角色等)变化：丢弃缓存，下次请求重新解析用户
+        for token in list(self._user_tokens.get(user_id, ())):
+            self._evict(token)
+
+    def _purge(self) -> None:
+        now = time.time()
+        for jti in [j for j, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+        cutoff = now - self.expires_seconds
+        for user_id in [u for u, t in self._not_before.items() if t <= cutoff]:
+            del self._not_before[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached_tokens": len(self._cache),
+            "cache_size": self.cache_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "revoked": len(self._revoked),
+        }
@@ -0,0 +1,424 @@
+# 后端接口基准：离线生成多租户合成数据（公司、用户、项目、产品参数、知识库切片、操作日志），
+# 按场景并发压测各接口，输出吞吐与 p50/p95/p99 延迟，结果保存为JSON便于跨提交对比
+#
+# 用法（在 backend 目录下执行）：
+#   python benchmarks/bench_api.py                                          # 进程内(ASGI)调用，全部场景
+#   python benchmarks/bench_api.py --transport http                         # 在后台线程启动uvicorn，经本地TCP调用
+#   python benchmarks/bench_api.py --tenants 10 --specs 20000 --concurrency 16 64 --output after.json
+#   python benchmarks/bench_api.py --scenarios projects.list knowledge.search --compare before.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 数据目录放在临时目录，不影响本地开发数据
+WORKDIR = tempfile.mkdtemp(prefix="medibid-bench-")
+for name, sub in (("UPLOAD_DIR", "uploads"), ("EMBEDDING_STORE_DIR", "embeddings"), ("VECTOR_INDEX_DIR", "vector_index")):
+    os.environ.setdefault(name, os.path.join(WORKDIR, sub))
+# 压测测的是处理能力，AI接口准入控制默认放宽（需要评估限流效果时显式设置这些变量）
+for name, value in (("AI_RATE_PER_MINUTE", "1000000"), ("AI_BURST", "100000"), ("AI_MAX_QUEUE", "100000")):
+    os.environ.setdefault(name, value)
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from auth import hash_password  # noqa: E402
+
+PASSWORD = "bench-password"
+BRANDS = ["SOMATOM", "Revolution", "Aquilion", "uCT", "NeuViz", "Ingenuity", "Optima", "Brilliance"]
+PARAMS = [
+    ("探测器排数", "排", 16, 640),
+    ("扫描速度", "mm/s", 100, 700),
+    ("球管热容量", "MHU", 3, 30),
+    ("机架孔径", "cm", 60, 90),
+    ("发生器功率", "kW", 50, 120),
+    ("空间分辨率", "lp/cm", 10, 30),
+    ("旋转时间", "s", 1, 5),
+    ("最大扫描范围", "cm", 150, 200),
+]
+SERVICES = ["维保响应", "操作培训", "整机质保", "安装调试", "备件供应", "远程诊断"]
+HOSPITALS = ["协和医院", "华西医院", "湘雅医院", "瑞金医院", "中山医院", "齐鲁医院"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Tenant:
+    def __init__(self, index):
+        self.company_id = f"bench-company-{index}"
+        self.user_id = f"bench-user-{index}"
+        self.username = f"bench{index}"
+        self.models = []
+        self.projects = []
+        self.template_id = None
+        self.token = None
+
+
+async def seed(args, rng):
+    # 直接写入仓储（与接口写入同一存储），数据规模由参数控制
+    password = hash_password(PASSWORD)
+    tenants = []
+    for t in range(args.tenants):
+        tenant = Tenant(t)
+        tenants.append(tenant)
+        await main.companies_db.add(main.Company(id=tenant.company_id, name=f"基准公司{t}"))
+        await main.users_db.add(
+            main.User(id=tenant.user_id, username=tenant.username, password=password, company_id=tenant.company_id, role="admin")
+        )
+        tenant.token = main.authenticator.issue({"id": tenant.user_id, "company_id": tenant.company_id})
+
+        # 产品参数：每个型号覆盖全部参数名，其余为扩展参数
+        per_model = max(len(PARAMS), args.specs // args.models)
+        specs = []
+        for m in range(args.models):
+            model = f"{rng.choice(BRANDS)}-{t}-{m}"
+            tenant.models.append(model)
+            for i in range(per_model):
+                if i < len(PARAMS):
+                    name, unit, low, high = PARAMS[i]
+                    value = f"{rng.randint(low, high)}{unit}"
+                else:
+                    name, value = f"扩展参数{i}", str(rng.randint(1, 1000))
+                specs.append(main.ProductSpec(company_id=tenant.company_id, product_model=model, param_name=name, param_value=value))
+        await main.product_specs_db.add_many(specs)
+
+        # 项目与招标参数（偏离表输入）
+        now = datetime.now()
+        projects = []
+        items = []
+        for p in range(args.projects):
+            project = main.Project(
+                name=f"{rng.choice(HOSPITALS)}CT采购项目{p}",
+                company_id=tenant.company_id,
+                status="parsed",
+                rfp_file_url="",
+                owner_id=tenant.user_id,
+                created_at=now - timedelta(minutes=p),
+            )
+            projects.append(project)
+            for name, unit, low, high in PARAMS:
+                value = f"{rng.randint(low, high)}{unit}"
+                items.append(main.RFPItem(
+                    project_id=project.id,
+                    company_id=tenant.company_id,
+                    section_type="technical_param",
+                    content=f"{name}：≥{value}",
+                    extracted_key=name,
+                    extracted_value=value,
+                    operator=">=",
+                ))
+        await main.projects_db.add_many(projects)
+        await main.rfp_items_db.add_many(items)
+        tenant.projects = [project.id for project in projects]
+
+        # 操作日志直接写仓储，不经过批量写入缓冲
+        await main.operation_logs_db.add_many([
+            main.OperationLog(
+                user_id=tenant.user_id,
+                company_id=tenant.company_id,
+                operation_type=rng.choice(["create", "update", "delete", "generate"]),
+                resource_type=rng.choice(["project", "product_spec", "knowledge", "bid_template"]),
+                resource_id=str(i),
+                content=f"基准日志{i}",
+                created_at=now - timedelta(seconds=i),
+            )
+            for i in range(args.logs)
+        ])
+
+        # 知识库切片走批量导入流水线，同时建立向量索引与BM25索引
+        async def documents():
+            for i in range(args.chunks):
+                yield {
+                    "content": f"{rng.choice(HOSPITALS)}项目{rng.choice(SERVICES)}承诺：接到通知后{rng.randint(1, 48)}小时内响应，"
+                               f"{rng.choice(tenant.models)}整机质保{rng.randint(1, 8)}年，编号{t}-{i}。",
+                    "metadata": {"source": "bench"},
+                    "tenant_id": tenant.company_id,
+                }
+
+        await main.load_knowledge_indexes(tenant.company_id)
+        await main.knowledge_ingestor.ingest(tenant.company_id, documents(), split=False)
+
+        template = main.BidTemplate(company_id=tenant.company_id, name="基准模板", file_url="", template_type="CT")
+        await main.bid_templates_db.add(template)
+        tenant.template_id = template.id
+    return tenants
+
+
+# 各场景：scenario(client, tenant, rng, state) -> httpx.Response；返回None表示本次请求不计入
+async def login(client, tenant, rng, state):
+    return await client.post("/api/login", data={"username": tenant.username, "password": PASSWORD})
+
+
+async def project_create(client, tenant, rng, state):
+    response = await client.post(
+        "/api/projects/",
+        json={"name": f"压测项目{rng.randint(0, 10 ** 6)}", "company_id": tenant.company_id, "rfp_file_url": "", "owner_id": tenant.user_id},
+        headers=auth(tenant),
+    )
+    if response.status_code == 200:
+        state.setdefault(tenant.company_id, []).append(response.json()["id"])
+    return response
+
+
+async def project_get(client, tenant, rng, state):
+    return await client.get(f"/api/projects/{rng.choice(tenant.projects)}", headers=auth(tenant))
+
+
+async def project_update(client, tenant, rng, state):
+    project_id = rng.choice(state.get(tenant.company_id) or tenant.projects)
+    return await client.put(
+        f"/api/projects/{project_id}",
+        json={"name": "压测项目（已更新）", "company_id": tenant.company_id, "rfp_file_url": "", "owner_id": tenant.user_id, "status": "parsed"},
+        headers=auth(tenant),
+    )
+
+
+async def project_delete(client, tenant, rng, state):
+    created = state.get(tenant.company_id)
+    if not created:
+        return None
+    return await client.delete(f"/api/projects/{created.pop()}", headers=auth(tenant))
+
+
+async def project_list(client, tenant, rng, state):
+    return await client.get("/api/projects/", params={"limit": 50}, headers=auth(tenant))
+
+
+async def operation_log_list(client, tenant, rng, state):
+    return await client.get("/api/operation-logs/", params={"limit": 50, "operation_type": "update"}, headers=auth(tenant))
+
+
+async def product_spec_list(client, tenant, rng, state):
+    return await client.get("/api/product-specs/", params={"product_model": rng.choice(tenant.models)}, headers=auth(tenant))
+
+
+async def knowledge_list(client, tenant, rng, state):
+    return await client.get("/api/knowledge-chunks/", params={"limit": 50}, headers=auth(tenant))
+
+
+async def deviation_table(client, tenant, rng, state):
+    return await client.post("/api/generate-deviation-table", params={"project_id": rng.choice(tenant.projects)}, headers=auth(tenant))
+
+
+async def knowledge_search(client, tenant, rng, state):
+    query = f"{rng.choice(HOSPITALS)}{rng.choice(SERVICES)} {rng.choice(tenant.models)}"
+    return await client.post("/api/knowledge-chunks/search", json={"query": query, "top_k": 5}, headers=auth(tenant))
+
+
+async def bid_generation(client, tenant, rng, state):
+    # 从提交任务到任务完成的端到端耗时
+    response = await client.post(
+        "/api/bid-generation-tasks/",
+        data={"project_id": rng.choice(tenant.projects), "template_id": tenant.template_id, "rfp_file_url": "bench"},
+        headers=auth(tenant),
+    )
+    if response.status_code != 200:
+        return response
+    task_id = response.json()["id"]
+    while True:
+        response = await client.get(f"/api/bid-generation-tasks/{task_id}", headers=auth(tenant))
+        if response.status_code != 200 or response.json()["status"] in ("completed", "failed", "cancelled"):
+            if response.status_code == 200 and response.json()["status"] != "completed":
+                response.status_code = 500
+            return response
+        await asyncio.sleep(0.005)
+
+
+def auth(tenant):
+    return {"Authorization": f"Bearer {tenant.token}"}
+
+
+# 按顺序执行：删除场景使用创建场景产生的项目
+SCENARIOS = {
+    "login": login,
+    "projects.create": project_create,
+    "projects.get": project_get,
+    "projects.update": project_update,
+    "projects.list": project_list,
+    "projects.delete": project_delete,
+    "operation_logs.list": operation_log_list,
+    "product_specs.list": product_spec_list,
+    "knowledge.list": knowledge_list,
+    "deviation_table": deviation_table,
+    "knowledge.search": knowledge_search,
+    "bid_generation": bid_generation,
+}
+
+
+async def run_scenario(client, name, tenants, requests, concurrency, seed, state):
+    scenario = SCENARIOS[name]
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(index):
+        nonlocal errors
+        for i in remaining:
+            tenant = tenants[(index + i) % len(tenants)]
+            started = time.perf_counter()
+            response = await scenario(client, tenant, rng, state)
+            if response is None:
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return {"scenario": name, "concurrency": concurrency, "requests": 0, "errors": errors}
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def print_result(result, baseline):
+    if not result["requests"]:
+        print(f"{result['scenario']:<22} 并发 {result['concurrency']:>4}  无请求")
+        return
+    line = (
+        f"{result['scenario']:<22} 并发 {result['concurrency']:>4}  请求 {result['requests']:>6}  错误 {result['errors']:>4}  "
+        f"吞吐 {result['throughput_rps']:>9} req/s  p50 {result['p50_ms']:>9} ms  p95 {result['p95_ms']:>9} ms  p99 {result['p99_ms']:>9} ms"
+    )
+    previous = baseline.get((result["scenario"], result["concurrency"]))
+    if previous and previous.get("requests"):
+        line += f"  [p95 {result['p95_ms'] / previous['p95_ms']:.2f}x  吞吐 {result['throughput_rps'] / previous['throughput_rps']:.2f}x]"
+    print(line)
+
+
+async def drive(args, tenants, base_url, transport, baseline):
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        for concurrency in args.concurrency:
+            state = {}
+            for name in args.scenarios:
+                if args.warmup:
+                    await run_scenario(client, name, tenants, args.warmup, concurrency, args.seed, state)
+                requests = args.login_requests if name == "login" else args.requests
+                result = await run_scenario(client, name, tenants, requests, concurrency, args.seed, state)
+                results.append(result)
+                print_result(result, baseline)
+    return results
+
+
+def serve_in_thread(port):
+    # uvicorn在独立线程的事件循环中运行，压测客户端与服务端不争用同一事件循环
+    import uvicorn
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(server.serve(),), daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, loop, thread
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    started = time.perf_counter()
+    if args.transport == "asgi":
+        async with main.app.router.lifespan_context(main.app):
+            tenants = await seed(args, rng)
+            print(f"数据生成耗时 {time.perf_counter() - started:.1f}s（{args.tenants} 个租户，数据目录 {WORKDIR}）")
+            results = await drive(args, tenants, "http://bench", httpx.ASGITransport(app=main.app), baseline)
+    else:
+        server, loop, thread = serve_in_thread(args.port)
+        try:
+            tenants = asyncio.run_coroutine_threadsafe(seed(args, rng), loop).result()
+            print(f"数据生成耗时 {time.perf_counter() - started:.1f}s（{args.tenants} 个租户，数据目录 {WORKDIR}）")
+            results = await drive(args, tenants, f"http://127.0.0.1:{args.port}", None, baseline)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "transport": args.transport,
+                    "dataset": {
+                        "tenants": args.tenants,
+                        "projects": args.projects,
+                        "specs": args.specs,
+                        "models": args.models,
+                        "chunks": args.chunks,
+                        "logs": args.logs,
+                        "seed": args.seed,
+                    },
+                    "results": results,
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="后端接口基准")
+    parser.add_argument("--transport", choices=["asgi", "http"], default="asgi", help="asgi 为进程内调用，http 为本地uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16])
+    parser.add_argument("--requests", type=int, default=500, help="每个场景的请求数")
+    parser.add_argument("--login-requests", type=int, default=50, help="登录场景的请求数（口令哈希开销大）")
+    parser.add_argument("--warmup", type=int, default=20, help="每个场景正式计时前的预热请求数")
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=200, help="每个租户的项目数")
+    parser.add_argument("--specs", type=int, default=10000, help="每个租户的产品参数行数")
+    parser.add_argument("--models", type=int, default=50, help="每个租户的产品型号数")
+    parser.add_argument("--chunks", type=int, default=2000, help="每个租户的知识库切片数")
+    parser.add_argument("--logs", type=int, default=20000, help="每个租户的操作日志数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", help="基线结果JSON，输出与基线的p95与吞吐比值")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    parser.add_argument("--keep-data", action="store_true", help="保留临时数据目录")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(WORKDIR, ignore_errors=True)
@@ -0,0 +1,121 @@
+# 章节生成推理客户端压测：50个并发写作者同时生成章节，统计首token延迟(TTFT)与总吞吐，对比不同微批大小
+#
+# 用法（在 backend 目录下执行）：
+#   python benchmarks/bench_llm_generation.py                              # 启动进程内模拟模型服务（需安装uvicorn）
+#   python benchmarks/bench_llm_generation.py --url http://localhost:8001  # 压测已运行的模拟服务或vLLM
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import LLMClient  # noqa: E402
+
+SECTIONS = ["after_sales_service", "technical_maintenance", "implementation_case", "training_plan"]
+
+
+def start_mock_server(port):
+    import uvicorn
+
+    import mock_llm_server
+
+    server = uvicorn.Server(uvicorn.Config(mock_llm_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(args, batch_size):
+    client = LLMClient(
+        args.url,
+        args.model,
+        batch_size=batch_size,
+        batch_window=args.batch_window_ms / 1000,
+        tenant_concurrency=args.writers,
+        max_tokens=args.max_tokens,
+    )
+    await client.start()
+    ttfts = []
+    totals = []
+    chunks = 0
+
+    async def writer(index):
+        nonlocal chunks
+        for round_index in range(args.rounds):
+            section = SECTIONS[(index + round_index) % len(SECTIONS)]
+            prompt = f"项目：CT采购{index}\n章节类型：{section}\n招标需求：请提供维保方案，响应时间小于2小时。"
+            started = time.perf_counter()
+            first = None
+            async for _ in client.stream(f"company{index % args.tenants}", prompt):
+                if first is None:
+                    first = time.perf_counter()
+                chunks += 1
+            ttfts.append(first - started)
+            totals.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(i) for i in range(args.writers)))
+    elapsed = time.perf_counter() - started
+    stats = client.stats()
+    await client.close()
+    return {
+        "batch_size": batch_size,
+        "writers": args.writers,
+        "requests": len(totals),
+        "http_requests": stats["batches_total"],
+        "ttft_p50_ms": round(statistics.median(ttfts) * 1000, 2),
+        "ttft_p95_ms": round(percentile(ttfts, 95) * 1000, 2),
+        "ttft_p99_ms": round(percentile(ttfts, 99) * 1000, 2),
+        "total_p50_ms": round(statistics.median(totals) * 1000, 2),
+        "sections_per_second": round(len(totals) / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 1),
+    }
+
+
+async def main_async(args):
+    server = None
+    if not args.url:
+        port = 18001
+        server = start_mock_server(port)
+        args.url = f"http://127.0.0.1:{port}"
+    results = []
+    for batch_size in args.batch_sizes:
+        result = await run_level(args, batch_size)
+        results.append(result)
+        print(
+            f"微批 {result['batch_size']:>3}  HTTP请求 {result['http_requests']:>5}  "
+            f"TTFT p50 {result['ttft_p50_ms']:>8} ms  p95 {result['ttft_p95_ms']:>8} ms  p99 {result['ttft_p99_ms']:>8} ms  "
+            f"吞吐 {result['sections_per_second']:>7} 章节/s  {result['chunks_per_second']:>9} token/s"
+        )
+    if server is not None:
+        server.should_exit = True
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="章节生成推理客户端压测")
+    parser.add_argument("--url", help="推理服务地址，不填则启动进程内模拟服务")
+    parser.add_argument("--model", default="mock")
+    parser.add_argument("--writers", type=int, default=50, help="并发写作者数量")
+    parser.add_argument("--rounds", type=int, default=3, help="每个写作者生成的章节数")
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--batch-window-ms", type=float, default=10.0)
+    parser.add_argument("--output", help="结果JSON输出路径")
+    asyncio.run(main_async(parser.parse_args()))
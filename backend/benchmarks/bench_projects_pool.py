@@ -0,0 +1,152 @@
+# /api/projects/ 连接池压测：50 / 200 / 1000 并发客户端下的 p50 / p99 延迟
+#
+# 用法（在 backend 目录下执行）：
+#   python benchmarks/bench_projects_pool.py                       # 进程内连接池替身，模拟数据库往返延迟
+#   python benchmarks/bench_projects_pool.py --dsn postgresql://... # 本地PostgreSQL（需先执行 init_db.py）
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STORAGE_BACKEND"] = "postgres"
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+
+
+class StandInConnection:
+    # 兼容asyncpg.Connection常用接口，按SQL中的表名返回预置数据
+    def __init__(self, tables, latency):
+        self.tables = tables
+        self.latency = latency
+
+    async def fetch(self, sql, *args):
+        await asyncio.sleep(self.latency)
+        for table, rows in self.tables.items():
+            if f" FROM {table} " in sql:
+                # 按主键查询比较第1列，其余按公司(第3列)过滤
+                column = 0 if " WHERE id = $1" in sql else 2
+                return [row for row in rows if row[column] == args[0]]
+        return []
+
+    async def fetchrow(self, sql, *args):
+        rows = await self.fetch(sql, *args)
+        return rows[0] if rows else None
+
+    async def execute(self, sql, *args):
+        await asyncio.sleep(self.latency)
+        return "INSERT 0 1"
+
+    async def executemany(self, sql, args):
+        await asyncio.sleep(self.latency)
+
+
+class StandInPool:
+    # 兼容asyncpg.Pool的有界连接池替身
+    def __init__(self, size, tables, latency):
+        self._idle = asyncio.Queue()
+        self._size = size
+        for _ in range(size):
+            self._idle.put_nowait(StandInConnection(tables, latency))
+
+    async def acquire(self):
+        return await self._idle.get()
+
+    async def release(self, conn):
+        self._idle.put_nowait(conn)
+
+    def get_size(self):
+        return self._size
+
+    def get_idle_size(self):
+        return self._idle.qsize()
+
+    async def close(self):
+        pass
+
+
+def build_project_rows(count):
+    now = datetime.now()
+    return [
+        (f"p{i}", f"项目{i}", "company1", "parsing", "/uploads/rfp.pdf", "user1", now - timedelta(minutes=i))
+        for i in range(count)
+    ]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(client, concurrency, requests_per_client):
+    latencies = []
+
+    async def worker():
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            response = await client.get("/api/projects/")
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def main_async(args):
+    rows = build_project_rows(args.rows)
+    user = main.User(id="bench-user", username="bench", password="", company_id="company1", role="admin")
+    if args.dsn:
+        main.database.dsn = args.dsn
+        main.database.max_size = args.pool_size
+        await main.database.connect()
+        await main.projects_db.add_many([main.Project(**dict(zip(main.projects_db.columns, row))) for row in rows])
+        await main.users_db.add(user)
+    else:
+        tables = {"projects": rows, "users": [tuple(getattr(user, c) for c in main.users_db.columns)]}
+        await main.database.connect(pool=StandInPool(args.pool_size, tables, args.latency_ms / 1000))
+
+    # 所有请求共用一个令牌，首个请求之后走令牌缓存
+    token = main.authenticator.issue({"id": user.id, "company_id": user.company_id})
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for concurrency in args.concurrency:
+            result = await run_level(client, concurrency, args.requests_per_client)
+            result["pool"] = main.database.metrics()
+            results.append(result)
+            print(
+                f"并发 {result['concurrency']:>5}  请求 {result['requests']:>6}  "
+                f"吞吐 {result['throughput_rps']:>8} req/s  p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms"
+            )
+    await main.database.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"backend": "postgres" if args.dsn else "stand-in", "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/api/projects/ 连接池压测")
+    parser.add_argument("--dsn", help="本地PostgreSQL连接串，不填则使用进程内替身")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=50, help="每个租户的项目行数")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="替身模式下每次查询的模拟往返延迟")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,172 @@
+# 知识库检索离线评测：比较纯向量、纯关键词、混合融合及重排的召回率(Recall@k)、MRR与检索延迟(p50/p95/p99)
+#
+# 用法（在 backend 目录下执行）：
+#   python benchmarks/bench_retrieval.py                                   # 合成语料（型号/参数名精确查询 + 服务类描述查询）
+#   python benchmarks/bench_retrieval.py --chunks 20000 --candidates 10 20 50
+#   python benchmarks/bench_retrieval.py --corpus corpus.jsonl --queries queries.jsonl --embedder bge-m3 --reranker bge-reranker
+#
+# corpus.jsonl 每行 {"id": "...", "content": "..."}；queries.jsonl 每行 {"query": "...", "relevant": ["切片ID", ...]}
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding import create_embedder  # noqa: E402
+from retrieval import HybridRetriever, LexicalIndexManager, RerankBatcher, create_reranker  # noqa: E402
+from vector_index import VectorIndexManager  # noqa: E402
+
+COMPANY = "bench"
+BRANDS = ["SOMATOM", "Revolution", "Aquilion", "uCT", "NeuViz", "Ingenuity", "Optima", "Brilliance"]
+PARAMS = [("探测器排数", "排"), ("扫描速度", "mm/s"), ("球管热容量", "MHU"), ("机架孔径", "cm"), ("空间分辨率", "lp/cm"), ("发生器功率", "kW")]
+HOSPITALS = ["协和医院", "华西医院", "湘雅医院", "瑞金医院", "中山医院", "齐鲁医院", "同济医院", "西京医院"]
+SERVICES = [
+    ("维保", "接到报修后{n}小时内响应，工程师{m}小时内到达现场，每季度上门保养一次。", "设备坏了多久能有人来修"),
+    ("培训", "安装完成后提供{n}天操作培训和{m}天工程师维修培训，培训结束后进行考核。", "对医院技师和工程师怎么做培训"),
+    ("质保", "整机质保{n}年，球管质保{m}万秒，质保期内免费更换零部件。", "保修期多长，期间换件收费吗"),
+    ("装机", "到货后{n}个工作日内完成安装调试，{m}个工作日内通过验收。", "设备到货后多长时间能装好用上"),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def synthetic_dataset(size, seed):
+    # 一半为产品参数切片（用型号+参数名精确查询），一半为服务承诺切片（用口语化描述查询）
+    rng = random.Random(seed)
+    corpus, queries = [], []
+    # 同一医院同类承诺的切片都算相关
+    groups = {}
+    for i in range(size):
+        chunk_id = f"c{i}"
+        if i % 2 == 0:
+            model = f"{rng.choice(BRANDS)}-{rng.randint(10, 999)}{rng.choice(['', 'A', 'Pro', 'Elite'])}"
+            name, unit = rng.choice(PARAMS)
+            content = f"{model} 技术参数：{name}为{rng.randint(16, 640)}{unit}，符合招标要求。我司产品已在{rng.choice(HOSPITALS)}装机使用。"
+            queries.append({"query": f"{model} {name}", "relevant": [chunk_id]})
+        else:
+            hospital = rng.choice(HOSPITALS)
+            kind, template, question = rng.choice(SERVICES)
+            content = f"{hospital}项目{kind}承诺：" + template.format(n=rng.randint(1, 9), m=rng.randint(10, 99))
+            relevant = groups.setdefault((hospital, kind), [])
+            relevant.append(chunk_id)
+            queries.append({"query": f"{hospital}项目{question}", "relevant": relevant})
+        corpus.append({"id": chunk_id, "content": content})
+    return corpus, queries
+
+
+def load_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def evaluate(retriever, embedder, queries, config, top_k, concurrency):
+    recalls, reciprocal_ranks, latencies = [], [], []
+    query_vectors = embedder.embed([q["query"] for q in queries]) if config["vector"] else [None] * len(queries)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(query, vector):
+        async with slots:
+            await run_query(query, vector)
+
+    async def run_query(query, vector):
+        started = time.perf_counter()
+        if config["lexical"]:
+            hits = await retriever.search(
+                COMPANY, query["query"], vector, top_k, config["candidates"], config["fusion"], rerank=config["rerank"]
+            )
+            ranked = [hit["id"] for hit in hits]
+        else:
+            ranked = [doc_id for doc_id, _ in await retriever._vector_search(COMPANY, vector, top_k, "auto", 8)]
+        latencies.append(time.perf_counter() - started)
+        relevant = set(query["relevant"])
+        recalls.append(len(relevant & set(ranked)) / min(len(relevant), top_k))
+        rank = next((i + 1 for i, doc_id in enumerate(ranked) if doc_id in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    # 并发查询时，同时到达的重排请求会合并为一批
+    await asyncio.gather(*(run(query, vector) for query, vector in zip(queries, query_vectors)))
+    return {
+        **config,
+        f"recall@{top_k}": round(statistics.mean(recalls), 4),
+        "mrr": round(statistics.mean(reciprocal_ranks), 4),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def main_async(args):
+    if args.corpus:
+        corpus, queries = load_jsonl(args.corpus), load_jsonl(args.queries)
+    else:
+        corpus, queries = synthetic_dataset(args.chunks, args.seed)
+    queries = queries[: args.max_queries]
+    embedder = create_embedder(args.embedder)
+    reranker = RerankBatcher(create_reranker(args.reranker))
+    records = {doc["id"]: argparse.Namespace(content=doc["content"]) for doc in corpus}
+
+    print(f"语料 {len(corpus)} 个切片，查询 {len(queries)} 条（并发 {args.concurrency}），向量化后端 {embedder.name}，重排后端 {reranker.reranker.name}")
+    started = time.perf_counter()
+    vectors = embedder.embed([doc["content"] for doc in corpus])
+    vector_index = VectorIndexManager(ivf_min_size=args.ivf_min_size)
+    vector_index.add(COMPANY, [doc["id"] for doc in corpus], vectors)
+    lexical = LexicalIndexManager()
+    lexical.load(COMPANY, ((doc["id"], doc["content"]) for doc in corpus))
+    print(f"建索引耗时 {time.perf_counter() - started:.2f}s")
+
+    async def vector_search(company_id, vector, k, mode, nprobe):
+        return vector_index.search(company_id, vector, k, mode, nprobe)
+
+    async def fetch(company_id, ids):
+        return {doc_id: records[doc_id] for doc_id in ids if doc_id in records}
+
+    retriever = HybridRetriever(lexical, vector_search, fetch, reranker)
+    configs = [{"name": "vector", "lexical": False, "vector": True, "candidates": args.top_k, "fusion": "rrf", "rerank": False}]
+    for candidates in args.candidates:
+        configs += [
+            {"name": "bm25", "lexical": True, "vector": False, "candidates": candidates, "fusion": "rrf", "rerank": False},
+            {"name": "hybrid-rrf", "lexical": True, "vector": True, "candidates": candidates, "fusion": "rrf", "rerank": False},
+            {"name": "hybrid-weighted", "lexical": True, "vector": True, "candidates": candidates, "fusion": "weighted", "rerank": False},
+            {"name": "hybrid-rrf+rerank", "lexical": True, "vector": True, "candidates": candidates, "fusion": "rrf", "rerank": True},
+        ]
+    results = []
+    for config in configs:
+        result = await evaluate(retriever, embedder, queries, config, args.top_k, args.concurrency)
+        results.append(result)
+        print(
+            f"{result['name']:<18} 候选 {result['candidates']:>4}  Recall@{args.top_k} {result[f'recall@{args.top_k}']:.4f}  "
+            f"MRR {result['mrr']:.4f}  p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms"
+        )
+    print(f"重排批处理：{reranker.stats()}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"chunks": len(corpus), "queries": len(queries), "concurrency": args.concurrency, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="知识库检索离线评测")
+    parser.add_argument("--corpus", help="语料NDJSON，不填则使用合成语料")
+    parser.add_argument("--queries", help="查询NDJSON（与 --corpus 一起使用）")
+    parser.add_argument("--chunks", type=int, default=5000, help="合成语料的切片数")
+    parser.add_argument("--max-queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 20, 50], help="融合后送入重排的候选数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时执行的查询数")
+    parser.add_argument("--embedder", default="hash", help="hash 或 bge-m3")
+    parser.add_argument("--reranker", default="overlap", help="overlap 或 bge-reranker")
+    parser.add_argument("--ivf-min-size", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+    if args.corpus and not args.queries:
+        parser.error("--corpus 需要同时指定 --queries")
+    asyncio.run(main_async(args))
@@ -0,0 +1,96 @@
+# 招标文件解析流水线压测：合成300页招标文件，观察吞吐随进程数的变化以及主进程内存占用
+#
+# 用法（在 backend 目录下执行）：
+#   python benchmarks/bench_rfp_parsing.py --pages 300 --workers 1 2 4
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rfp_parser import parse_rfp  # noqa: E402
+
+PARAM_LINES = [
+    "{n}. ★扫描速度：≥{v}mm/s",
+    "{n}. 探测器排数≥{v}排",
+    "{n}. 球管热容量不低于{v}MHU",
+    "{n}. 发生器功率：≥{v}kW",
+    "{n}、机架孔径≥{v}cm",
+    "{n}. 整机噪声不超过{v}dB",
+]
+OTHER_LINES = [
+    "投标人须提供有效的医疗器械注册证及医疗器械经营许可证。",
+    "未按要求提供原厂授权书的，按无效投标处理。",
+    "供应商应具有完善的售后服务体系，并在本地设有维修站点。",
+    "设备到货后，供应商负责安装调试并对使用科室人员进行培训。",
+]
+
+
+def write_synthetic_tender(path, pages, lines_per_page, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for page in range(pages):
+            lines = []
+            for n in range(lines_per_page):
+                if rng.random() < 0.3:
+                    lines.append(rng.choice(PARAM_LINES).format(n=n + 1, v=rng.randint(10, 500)))
+                else:
+                    lines.append(rng.choice(OTHER_LINES) + "本条款适用于本次招标的全部包件。" * 3)
+            f.write("\n".join(lines))
+            if page != pages - 1:
+                f.write("\f")
+
+
+async def run(path, workers, pages_per_task):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 预热进程池，避免进程启动时间计入吞吐
+        list(executor.map(abs, range(workers)))
+        tracemalloc.start()
+        started = time.perf_counter()
+        items = batches = 0
+        async for batch in parse_rfp(path, executor, pages_per_task=pages_per_task, max_in_flight=workers * 2):
+            items += len(batch)
+            batches += 1
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"workers": workers, "items": items, "batches": batches, "seconds": round(elapsed, 3), "peak_parent_kb": round(peak / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="招标文件解析流水线压测")
+    parser.add_argument("--pages", type=int, nargs="+", default=[300])
+    parser.add_argument("--lines-per-page", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages-per-task", type=int, default=5)
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"tender_{pages}.txt")
+            write_synthetic_tender(path, pages, args.lines_per_page)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for workers in args.workers:
+                result = asyncio.run(run(path, workers, args.pages_per_task))
+                result.update({"pages": pages, "file_mb": round(size_mb, 1), "pages_per_second": round(pages / result["seconds"], 1)})
+                results.append(result)
+                print(
+                    f"页数 {pages:>5} ({result['file_mb']:>5} MB)  进程 {workers:>2}  RFP项 {result['items']:>7}  "
+                    f"耗时 {result['seconds']:>7}s  {result['pages_per_second']:>8} 页/s  主进程峰值 {result['peak_parent_kb']:>8} KB"
+                )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# 投标模板渲染基准：合成一个含偏离表循环与章节循环的Word模板，测量编译耗时、缓存命中耗时、渲染耗时与峰值内存
+#
+# 用法（在 backend 目录下执行）：
+#   python benchmarks/bench_template_render.py                       # 约200页：600行偏离表 + 150个章节
+#   python benchmarks/bench_template_render.py --rows 5000 --sections 1000 --output result.json
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bid_template import TemplateCache, file_sha256, render_to_file  # noqa: E402
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def paragraph(text):
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def cell(text):
+    return f"<w:tc>{paragraph(text)}</w:tc>"
+
+
+def write_template(path):
+    # 不依赖python-docx，直接写出最小的docx结构
+    header = "<w:tr>" + "".join(cell(t) for t in ("序号", "参数名称", "招标要求", "投标响应", "偏离情况")) + "</w:tr>"
+    row = "<w:tr>" + cell("{{#each deviation_table}}{{@index}}") + cell("{{param_name}}") + cell("{{tender_value}}") + cell("{{our_value}}") + cell("{{deviation}}{{/each}}") + "</w:tr>"
+    body = (
+        paragraph("{{project.name}} 投标文件")
+        + paragraph("投标产品型号：{{product_model}}")
+        + f"<w:tbl>{header}{row}</w:tbl>"
+        + paragraph("{{#each sections}}")
+        + paragraph("{{title}}")
+        + paragraph("{{body}}")
+        + paragraph("{{/each}}")
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", '<?xml version="1.0" encoding="UTF-8"?><Types/>')
+        archive.writestr("word/document.xml", f'<?xml version="1.0" encoding="UTF-8"?><w:document {W_NS}><w:body>{body}</w:body></w:document>')
+        archive.writestr("word/footer1.xml", f"<w:ftr {W_NS}>{paragraph('{{project.name}}')}</w:ftr>")
+        # 模拟模板中的图片等二进制部件
+        archive.writestr("word/media/image1.png", os.urandom(2 * 1024 * 1024))
+
+
+def build_context(rows, sections):
+    # 行与章节用生成器提供，渲染时逐个消费
+    return {
+        "project": {"name": "某医院64排CT采购项目"},
+        "product_model": "uCT-760",
+        "deviation_table": (
+            {"param_name": f"参数{i}", "tender_value": f"≥{i}", "our_value": str(i + 1), "deviation": "正偏离"} for i in range(rows)
+        ),
+        "sections": (
+            {"title": f"第{i + 1}章 技术方案", "body": "本章说明设备配置、安装调试与售后服务方案。\n" * 30} for i in range(sections)
+        ),
+    }
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        template_path = os.path.join(workdir, "template.docx")
+        write_template(template_path)
+        cache = TemplateCache()
+        digest = file_sha256(template_path)
+
+        started = time.perf_counter()
+        compiled = cache.get("bench", digest, template_path)
+        compile_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        cache.get("bench", digest, template_path)
+        cached_ms = (time.perf_counter() - started) * 1000
+
+        renders = []
+        for i in range(args.repeat):
+            dest = os.path.join(workdir, f"bid_{i}.docx")
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = render_to_file(compiled, build_context(args.rows, args.sections), dest)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            renders.append({"seconds": round(elapsed, 3), "peak_memory_mb": round(peak / 1024 / 1024, 2), "output_mb": round(size / 1024 / 1024, 2)})
+            os.remove(dest)
+
+    print(f"模板编译 {compile_ms:.2f} ms，缓存命中 {cached_ms:.3f} ms，占位符 {compiled.placeholders}")
+    print(f"偏离表 {args.rows} 行，章节 {args.sections} 个")
+    for i, render in enumerate(renders, 1):
+        print(f"第{i}次渲染 {render['seconds']}s，峰值内存 {render['peak_memory_mb']} MB，输出 {render['output_mb']} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"rows": args.rows, "sections": args.sections, "compile_ms": round(compile_ms, 3), "cached_ms": round(cached_ms, 3), "renders": renders},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="投标模板渲染基准")
+    parser.add_argument("--rows", type=int, default=600, help="偏离表行数")
+    parser.add_argument("--sections", type=int, default=150, help="章节数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="结果JSON输出路径")
+    main(parser.parse_args())
@@ -0,0 +1,394 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+
+# 投标模板引擎：模板解析一次后编译为节点树并缓存（键为 模板ID + 内容哈希），渲染时逐段写入磁盘
+#
+# 占位符语法：
+#   {{project.name}}                   变量，按 . 逐级取字典键或对象属性
+#   {{#each deviation_table}} ... {{/each}}  循环；循环体内可直接引用元素字段，{{this}} 为元素本身，{{@index}} 为序号（从1开始）
+# Word模板(.docx)：开始/结束标签位于同一表格行时按行重复，否则按两个标签所在段落之间的内容重复（标签所在段落不输出）
+# 纯文本模板(.txt/.md)：按文本原样替换
+# Word模板直接按 zip 中的XML部件处理（不经 python-docx）：编译结果是字节片段，渲染时逐段写入输出zip，
+# 不需要把整份文档载入为对象树，样式、图片等其他部件原样复制
+
+TEMPLATE_EXTENSIONS = (".docx", ".txt", ".md")
+TAG_PATTERN = re.compile(r"\{\{\s*([#/]?)\s*([^{}]*?)\s*\}\}")
+TEXT_RUN_PATTERN = re.compile(r"<w:t(?:\s[^>]*)?>(.*?)</w:t>", re.S)
+# 需要编译的Word部件：正文、页眉、页脚
+DOCX_PARTS = re.compile(r"^word/(document|header\d*|footer\d*)\.xml$")
+WRITE_BUFFER_SIZE = 256 * 1024
+
+TEXT, VAR, EACH = 0, 1, 2
+
+# 未上传模板文件的历史模板记录使用的内置文本模板
+DEFAULT_TEMPLATE = """{{project.name}} 投标文件
+投标产品型号：{{product_model}}
+生成日期：{{date}}
+
+一、技术参数偏离表{{#each deviation_table}}
+{{@index}}. {{param_name}}｜招标要求：{{tender_value}}｜我方参数：{{our_value}}｜{{deviation}} {{remark}}{{/each}}
+正偏离 {{deviation_summary.positive}} 项，负偏离 {{deviation_summary.negative}} 项，无偏离 {{deviation_summary.no_deviation}} 项，需人工确认 {{deviation_summary.need_review}} 项
+
+二、资质文件{{#each qualifications}}
+{{@index}}. {{name}}（有效期至{{expiry_date}}）{{/each}}
+
+三、需人工确认事项{{#each need_review}}
+{{@index}}. {{section}}：{{reason}}{{/each}}
+"""
+
+
+class TemplateError(Exception):
+    pass
+
+
+class CompiledTemplate:
+    __slots__ = ("format", "source_path", "content_hash", "parts", "placeholders", "loops", "compile_seconds")
+
+    def __init__(self, fmt: str, source_path: str, content_hash: str):
+        self.format = fmt
+        self.source_path = source_path
+        self.content_hash = content_hash
+        # 部件名 -> 节点树；纯文本模板只有一个部件 ""
+        self.parts: Dict[str, list] = {}
+        self.placeholders: List[str] = []
+        self.loops: List[str] = []
+        self.compile_seconds = 0.0
+
+    def describe(self) -> Dict[str, Any]:
+        return {"format": self.format, "placeholders": self.placeholders, "loops": self.loops}
+
+
+def template_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if not ext:
+        # 内容寻址存储中的文件没有扩展名，按文件头判断（.docx为zip格式）
+        with open(path, "rb") as f:
+            return "docx" if f.read(4) == b"PK\x03\x04" else "text"
+    if ext not in TEMPLATE_EXTENSIONS:
+        raise TemplateError(f"不支持的模板格式：{ext or '无扩展名'}，支持：{', '.join(TEMPLATE_EXTENSIONS)}")
+    return "docx" if ext == ".docx" else "text"
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _merge_split_placeholders(xml: str) -> str:
+    # Word经常把一个占位符拆到多个<w:r>中；段落文本含占位符时把该段各文本片段合并到第一个片段
+    def merge(match: "re.Match") -> str:
+        paragraph = match.group(0)
+        if "{{" not in paragraph:
+            return paragraph
+        runs = TEXT_RUN_PATTERN.findall(paragraph)
+        if all(TAG_PATTERN.sub("", run).count("{") == 0 for run in runs):
+            return paragraph
+        text = "".join(runs)
+        first = [True]
+
+        def replace(run: "re.Match") -> str:
+            if first[0]:
+                first[0] = False
+                return f'<w:t xml:space="preserve">{text}</w:t>'
+            return "<w:t></w:t>"
+
+        return TEXT_RUN_PATTERN.sub(replace, paragraph)
+
+    return re.sub(r"<w:p[ >].*?</w:p>", merge, xml, flags=re.S)
+
+
+def _enclosing(xml: str, pos: int, tag: str) -> Optional[Tuple[int, int]]:
+    start = max(xml.rfind(f"<{tag}>", 0, pos), xml.rfind(f"<{tag} ", 0, pos))
+    if start < 0 or xml.rfind(f"</{tag}>", 0, pos) > start:
+        return None
+    end = xml.find(f"</{tag}>", pos)
+    return (start, end + len(tag) + 3) if end >= 0 else None
+
+
+def _pair_blocks(tags: List["re.Match"]) -> Dict[int, int]:
+    pairs: Dict[int, int] = {}
+    stack: List[int] = []
+    for i, tag in enumerate(tags):
+        if tag.group(1) == "#":
+            if not tag.group(2).startswith("each "):
+                raise TemplateError(f"不支持的模板标签：{tag.group(0)}")
+            stack.append(i)
+        elif tag.group(1) == "/":
+            if not stack:
+                raise TemplateError(f"多余的结束标签：{tag.group(0)}")
+            pairs[stack.pop()] = i
+    if stack:
+        raise TemplateError(f"缺少结束标签：{tags[stack[-1]].group(0)}")
+    return pairs
+
+
+def _tokenize(source: str, docx: bool) -> List[Tuple[int, int, Optional[Tuple[str, str]]]]:
+    # 返回按位置排序的编辑列表：(起点, 终点, 记号)，记号为 ("var"/"open"/"close", 路径) 或 None（删除）
+    tags = list(TAG_PATTERN.finditer(source))
+    pairs = _pair_blocks(tags)
+    edits = []
+    for i, tag in enumerate(tags):
+        kind, body = tag.group(1), tag.group(2)
+        if not kind:
+            edits.append((tag.start(), tag.end(), ("var", body)))
+            continue
+        if kind == "/":
+            continue
+        path = body[len("each "):].strip()
+        close = tags[pairs[i]]
+        if not docx:
+            edits.append((tag.start(), tag.end(), ("open", path)))
+            edits.append((close.start(), close.end(), ("close", path)))
+            continue
+        row = _enclosing(source, tag.start(), "w:tr")
+        if row is not None and close.start() < row[1]:
+            # 同一表格行：按行重复
+            edits.append((row[0], row[0], ("open", path)))
+            edits.append((tag.start(), tag.end(), None))
+            edits.append((close.start(), close.end(), None))
+            edits.append((row[1], row[1], ("close", path)))
+            continue
+        for target, token in ((tag, ("open", path)), (close, ("close", path))):
+            paragraph = _enclosing(source, target.start(), "w:p")
+            if paragraph is None:
+                raise TemplateError(f"无法定位标签所在段落：{target.group(0)}")
+            edits.append((paragraph[0], paragraph[1], token))
+    edits.sort(key=lambda e: (e[0], e[1]))
+    return edits
+
+
+def _build_tree(source: str, edits, encode) -> Tuple[list, List[str], List[str]]:
+    root: list = []
+    stack = [root]
+    placeholders: List[str] = []
+    loops: List[str] = []
+    cursor = 0
+    for start, end, token in edits:
+        if start < cursor:
+            # 与已处理的区间重叠（如与循环标签同段落的变量），随该段落一起丢弃
+            continue
+        if start > cursor:
+            stack[-1].append((TEXT, encode(source[cursor:start])))
+        cursor = end
+        if token is None:
+            continue
+        kind, path = token
+        if kind == "var":
+            stack[-1].append((VAR, path))
+            placeholders.append(path)
+        elif kind == "open":
+            node = (EACH, path, [])
+            stack[-1].append(node)
+            stack.append(node[2])
+            loops.append(path)
+        else:
+            stack.pop()
+    if cursor < len(source):
+        stack[-1].append((TEXT, encode(source[cursor:])))
+    return root, placeholders, loops
+
+
+def compile_template(path: str, content_hash: Optional[str] = None) -> CompiledTemplate:
+    started = time.perf_counter()
+    fmt = template_format(path)
+    compiled = CompiledTemplate(fmt, path, content_hash or file_sha256(path))
+    placeholders: List[str] = []
+    loops: List[str] = []
+    if fmt == "text":
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        compiled.parts[""], placeholders, loops = _build_tree(source, _tokenize(source, False), str.encode)
+    else:
+        try:
+            with zipfile.ZipFile(path) as archive:
+                for name in archive.namelist():
+                    if DOCX_PARTS.match(name):
+                        xml = _merge_split_placeholders(archive.read(name).decode("utf-8"))
+                        tree, names, blocks = _build_tree(xml, _tokenize(xml, True), str.encode)
+                        compiled.parts[name] = tree
+                        placeholders.extend(names)
+                        loops.extend(blocks)
+        except zipfile.BadZipFile:
+            raise TemplateError("Word模板文件已损坏或不是.docx格式")
+        if "word/document.xml" not in compiled.parts:
+            raise TemplateError("Word模板缺少正文(word/document.xml)")
+    compiled.placeholders = sorted(set(placeholders))
+    compiled.loops = sorted(set(loops))
+    compiled.compile_seconds = time.perf_counter() - started
+    return compiled
+
+
+def compile_text(source: str, name: str = "builtin") -> CompiledTemplate:
+    compiled = CompiledTemplate("text", "", name)
+    compiled.parts[""], placeholders, loops = _build_tree(source, _tokenize(source, False), str.encode)
+    compiled.placeholders = sorted(set(placeholders))
+    compiled.loops = sorted(set(loops))
+    return compiled
+
+
+def _lookup(scopes: Sequence[Any], path: str) -> Any:
+    if path == "this":
+        return scopes[-1]
+    head, _, rest = path.partition(".")
+    for scope in reversed(scopes):
+        value = _get(scope, head)
+        if value is not None:
+            break
+    else:
+        return None
+    for key in rest.split(".") if rest else ():
+        value = _get(value, key)
+        if value is None:
+            return None
+    return value
+
+
+def _get(obj: Any, key: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(key)
+    if isinstance(obj, (list, tuple)) and key.isdigit():
+        index = int(key)
+        return obj[index] if index < len(obj) else None
+    return getattr(obj, key, None) if not isinstance(obj, (str, bytes, int, float)) else None
+
+
+def _docx_value(value: Any) -> bytes:
+    # 换行转为Word换行符
+    text = escape(str(value))
+    return text.replace("\n", '</w:t><w:br/><w:t xml:space="preserve">').encode()
+
+
+def _text_value(value: Any) -> bytes:
+    return str(value).encode()
+
+
+def _render_nodes(nodes: list, scopes: List[Any], encode) -> Iterator[bytes]:
+    for node in nodes:
+        kind = node[0]
+        if kind == TEXT:
+            yield node[1]
+        elif kind == VAR:
+            value = _lookup(scopes, node[1])
+            if value is not None:
+                yield encode(value)
+        else:
+            items = _lookup(scopes, node[1])
+            if not items or isinstance(items, (str, bytes, dict)):
+                continue
+            for index, item in enumerate(items, 1):
+                scopes.append({"@index": index})
+                scopes.append(item)
+                yield from _render_nodes(node[2], scopes, encode)
+                del scopes[-2:]
+
+
+def render_chunks(compiled: CompiledTemplate, part: str, context: Dict[str, Any]) -> Iterator[bytes]:
+    # 逐段产出渲染结果，按 WRITE_BUFFER_SIZE 合并小片段
+    encode = _docx_value if compiled.format == "docx" else _text_value
+    buffer: List[bytes] = []
+    size = 0
+    for chunk in _render_nodes(compiled.parts[part], [context], encode):
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def render_to_file(compiled: CompiledTemplate, context: Dict[str, Any], dest: str) -> int:
+    # 先写临时文件再原子替换；Word模板中未编译的部件（样式、图片等）按块复制
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp_path = f"{dest}.tmp"
+    try:
+        if compiled.format == "text":
+            with open(tmp_path, "wb") as out:
+                for chunk in render_chunks(compiled, "", context):
+                    out.write(chunk)
+        else:
+            with zipfile.ZipFile(compiled.source_path) as src, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+                for info in src.infolist():
+                    target = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    target.compress_type = zipfile.ZIP_DEFLATED
+                    target.external_attr = info.external_attr
+                    with dst.open(target, "w", force_zip64=True) as out:
+                        if info.filename in compiled.parts:
+                            for chunk in render_chunks(compiled, info.filename, context):
+                                out.write(chunk)
+                        else:
+                            with src.open(info) as part:
+                                shutil.copyfileobj(part, out, WRITE_BUFFER_SIZE)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return os.path.getsize(dest)
+
+
+class TemplateCache:
+    # 编译结果的LRU缓存，在线程池中调用；同一模板并发首次使用时只编译一次
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._compiling: Dict[Tuple[str, str], threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._compile_seconds = 0.0
+
+    def get(self, template_id: str, content_hash: str, path: str) -> CompiledTemplate:
+        key = (template_id, content_hash)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return compiled
+            key_lock = self._compiling.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                compiled = self._entries.get(key)
+                if compiled is not None:
+                    self._hits += 1
+                    return compiled
+            compiled = compile_template(path, content_hash)
+            with self._lock:
+                self._misses += 1
+                self._compile_seconds += compiled.compile_seconds
+                # 模板内容变化后旧版本的编译结果不再使用
+                for stale in [k for k in self._entries if k[0] == template_id]:
+                    del self._entries[stale]
+                self._entries[key] = compiled
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._compiling.pop(key, None)
+        return compiled
+
+    def invalidate(self, template_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == template_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "compile_seconds_total": round(self._compile_seconds, 3),
+            }
@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+
+# 内容寻址文件存储：文件按内容SHA-256存放，同一文件被不同用户重复上传时只保存一份
+# 上传时边接收边计算哈希并写入临时文件，完成后按哈希原子落盘；已存在则丢弃临时文件（去重）
+# 本地实现直接存放在文件系统；S3实现（兼容MinIO等本地替代）在本地保留只读缓存，供解析、模板编译等需要本地路径的场景使用
+# 存储层不做引用计数：业务记录删除后，未被引用且超过宽限期的文件由 gc 清理；重复上传会刷新修改时间，避免刚复用的文件被清理
+
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class BlobInfo:
+    __slots__ = ("digest", "size", "created")
+
+    def __init__(self, digest: str, size: int, created: bool):
+        self.digest = digest
+        self.size = size
+        # False 表示内容已存在（去重命中）
+        self.created = created
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._puts_total = 0
+        self._dedup_hits = 0
+        self._bytes_written = 0
+        self._bytes_deduplicated = 0
+
+    def relative_path(self, digest: str) -> str:
+        # 两级目录分散文件，避免单目录文件过多
+        return f"sha256/{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, *self.relative_path(digest).split("/"))
+
+    def temp_path(self) -> str:
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    async def put(self, chunks: AsyncIterator[bytes], max_size: Optional[int] = None) -> BlobInfo:
+        loop = asyncio.get_running_loop()
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.temp_path()
+
+        def write(f, chunk: bytes) -> None:
+            # 哈希与写盘放在同一次线程池调用中；hashlib处理大块数据时释放GIL
+            digest.update(chunk)
+            f.write(chunk)
+
+        try:
+            with open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise BlobTooLarge(max_size)
+                    await loop.run_in_executor(None, write, f, chunk)
+            return await self._finish(tmp_path, digest.hexdigest(), size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def put_file(self, path: str) -> BlobInfo:
+        # 把已生成的本地文件（如渲染好的标书）移入存储，调用后原文件不再存在
+        loop = asyncio.get_running_loop()
+        try:
+            digest = await loop.run_in_executor(None, _file_sha256, path)
+            return await self._finish(path, digest, os.path.getsize(path))
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def _finish(self, tmp_path: str, digest: str, size: int) -> BlobInfo:
+        created = await self._commit(tmp_path, digest)
+        self._puts_total += 1
+        if created:
+            self._bytes_written += size
+        else:
+            self._dedup_hits += 1
+            self._bytes_deduplicated += size
+        return BlobInfo(digest, size, created)
+
+    async def _commit(self, tmp_path: str, digest: str) -> bool:
+        raise NotImplementedError
+
+    async def local_path(self, digest: str) -> str:
+        raise NotImplementedError
+
+    async def download_url(self, digest: str, filename: str) -> Optional[str]:
+        # 可直接重定向下载的地址（如S3预签名URL）；本地存储返回None，由应用自行发送文件
+        return None
+
+    async def list_blobs(self) -> List[Tuple[str, int, float]]:
+        # [(哈希, 大小, 最后写入时间)]
+        raise NotImplementedError
+
+    async def delete(self, digest: str) -> None:
+        raise NotImplementedError
+
+    async def gc(self, referenced: set, grace_seconds: float = 3600) -> Dict[str, int]:
+        # 删除未被引用且超过宽限期的文件；宽限期内的文件可能正被并发上传复用
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        for digest, size, mtime in await self.list_blobs():
+            if digest in referenced or mtime > cutoff:
+                continue
+            await self.delete(digest)
+            removed += 1
+            freed += size
+        return {"removed": removed, "freed_bytes": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "puts_total": self._puts_total,
+            "dedup_hits": self._dedup_hits,
+            "bytes_written": self._bytes_written,
+            "bytes_deduplicated": self._bytes_deduplicated,
+        }
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(WRITE_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LocalBlobStore(BlobStore):
+    name = "local"
+
+    async def _commit(self, tmp_path: str, digest: str) -> bool:
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            os.utime(path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 同一文件并发上传时 os.replace 保证最终只有一份完整内容
+        os.replace(tmp_path, path)
+        return True
+
+    async def local_path(self, digest: str) -> str:
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            raise FileNotFoundError(digest)
+        return path
+
+    async def list_blobs(self) -> List[Tuple[str, int, float]]:
+        def scan():
+            result = []
+            for directory, _, names in os.walk(os.path.join(self.root, "sha256")):
+                for name in names:
+                    stat = os.stat(os.path.join(directory, name))
+                    result.append((name, stat.st_size, stat.st_mtime))
+            return result
+
+        return await asyncio.get_running_loop().run_in_executor(None, scan)
+
+    async def delete(self, digest: str) -> None:
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class S3BlobStore(BlobStore):
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str, cache_dir: str, endpoint_url: Optional[str] = None, presign_seconds: int = 300):
+        import boto3
+
+        super().__init__(cache_dir)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presign_seconds = presign_seconds
+        self._client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def key(self, digest: str) -> str:
+        path = self.relative_path(digest)
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    async def _call(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: func(*args, **kwargs))
+
+    async def _exists(self, digest: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await self._call(self._client.head_object, Bucket=self.bucket, Key=self.key(digest))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def _commit(self, tmp_path: str, digest: str) -> bool:
+        key = self.key(digest)
+        created = not await self._exists(digest)
+        if created:
+            # upload_file 对大文件自动分段并发上传
+            await self._call(self._client.upload_file, tmp_path, self.bucket, key)
+        else:
+            # 原地复制以刷新最后修改时间
+            await self._call(
+                self._client.copy_object,
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE",
+            )
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return created
+
+    async def local_path(self, digest: str) -> str:
+        # 内容寻址，本地缓存永不过期
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            return path
+        tmp_path = self.temp_path()
+        try:
+            await self._call(self._client.download_file, self.bucket, self.key(digest), tmp_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    async def download_url(self, digest: str, filename: str) -> Optional[str]:
+        return await self._call(
+            self._client.generate_presigned_url,
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.key(digest),
+                "ResponseContentDisposition": f"attachment; filename*=utf-8''{quote(filename)}",
+            },
+            ExpiresIn=self.presign_seconds,
+        )
+
+    async def list_blobs(self) -> List[Tuple[str, int, float]]:
+        def scan():
+            result = []
+            paginator = self._client.get_paginator("list_objects_v2")
+            prefix = f"{self.prefix}/sha256/" if self.prefix else "sha256/"
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                for item in page.get("Contents", []):
+                    result.append((item["Key"].rsplit("/", 1)[-1], item["Size"], item["LastModified"].timestamp()))
+            return result
+
+        return await asyncio.get_running_loop().run_in_executor(None, scan)
+
+    async def delete(self, digest: str) -> None:
+        await self._call(self._client.delete_object, Bucket=self.bucket, Key=self.key(digest))
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def create_blob_store(url: Optional[str], root: str, endpoint_url: Optional[str] = None) -> BlobStore:
+    # s3://bucket/prefix 使用S3兼容存储（endpoint_url 指向MinIO等），否则使用本地目录 root
+    if url and url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://"):].partition("/")
+        return S3BlobStore(bucket, prefix, os.path.join(root, "cache"), endpoint_url)
+    return LocalBlobStore(root)
@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# 异步数据库访问层：asyncpg连接池（有界）+ 预编译语句缓存 + 连接池健康指标
+
+
+# 当前任务所在事务的连接；事务内的查询都走这个连接
+_transaction_conn: contextvars.ContextVar = contextvars.ContextVar("db_transaction_conn", default=None)
+
+
+class PoolTimeoutError(Exception):
+    # 在 acquire_timeout 内未能取得连接
+    pass
+
+
+class Database:
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 2,
+        max_size: int = 20,
+        acquire_timeout: float = 10.0,
+        statement_cache_size: int = 512,
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.statement_cache_size = statement_cache_size
+        self._pool: Any = None
+        # 连接池指标
+        self._waiting = 0
+        self._in_use = 0
+        self._acquired_total = 0
+        self._timeouts_total = 0
+        self._errors_total = 0
+        self._queries_total = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._query_seconds_total = 0.0
+
+    async def connect(self, pool: Any = None) -> None:
+        # pool参数用于注入兼容asyncpg.Pool接口的替身（压测使用）
+        if self._pool is not None:
+            return
+        if pool is not None:
+            self._pool = pool
+            return
+        import asyncpg
+
+        # asyncpg会在每个连接上缓存预编译语句，相同SQL只在首次执行时PREPARE
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size,
+        )
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._pool is None:
+            raise RuntimeError("数据库连接池尚未初始化")
+        self._waiting += 1
+        started = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(self._pool.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts_total += 1
+            raise PoolTimeoutError(f"{self.acquire_timeout}s内未获取到数据库连接")
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - started
+        self._acquired_total += 1
+        self._wait_seconds_total += waited
+        self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        self._in_use += 1
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            await self._pool.release(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        # 事务内通过仓储发出的所有语句在同一连接上执行，任一语句失败整体回滚；嵌套时复用外层事务
+        conn = _transaction_conn.get()
+        if conn is not None:
+            yield conn
+            return
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                token = _transaction_conn.set(conn)
+                try:
+                    yield conn
+                finally:
+                    _transaction_conn.reset(token)
+
+    @asynccontextmanager
+    async def _connection(self):
+        conn = _transaction_conn.get()
+        if conn is not None:
+            yield conn
+            return
+        async with self.acquire() as conn:
+            yield conn
+
+    async def _query(self, method: str, sql: str, args: Sequence[Any]) -> Any:
+        async with self._connection() as conn:
+            started = time.perf_counter()
+            try:
+                return await getattr(conn, method)(sql, *args)
+            except Exception:
+                self._errors_total += 1
+                raise
+            finally:
+                self._queries_total += 1
+                self._query_seconds_total += time.perf_counter() - started
+
+    async def fetch(self, sql: str, *args: Any) -> List[Any]:
+        return await self._query("fetch", sql, args)
+
+    async def fetchrow(self, sql: str, *args: Any) -> Optional[Any]:
+        return await self._query("fetchrow", sql, args)
+
+    async def execute(self, sql: str, *args: Any) -> str:
+        return await self._query("execute", sql, args)
+
+    async def executemany(self, sql: str, args: Sequence[Sequence[Any]]) -> None:
+        async with self._connection() as conn:
+            started = time.perf_counter()
+            try:
+                await conn.executemany(sql, args)
+            except Exception:
+                self._errors_total += 1
+                raise
+            finally:
+                self._queries_total += 1
+                self._query_seconds_total += time.perf_counter() - started
+
+    async def copy_records(self, table: str, columns: Sequence[str], records: Sequence[Sequence[Any]]) -> None:
+        # COPY 二进制协议批量写入，用于只追加的大表（操作日志）
+        async with self._connection() as conn:
+            started = time.perf_counter()
+            try:
+                await conn.copy_records_to_table(table, records=records, columns=list(columns))
+            except Exception:
+                self._errors_total += 1
+                raise
+            finally:
+                self._queries_total += 1
+                self._query_seconds_total += time.perf_counter() - started
+
+    def metrics(self) -> Dict[str, Any]:
+        pool = self._pool
+        size = pool.get_size() if pool is not None else 0
+        idle = pool.get_idle_size() if pool is not None else 0
+        acquired = self._acquired_total
+        return {
+            "connected": pool is not None,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "acquired_total": acquired,
+            "timeouts_total": self._timeouts_total,
+            "errors_total": self._errors_total,
+            "queries_total": self._queries_total,
+            "avg_wait_ms": round(self._wait_seconds_total / acquired * 1000, 3) if acquired else 0.0,
+            "max_wait_ms": round(self._wait_seconds_max * 1000, 3),
+            "avg_query_ms": round(self._query_seconds_total / self._queries_total * 1000, 3) if self._queries_total else 0.0,
+        }
@@ -0,0 +1,329 @@
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 技术偏离表引擎：解析招标参数(参数名, 运算符, 目标值)与产品参数，统一单位后
+# 将整份招标参数表与全部候选型号一次性做NumPy向量化比对
+
+
+# 单位 -> (量纲, 换算到基准单位的系数)
+UNIT_TABLE: Dict[str, Tuple[str, float]] = {
+    # 速度（基准 mm/s）
+    "mm/s": ("speed", 1.0),
+    "cm/s": ("speed", 10.0),
+    "m/s": ("speed", 1000.0),
+    # 长度（基准 mm）
+    "μm": ("length", 0.001),
+    "um": ("length", 0.001),
+    "mm": ("length", 1.0),
+    "cm": ("length", 10.0),
+    "m": ("length", 1000.0),
+    "米": ("length", 1000.0),
+    "厘米": ("length", 10.0),
+    "毫米": ("length", 1.0),
+    # 功率（基准 kW）；mW/MW 大小写含义不同，见 PREFIXED_UNITS
+    "w": ("power", 0.001),
+    "kw": ("power", 1.0),
+    "瓦": ("power", 0.001),
+    "千瓦": ("power", 1.0),
+    # 频率（基准 Hz）
+    "hz": ("frequency", 1.0),
+    "khz": ("frequency", 1e3),
+    "mhz": ("frequency", 1e6),
+    "ghz": ("frequency", 1e9),
+    # 热容量（基准 MHU）
+    "hu": ("heat", 1e-6),
+    "khu": ("heat", 0.001),
+    "mhu": ("heat", 1.0),
+    # 时间（基准 s）
+    "ms": ("time", 0.001),
+    "s": ("time", 1.0),
+    "秒": ("time", 1.0),
+    "min": ("time", 60.0),
+    "分钟": ("time", 60.0),
+    "h": ("time", 3600.0),
+    "小时": ("time", 3600.0),
+    "天": ("time", 86400.0),
+    "年": ("time", 31536000.0),
+    # 电压/电流
+    "kv": ("voltage", 1.0),
+    "v": ("voltage", 0.001),
+    "ma": ("current", 1.0),
+    "a": ("current", 1000.0),
+    # 磁场强度（基准 T）
+    "t": ("field", 1.0),
+    "mt": ("field", 0.001),
+    # 重量（基准 kg）
+    "g": ("mass", 0.001),
+    "kg": ("mass", 1.0),
+    "吨": ("mass", 1000.0),
+    # 其他
+    "db": ("decibel", 1.0),
+    "%": ("percent", 1.0),
+    "lp/cm": ("resolution", 1.0),
+    "排": ("rows", 1.0),
+    "层": ("rows", 1.0),
+    "通道": ("channels", 1.0),
+    "幅": ("images", 1.0),
+    "幅/秒": ("frame_rate", 1.0),
+    "帧/秒": ("frame_rate", 1.0),
+    "fps": ("frame_rate", 1.0),
+    "": ("scalar", 1.0),
+}
+# 大小写决定SI前缀（m=毫，M=兆）的单位，按原样匹配；其余大小写写法（如 mw、Mw）无法判断，按未登记单位处理
+PREFIXED_UNITS: Dict[str, Tuple[str, float]] = {
+    "mW": ("power", 1e-6),
+    "MW": ("power", 1e3),
+}
+AMBIGUOUS_UNITS = {unit.lower() for unit in PREFIXED_UNITS}
+
+# 运算符编码
+OP_GE, OP_GT, OP_LE, OP_LT, OP_EQ, OP_RANGE = range(6)
+OPERATOR_CODES = {">=": OP_GE, "≥": OP_GE, ">": OP_GT, "<=": OP_LE, "≤": OP_LE, "<": OP_LT, "=": OP_EQ}
+OPERATOR_DISPLAY = {">=": "≥", "<=": "≤"}
+# 文字运算符（rfp_parser已归一化，此处兼容手工录入）
+TEXT_OPERATORS = [
+    ("不低于", ">="), ("不少于", ">="), ("不小于", ">="), ("大于等于", ">="), ("及以上", ">="), ("以上", ">="),
+    ("不高于", "<="), ("不大于", "<="), ("不超过", "<="), ("小于等于", "<="), ("及以下", "<="), ("以下", "<="),
+]
+
+# 偏离结果编码
+POSITIVE, NONE, NEGATIVE, REVIEW, MISSING = 1, 0, -1, 2, 3
+DEVIATION_LABELS = {POSITIVE: "正偏离", NONE: "无偏离", NEGATIVE: "负偏离", REVIEW: "需人工确认", MISSING: "需人工确认"}
+DEVIATION_REMARKS = {REVIEW: "参数值无法解析或单位不一致", MISSING: "产品库中未找到对应参数"}
+
+NUMBER = r"[-+]?\d+(?:\.\d+)?"
+QUANTITY_PATTERN = re.compile(rf"(?P<num>{NUMBER})\s*(?P<unit>[A-Za-zμ%/]+(?:/[A-Za-z]+)?|[一-龥]+(?:/[一-龥]+)?)?")
+RANGE_PATTERN = re.compile(
+    rf"(?P<low>{NUMBER})\s*(?P<low_unit>[A-Za-zμ]+(?:/[A-Za-z]+)?)?\s*(?:~|～|-|—|至|到)\s*(?P<high>{NUMBER})\s*(?P<unit>\S*)"
+)
+LEADING_OPERATOR = re.compile(r"^\s*(>=|<=|≥|≤|>|<|=)")
+NAME_NOISE = re.compile(r"[\s★▲*（）()【】\[\]:：,，、.。]")
+
+# 相对误差容限：认为两个数值相等
+EQUAL_TOLERANCE = 1e-6
+
+
+def normalize_param_name(name: str) -> str:
+    return NAME_NOISE.sub("", name).lower()
+
+
+UNIT_PREFIXES = sorted((unit for unit in UNIT_TABLE if unit), key=len, reverse=True)
+ASCII_LETTER = re.compile(r"[a-z]")
+
+
+def resolve_unit(unit: str) -> Tuple[str, float]:
+    unit = (unit or "").strip()
+    if unit in PREFIXED_UNITS:
+        return PREFIXED_UNITS[unit]
+    key = unit.lower()
+    if key in UNIT_TABLE and key not in AMBIGUOUS_UNITS:
+        return UNIT_TABLE[key]
+    # 去掉“排数”“层数”之类的中文后缀，例如 “64排/128层”；字母后缀不截断（mw 不能当作 m）
+    for candidate in UNIT_PREFIXES:
+        if key.startswith(candidate) and key not in AMBIGUOUS_UNITS and not ASCII_LETTER.search(key[len(candidate):]):
+            return UNIT_TABLE[candidate]
+    # 未登记的单位按自身作为量纲，只能与同单位比较
+    return (f"unit:{key}", 1.0)
+
+
+@lru_cache(maxsize=65536)
+def parse_quantity(text: str) -> Optional[Tuple[float, str]]:
+    # 返回 (基准单位下的数值, 量纲)
+    match = QUANTITY_PATTERN.search(text or "")
+    if not match:
+        return None
+    dim, factor = resolve_unit(match.group("unit") or "")
+    return float(match.group("num")) * factor, dim
+
+
+@lru_cache(maxsize=65536)
+def parse_requirement(operator: str, value: str) -> Optional[Tuple[int, float, float, str]]:
+    # 返回 (运算符编码, 下限, 上限, 量纲)；单值要求的上下限相同
+    # 范围（0.5~10mm）优先于运算符识别，招标文件中常写作“=0.5~10mm”；缺少运算符时无法判定，返回None交人工确认
+    value = (value or "").strip()
+    operator = (operator or "").strip()
+    leading = LEADING_OPERATOR.match(value)
+    if leading:
+        operator = operator or leading.group(1)
+        value = value[leading.end():]
+    for word, symbol in TEXT_OPERATORS:
+        if word in value:
+            operator = operator or symbol
+            value = value.replace(word, "")
+    range_match = RANGE_PATTERN.search(value)
+    if range_match:
+        # 上下限可各自带单位（0.5mm~1cm），只写一个单位时两端共用
+        high_unit = range_match.group("unit") or range_match.group("low_unit") or ""
+        dim, factor = resolve_unit(high_unit)
+        low_dim, low_factor = resolve_unit(range_match.group("low_unit") or high_unit)
+        if low_dim != dim:
+            return None
+        low, high = float(range_match.group("low")) * low_factor, float(range_match.group("high")) * factor
+        return OP_RANGE, min(low, high), max(low, high), dim
+    quantity = parse_quantity(value)
+    if quantity is None or operator not in OPERATOR_CODES:
+        return None
+    number, dim = quantity
+    return OPERATOR_CODES[operator], number, number, dim
+
+
+class DeviationEngine:
+    # 由一个公司的产品参数构建，可复用于多份招标文件；支持增量增删产品参数
+    # name_key 将参数名映射为比对键（默认仅规范化，spec_index 中会叠加同义词解析）
+
+    def __init__(self, specs: Iterable = (), name_key: Callable[[str], str] = normalize_param_name):
+        self.name_key = name_key
+        self.models: List[str] = []
+        self._model_index: Dict[str, int] = {}
+        self._model_specs: Dict[int, int] = {}
+        self._next_row = 0
+        # 比对键 -> {型号序号: (基准数值, 量纲, 原始值, 参数ID)}
+        self._catalogue: Dict[str, Dict[int, Tuple[float, str, str, Optional[str]]]] = {}
+        for spec in specs:
+            self.add_spec(spec)
+
+    def add_spec(self, spec) -> str:
+        row = self._model_index.get(spec.product_model)
+        if row is None:
+            # 型号序号只增不复用，删除型号不影响其他型号的条目
+            row = self._model_index[spec.product_model] = self._next_row
+            self._next_row += 1
+            self.models.append(spec.product_model)
+        quantity = parse_quantity(spec.param_value)
+        number, dim = quantity if quantity else (np.nan, "")
+        key = self.name_key(spec.param_name)
+        entries = self._catalogue.setdefault(key, {})
+        if row not in entries:
+            self._model_specs[row] = self._model_specs.get(row, 0) + 1
+        entries[row] = (number, dim, spec.param_value, getattr(spec, "id", None))
+        return key
+
+    def remove_spec(self, spec) -> None:
+        row = self._model_index.get(spec.product_model)
+        entries = self._catalogue.get(self.name_key(spec.param_name))
+        if row is None or not entries or row not in entries:
+            return
+        # 同一比对键可能被别名覆盖，只删除由该参数写入的条目
+        if entries[row][3] not in (None, getattr(spec, "id", None)):
+            return
+        del entries[row]
+        if not entries:
+            del self._catalogue[self.name_key(spec.param_name)]
+        self._model_specs[row] -= 1
+        if not self._model_specs[row]:
+            del self._model_specs[row]
+            del self._model_index[spec.product_model]
+            self.models.remove(spec.product_model)
+
+    def lookup(self, product_model: str, param_name: str) -> Optional[Tuple[float, str, str, Optional[str]]]:
+        row = self._model_index.get(product_model)
+        if row is None:
+            return None
+        return self._catalogue.get(self.name_key(param_name), {}).get(row)
+
+    def compare(
+        self,
+        requirements: Sequence[Tuple[str, str, str]],
+        product_models: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Dict]:
+        # requirements: [(参数名, 运算符, 招标值)]，返回 {型号: {"table": [...], "deviation_summary": {...}}}
+        models = list(product_models) if product_models else list(self.models)
+        model_rows = [self._model_index[m] for m in models]
+        dims: Dict[str, int] = {}
+
+        count = len(requirements)
+        ops = np.full(count, -1, dtype=np.int8)
+        lows = np.full(count, np.nan)
+        highs = np.full(count, np.nan)
+        tender_dims = np.full(count, -1, dtype=np.int32)
+        ours = np.full((len(models), count), np.nan)
+        our_dims = np.full((len(models), count), -2, dtype=np.int32)
+        found = np.zeros((len(models), count), dtype=bool)
+        our_raw: List[List[str]] = [[""] * count for _ in models]
+
+        for j, (name, operator, value) in enumerate(requirements):
+            parsed = parse_requirement(operator, value)
+            if parsed:
+                ops[j], lows[j], highs[j] = parsed[0], parsed[1], parsed[2]
+                tender_dims[j] = dims.setdefault(parsed[3], len(dims))
+            entries = self._catalogue.get(self.name_key(name), {})
+            for i, row in enumerate(model_rows):
+                entry = entries.get(row)
+                if entry is None:
+                    continue
+                found[i, j] = True
+                ours[i, j] = entry[0]
+                our_dims[i, j] = dims.setdefault(entry[1], len(dims)) if entry[1] else -2
+                our_raw[i][j] = entry[2]
+
+        # 向量化判定：(型号数, 参数数) 矩阵一次完成
+        comparable = found & (ops >= 0) & (our_dims == tender_dims) & ~np.isnan(ours)
+        scale = np.maximum(np.abs(lows), 1.0) * EQUAL_TOLERANCE
+        equal = np.abs(ours - lows) <= scale
+        higher = ours > lows + scale
+        lower = ours < lows - scale
+        within = (ours >= lows - scale) & (ours <= highs + scale)
+        with np.errstate(invalid="ignore"):
+            result = np.select(
+                [
+                    ops == OP_GE,
+                    ops == OP_GT,
+                    ops == OP_LE,
+                    ops == OP_LT,
+                    ops == OP_EQ,
+                    ops == OP_RANGE,
+                ],
+                [
+                    np.where(higher, POSITIVE, np.where(equal, NONE, NEGATIVE)),
+                    np.where(higher, POSITIVE, NEGATIVE),
+                    np.where(lower, POSITIVE, np.where(equal, NONE, NEGATIVE)),
+                    np.where(lower, POSITIVE, NEGATIVE),
+                    np.where(equal, NONE, NEGATIVE),
+                    np.where(within, NONE, NEGATIVE),
+                ],
+                default=REVIEW,
+            )
+        result = np.where(comparable, result, np.where(found, REVIEW, MISSING))
+
+        output = {}
+        for i, model in enumerate(models):
+            codes = result[i]
+            table = []
+            for j, (name, operator, value) in enumerate(requirements):
+                code = int(codes[j])
+                table.append({
+                    "param_name": name,
+                    "tender_value": f"{OPERATOR_DISPLAY.get(operator, operator)}{value}",
+                    "our_value": our_raw[i][j],
+                    "deviation": DEVIATION_LABELS[code],
+                    "remark": DEVIATION_REMARKS.get(code, ""),
+                })
+            output[model] = {
+                "table": table,
+                "deviation_summary": {
+                    "positive": int(np.count_nonzero(codes == POSITIVE)),
+                    "negative": int(np.count_nonzero(codes == NEGATIVE)),
+                    "no_deviation": int(np.count_nonzero(codes == NONE)),
+                    "need_review": int(np.count_nonzero(codes >= REVIEW)),
+                    "total": count,
+                },
+            }
+        return output
+
+    @staticmethod
+    def best_model(results: Dict[str, Dict]) -> Optional[str]:
+        # 负偏离最少、需人工确认最少、正偏离最多的型号
+        if not results:
+            return None
+        return min(
+            results,
+            key=lambda m: (
+                results[m]["deviation_summary"]["negative"],
+                results[m]["deviation_summary"]["need_review"],
+                -results[m]["deviation_summary"]["positive"],
+            ),
+        )
@@ -0,0 +1,85 @@
+import threading
+import unicodedata
+import zlib
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+# 文本向量化后端（在线程池中调用，输出L2归一化的float32矩阵）
+#   hash   - 确定性桩实现：字符n-gram特征哈希，不加载模型，用于测试与开发
+#   bge-m3 - 本地 BGE-M3 模型（需安装 FlagEmbedding），输出1024维稠密向量
+
+
+class Embedder:
+    name = ""
+    dim = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+
+class HashEmbedder(Embedder):
+    # 相同文本总是得到相同向量，字面相近的文本向量也相近
+    name = "hash"
+
+    def __init__(self, dim: int = 1024, ngram: int = 2):
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = "".join(unicodedata.normalize("NFKC", text).lower().split())
+        for n in range(1, self.ngram + 1):
+            for i in range(len(text) - n + 1):
+                h = zlib.crc32(text[i: i + n].encode())
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vector
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return self._normalize(np.stack([self._features(t) for t in texts]))
+
+
+class BGEM3Embedder(Embedder):
+    name = "bge-m3"
+    dim = 1024
+
+    def __init__(self, model_path: str = "BAAI/bge-m3", device: Optional[str] = None, batch_size: int = 32, max_length: int = 512):
+        self.model_path = model_path
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # 首次调用时加载模型，避免拖慢服务启动
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from FlagEmbedding import BGEM3FlagModel
+
+                    self._model = BGEM3FlagModel(self.model_path, use_fp16=self.device != "cpu", device=self.device)
+        return self._model
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        output = self._load().encode(list(texts), batch_size=self.batch_size, max_length=self.max_length)
+        return self._normalize(np.asarray(output["dense_vecs"], dtype=np.float32))
+
+
+def create_embedder(backend: str = "hash", dim: int = 1024, model_path: Optional[str] = None, device: Optional[str] = None) -> Embedder:
+    if backend == "bge-m3":
+        return BGEM3Embedder(model_path or "BAAI/bge-m3", device=device)
+    if backend == "hash":
+        return HashEmbedder(dim)
+    raise ValueError(f"不支持的向量化后端：{backend}，有效值为：hash, bge-m3")
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# 知识库向量的行外存储：每个租户一个内存映射(memmap)文件，切片行中只保存偏移量
+# 支持 float32 / float16 / int8（按行对称量化，另存每行缩放系数）
+# 进程启动时只需映射文件，按需缺页读入，无需反序列化
+# 元数据（已用行数、空闲行）在每次分配和释放后立即写入：进程被强制终止后重启，
+# 不会把仍被切片行引用的偏移量再次分配出去
+# 注意：向量索引（vector_index.VectorIndex）检索时另持有一份float32归一化副本，
+# 这里降低的是切片行与向量文件的占用，索引本身的内存仍与 行数×维度×4字节 成正比
+
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+
+class EmbeddingArena:
+    def __init__(self, path: str, dim: int, dtype: str = "float32", capacity: int = 1024):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"不支持的向量存储类型：{dtype}，有效值为：{', '.join(SUPPORTED_DTYPES)}")
+        self.path = path
+        self.dim = dim
+        self.dtype = dtype
+        self.capacity = 0
+        self.size = 0
+        self._free: List[int] = []
+        self._data: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._lock = threading.RLock()
+        if os.path.exists(self._meta_path):
+            self._load_meta()
+            self._map(self.capacity)
+        else:
+            self._map(capacity)
+
+    @property
+    def _data_path(self) -> str:
+        return f"{self.path}.{self.dtype}.bin"
+
+    @property
+    def _scale_path(self) -> str:
+        return f"{self.path}.scale.bin"
+
+    @property
+    def _meta_path(self) -> str:
+        return f"{self.path}.json"
+
+    def _load_meta(self) -> None:
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim or meta["dtype"] != self.dtype:
+            raise ValueError(f"向量存储文件 {self._data_path} 的维度或类型与配置不一致")
+        self.capacity = meta["capacity"]
+        self.size = meta["size"]
+        self._free = meta["free"]
+
+    def _map(self, capacity: int) -> None:
+        # 扩展文件长度后重新映射，已有数据保持不变
+        if self._data is not None:
+            self._data.flush()
+        itemsize = np.dtype(self.dtype).itemsize
+        self._resize_file(self._data_path, capacity * self.dim * itemsize)
+        self._data = np.memmap(self._data_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+        if self.dtype == "int8":
+            if self._scales is not None:
+                self._scales.flush()
+            self._resize_file(self._scale_path, capacity * 4)
+            self._scales = np.memmap(self._scale_path, dtype=np.float32, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    @staticmethod
+    def _resize_file(path: str, length: int) -> None:
+        with open(path, "ab") as f:
+            if f.tell() < length:
+                f.truncate(length)
+
+    def _encode(self, matrix: np.ndarray) -> np.ndarray:
+        if self.dtype == "int8":
+            return np.clip(np.rint(matrix / self._row_scales(matrix)[:, None]), -127, 127).astype(np.int8)
+        return matrix.astype(self.dtype)
+
+    @staticmethod
+    def _row_scales(matrix: np.ndarray) -> np.ndarray:
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return scales.astype(np.float32)
+
+    def append(self, vectors: Sequence[Sequence[float]]) -> List[int]:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"向量维度应为{self.dim}，实际为{matrix.shape[1]}")
+        with self._lock:
+            offsets = []
+            while self._free and len(offsets) < len(matrix):
+                offsets.append(self._free.pop())
+            fresh = len(matrix) - len(offsets)
+            if self.size + fresh > self.capacity:
+                capacity = self.capacity
+                while capacity < self.size + fresh:
+                    capacity *= 2
+                self._map(capacity)
+            offsets.extend(range(self.size, self.size + fresh))
+            self.size += fresh
+            rows = np.asarray(offsets, dtype=np.int64)
+            self._data[rows] = self._encode(matrix)
+            if self.dtype == "int8":
+                self._scales[rows] = self._row_scales(matrix)
+            self._save_meta()
+            return offsets
+
+    def get_many(self, offsets: Sequence[int]) -> np.ndarray:
+        rows = np.asarray(offsets, dtype=np.int64)
+        with self._lock:
+            data = np.asarray(self._data[rows], dtype=np.float32)
+            if self.dtype == "int8":
+                data *= self._scales[rows][:, None]
+        return data
+
+    def get(self, offset: int) -> np.ndarray:
+        return self.get_many([offset])[0]
+
+    def free(self, offset: int) -> None:
+        with self._lock:
+            self._free.append(offset)
+            self._save_meta()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._data.flush()
+            if self._scales is not None:
+                self._scales.flush()
+            self._save_meta()
+
+    def _save_meta(self) -> None:
+        # 向量数据先于元数据写入；元数据原子替换，读到的总是完整的一份
+        with self._lock:
+            tmp_path = self._meta_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"dim": self.dim, "dtype": self.dtype, "capacity": self.capacity, "size": self.size, "free": self._free},
+                    f,
+                )
+            os.replace(tmp_path, self._meta_path)
+
+    def resident_bytes(self) -> int:
+        # 已使用区域占用的字节数（实际驻留内存取决于页缓存）
+        itemsize = np.dtype(self.dtype).itemsize
+        return self.size * (self.dim * itemsize + (4 if self.dtype == "int8" else 0))
+
+
+class EmbeddingStore:
+    # 按租户管理向量存储文件
+
+    def __init__(self, directory: str, dtype: str = "float32"):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"不支持的向量存储类型：{dtype}，有效值为：{', '.join(SUPPORTED_DTYPES)}")
+        self.directory = directory
+        self.dtype = dtype
+        self._arenas: Dict[str, EmbeddingArena] = {}
+        self._lock = threading.Lock()
+
+    def _arena(self, tenant_id: str, dim: Optional[int] = None) -> Optional[EmbeddingArena]:
+        arena = self._arenas.get(tenant_id)
+        if arena is not None:
+            return arena
+        with self._lock:
+            arena = self._arenas.get(tenant_id)
+            if arena is None:
+                path = os.path.join(self.directory, tenant_id)
+                if dim is None:
+                    # 读取已有文件的维度
+                    if not os.path.exists(f"{path}.json"):
+                        return None
+                    with open(f"{path}.json", encoding="utf-8") as f:
+                        dim = json.load(f)["dim"]
+                os.makedirs(self.directory, exist_ok=True)
+                arena = self._arenas[tenant_id] = EmbeddingArena(path, dim, self.dtype)
+        return arena
+
+    def put_many(self, tenant_id: str, vectors: Sequence[Sequence[float]]) -> List[int]:
+        if len(vectors) == 0:
+            return []
+        return self._arena(tenant_id, len(vectors[0])).append(vectors)
+
+    def put(self, tenant_id: str, vector: Sequence[float]) -> int:
+        return self.put_many(tenant_id, [vector])[0]
+
+    def get_many(self, tenant_id: str, offsets: Sequence[int]) -> np.ndarray:
+        arena = self._arena(tenant_id)
+        if arena is None:
+            raise KeyError(tenant_id)
+        return arena.get_many(offsets)
+
+    def get(self, tenant_id: str, offset: int) -> List[float]:
+        return self.get_many(tenant_id, [offset])[0].tolist()
+
+    def free(self, tenant_id: str, offset: int) -> None:
+        arena = self._arena(tenant_id)
+        if arena is not None:
+            arena.free(offset)
+
+    def flush(self) -> None:
+        for arena in list(self._arenas.values()):
+            arena.flush()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            tenant_id: {"rows": arena.size - len(arena._free), "capacity": arena.capacity, "bytes": arena.resident_bytes()}
+            for tenant_id, arena in self._arenas.items()
+        }
@@ -0,0 +1,291 @@
+import gzip
+import hashlib
+import uuid
+import zlib
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# 条件请求：按 (公司, 资源) 维护版本号，写入接口修改数据后更新版本；读取接口的强ETag由资源版本与请求路径、查询参数计算，
+# 不需要先生成响应体。客户端带 If-None-Match 且版本未变时直接返回304
+# 版本号是随机令牌而不是递增计数：进程重启或Redis数据丢失后不会与旧ETag碰撞
+# 必须先读版本再读数据：两者之间发生写入时，新数据配旧ETag，下次请求版本不一致会重新下发，不会出现过期的304
+# 多worker部署时版本需共享（RESOURCE_VERSION_URL=redis://...），否则一个worker的写入其他worker感知不到
+#
+# 响应压缩：按 Accept-Encoding 协商 br（需安装brotli）或 gzip，只压缩JSON/文本且超过阈值的响应，流式响应逐块压缩
+# 压缩后的表示与原始表示不同，强ETag追加编码后缀（"...-gzip"），比较 If-None-Match 时忽略后缀
+
+ENCODING_SUFFIXES = ("-gzip", "-br")
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/x-ndjson")
+# SSE逐条推送，压缩会引入缓冲
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for suffix in ENCODING_SUFFIXES:
+            if candidate.endswith(suffix):
+                candidate = candidate[: -len(suffix)]
+                break
+        if candidate == target:
+            return True
+    return False
+
+
+class ResourceVersions:
+    name = "base"
+
+    def __init__(self):
+        self._bumps = 0
+        self._checks = 0
+        self._not_modified = 0
+
+    async def get(self, company_id: str, resource: str) -> str:
+        raise NotImplementedError
+
+    async def _swap(self, company_id: str, resource: str, version: str) -> Optional[str]:
+        # 原子地写入新版本并返回写入前的版本
+        raise NotImplementedError
+
+    async def bump(self, company_id: str, resource: str) -> Tuple[Optional[str], str]:
+        # 返回 (写入前版本, 新版本)；调用方可据此判断本次写入前是否有其他写入
+        self._bumps += 1
+        version = uuid.uuid4().hex
+        return await self._swap(company_id, resource, version), version
+
+    async def etag(self, company_id: str, resource: str, variant: str) -> str:
+        version = await self.get(company_id, resource)
+        digest = hashlib.sha256(f"{resource}\0{company_id}\0{version}\0{variant}".encode("utf-8")).hexdigest()[:32]
+        return f'"{digest}"'
+
+    async def check(self, company_id: str, resource: str, variant: str, if_none_match: Optional[str]) -> Tuple[str, bool]:
+        # 返回 (ETag, 客户端缓存是否仍有效)
+        etag = await self.etag(company_id, resource, variant)
+        matched = etag_matches(if_none_match, etag)
+        self._checks += 1
+        if matched:
+            self._not_modified += 1
+        return etag, matched
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "bumps": self._bumps,
+            "checks": self._checks,
+            "not_modified": self._not_modified,
+            "hit_rate": round(self._not_modified / self._checks, 4) if self._checks else 0.0,
+        }
+
+
+class InMemoryResourceVersions(ResourceVersions):
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        # 未写入过的资源使用本进程的初始版本，重启后所有ETag自然失效
+        self._epoch = uuid.uuid4().hex
+        self._versions: Dict[Tuple[str, str], str] = {}
+
+    async def get(self, company_id: str, resource: str) -> str:
+        return self._versions.get((company_id, resource), self._epoch)
+
+    async def _swap(self, company_id: str, resource: str, version: str) -> Optional[str]:
+        previous = self._versions.get((company_id, resource), self._epoch)
+        self._versions[(company_id, resource)] = version
+        return previous
+
+
+class RedisResourceVersions(ResourceVersions):
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "medibid:version"):
+        import redis.asyncio as redis
+
+        super().__init__()
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, company_id: str, resource: str) -> str:
+        return f"{self.prefix}:{company_id}:{resource}"
+
+    async def get(self, company_id: str, resource: str) -> str:
+        key = self._key(company_id, resource)
+        value = await self._redis.get(key)
+        if value is None:
+            # 首次读取时写入随机初始版本；并发初始化以先写入者为准
+            await self._redis.set(key, uuid.uuid4().hex, nx=True)
+            value = await self._redis.get(key)
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    async def _swap(self, company_id: str, resource: str, version: str) -> Optional[str]:
+        # SET ... GET（Redis 6.2+）
+        previous = await self._redis.set(self._key(company_id, resource), version, get=True)
+        return previous.decode() if isinstance(previous, bytes) else previous
+
+
+def create_resource_versions(url: Optional[str] = None) -> ResourceVersions:
+    if url and url.startswith("redis://"):
+        return RedisResourceVersions(url)
+    return InMemoryResourceVersions()
+
+
+def negotiate_encoding(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    # available 按服务端偏好排序；q值相同时取靠前的编码
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31 输出带gzip头尾的流
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    # 纯ASGI中间件，放在指标中间件内层，指标中的响应大小为压缩后的传输大小
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        try:
+            import brotli
+        except ImportError:  # 可选依赖
+            brotli = None
+        self._brotli = brotli
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            return self._brotli.Compressor(quality=self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return self._brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept, self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state: Dict[str, Any] = {"start": None, "compressor": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                length = headers.get(b"content-length")
+                # 只压缩完整的200响应；Range(206)、304与已编码的响应原样发送
+                state["passthrough"] = (
+                    message["status"] != 200
+                    or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(UNCOMPRESSED_TYPES)
+                    or (length is not None and int(length) < self.minimum_size)
+                )
+                if state["passthrough"]:
+                    await send(message)
+                else:
+                    state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                if not more_body:
+                    if len(body) < self.minimum_size:
+                        # 一次性发送且体积很小：压缩收益不抵开销
+                        state["passthrough"] = True
+                        await send(start)
+                        await send(message)
+                        return
+                    data = self._compress(encoding, body)
+                    await send({**start, "headers": self._compressed_headers(start.get("headers", []), encoding, len(data))})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                state["compressor"] = self._compressor(encoding)
+                await send({**start, "headers": self._compressed_headers(start.get("headers", []), encoding, None)})
+            compressor = state["compressor"]
+            data = compressor.process(body)
+            # 流式响应每块刷新一次，保证客户端能及时收到已生成的数据
+            data += compressor.flush() if more_body else compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressed_headers(self, raw_headers, encoding: str, length: Optional[int]):
+        headers = []
+        vary = None
+        for name, value in raw_headers:
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag":
+                tag = value.decode("latin-1")
+                if tag.endswith('"'):
+                    value = f'{tag[:-1]}-{encoding}"'.encode("latin-1")
+            if lower == b"vary":
+                vary = value
+                continue
+            headers.append((name, value))
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+        return headers
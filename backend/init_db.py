@@ -1,3 +1,5 @@
+from datetime import date, timedelta
+
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
@@ -8,6 +10,11 @@ DB_PASSWORD = "password"
 DB_HOST = "localhost"
 DB_PORT = "5432"
 
+# 操作日志分区：按月范围分区，每月再按公司哈希分桶
+# 这里只创建初始分区；之后由应用（audit_log.OperationLogPartitions）在启动时及每天滚动创建未来的月分区
+OPERATION_LOG_MONTHS_AHEAD = 12
+OPERATION_LOG_COMPANY_BUCKETS = 4
+
 try:
     # 连接到PostgreSQL服务器
     conn = psycopg2.connect(
@@ -41,14 +48,70 @@ try:
     cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
     print("pgvector扩展启用成功")
     
+    # 主键统一使用VARCHAR(64)，兼容示例数据中的非UUID主键（如 company1、user1）
+    # 创建公司表
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS companies (
+        id VARCHAR(64) PRIMARY KEY,
+        name VARCHAR(255),
+        created_at TIMESTAMP
+    );
+    """)
+    print("公司表创建成功")
+
+    # 创建用户表
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id VARCHAR(64) PRIMARY KEY,
+        username VARCHAR(100) UNIQUE,
+        password VARCHAR(255),
+        company_id VARCHAR(64),
+        role VARCHAR(20),
+        created_at TIMESTAMP
+    );
+    """)
+    print("用户表创建成功")
+
+    # 创建操作日志表（只追加，按月份和公司分区；主键包含分区键）
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS operation_logs (
+        id VARCHAR(64),
+        user_id VARCHAR(64),
+        company_id VARCHAR(64),
+        operation_type VARCHAR(50),
+        resource_type VARCHAR(50),
+        resource_id VARCHAR(64),
+        content TEXT,
+        created_at TIMESTAMP,
+        PRIMARY KEY (company_id, created_at, id)
+    ) PARTITION BY RANGE (created_at);
+    """)
+    cursor.execute("CREATE TABLE IF NOT EXISTS operation_logs_default PARTITION OF operation_logs DEFAULT")
+    month = date.today().replace(day=1)
+    for _ in range(OPERATION_LOG_MONTHS_AHEAD + 1):
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        partition = f"operation_logs_{month:%Y%m}"
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {partition} PARTITION OF operation_logs
+        FOR VALUES FROM ('{month}') TO ('{next_month}') PARTITION BY HASH (company_id)
+        """)
+        for bucket in range(OPERATION_LOG_COMPANY_BUCKETS):
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition}_{bucket} PARTITION OF {partition}
+            FOR VALUES WITH (MODULUS {OPERATION_LOG_COMPANY_BUCKETS}, REMAINDER {bucket})
+            """)
+        month = next_month
+    print("操作日志表创建成功")
+
     # 创建项目表
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS projects (
-        id UUID PRIMARY KEY,
+        id VARCHAR(64) PRIMARY KEY,
         name VARCHAR(255),
+        company_id VARCHAR(64),
         status VARCHAR(50),
         rfp_file_url TEXT,
-        owner_id UUID,
+        owner_id VARCHAR(64),
         created_at TIMESTAMP
     );
     """)
@@ -57,8 +120,9 @@ try:
     # 创建RFP项表
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS rfp_items (
-        id UUID PRIMARY KEY,
-        project_id UUID REFERENCES projects(id),
+        id VARCHAR(64) PRIMARY KEY,
+        project_id VARCHAR(64) REFERENCES projects(id) ON DELETE CASCADE,
+        company_id VARCHAR(64),
         section_type VARCHAR(50),
         content TEXT,
         extracted_key VARCHAR(100),
@@ -71,7 +135,8 @@ try:
     # 创建产品参数表
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS product_specs (
-        id UUID PRIMARY KEY,
+        id VARCHAR(64) PRIMARY KEY,
+        company_id VARCHAR(64),
         product_model VARCHAR(100),
         param_name VARCHAR(100),
         param_value VARCHAR(100),
@@ -83,14 +148,128 @@ try:
     # 创建知识库切片表
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS knowledge_chunks (
-        id UUID PRIMARY KEY,
+        id VARCHAR(64) PRIMARY KEY,
         content TEXT,
         embedding vector(1024),
+        embedding_offset INTEGER,
         metadata JSONB,
-        tenant_id UUID
+        company_id VARCHAR(64),
+        tenant_id VARCHAR(64),
+        content_hash VARCHAR(64)
     );
     """)
     print("知识库切片表创建成功")
+
+    # 创建资质表
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS qualifications (
+        id VARCHAR(64) PRIMARY KEY,
+        company_id VARCHAR(64),
+        name VARCHAR(255),
+        number VARCHAR(100),
+        expiry_date TIMESTAMP,
+        status VARCHAR(20),
+        created_at TIMESTAMP
+    );
+    """)
+    print("资质表创建成功")
+
+    # 创建投标模板表
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bid_templates (
+        id VARCHAR(64) PRIMARY KEY,
+        company_id VARCHAR(64),
+        name VARCHAR(255),
+        file_url TEXT,
+        template_type VARCHAR(50),
+        content_hash VARCHAR(64),
+        created_at TIMESTAMP
+    );
+    """)
+    print("投标模板表创建成功")
+
+    # 创建标书生成任务表
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bid_generation_tasks (
+        id VARCHAR(64) PRIMARY KEY,
+        company_id VARCHAR(64),
+        project_id VARCHAR(64),
+        template_id VARCHAR(64),
+        status VARCHAR(20),
+        progress INTEGER,
+        rfp_file_url TEXT,
+        result_file_url TEXT,
+        error_message TEXT,
+        created_by VARCHAR(64),
+        worker_id VARCHAR(128),
+        heartbeat_at TIMESTAMP,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    );
+    """)
+    print("标书生成任务表创建成功")
+
+    # 创建生成的标书表
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS generated_bids (
+        id VARCHAR(64) PRIMARY KEY,
+        company_id VARCHAR(64),
+        project_id VARCHAR(64),
+        task_id VARCHAR(64),
+        template_id VARCHAR(64),
+        file_url TEXT,
+        status VARCHAR(20),
+        ai_generated_content JSONB,
+        manual_review_notes TEXT,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    );
+    """)
+    print("生成的标书表创建成功")
+
+    # 创建文件记录表：内容按SHA-256存放在文件存储中，相同内容共用一份
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stored_files (
+        id VARCHAR(64) PRIMARY KEY,
+        company_id VARCHAR(64),
+        sha256 VARCHAR(64),
+        size BIGINT,
+        filename VARCHAR(255),
+        content_type VARCHAR(100),
+        kind VARCHAR(20),
+        uploaded_by VARCHAR(64),
+        created_at TIMESTAMP
+    );
+    """)
+    print("文件记录表创建成功")
+
+    # 创建租户分区索引：所有查询均以company_id为前缀
+    index_statements = [
+        "CREATE INDEX IF NOT EXISTS idx_users_company ON users (company_id)",
+        "CREATE INDEX IF NOT EXISTS idx_operation_logs_company_type ON operation_logs (company_id, operation_type)",
+        "CREATE INDEX IF NOT EXISTS idx_operation_logs_company_resource ON operation_logs (company_id, resource_type)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_company_time ON projects (company_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_company_status ON projects (company_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_rfp_items_company_project ON rfp_items (company_id, project_id)",
+        "CREATE INDEX IF NOT EXISTS idx_product_specs_company_model ON product_specs (company_id, product_model)",
+        "CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_company ON knowledge_chunks (company_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_qualifications_company_time ON qualifications (company_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_bid_templates_company_time ON bid_templates (company_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_bid_tasks_company_time ON bid_generation_tasks (company_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_bid_tasks_company_project ON bid_generation_tasks (company_id, project_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bid_tasks_company_status ON bid_generation_tasks (company_id, status)",
+        # 任务恢复按状态跨公司扫描
+        "CREATE INDEX IF NOT EXISTS idx_bid_tasks_status ON bid_generation_tasks (status)",
+        "CREATE INDEX IF NOT EXISTS idx_generated_bids_company_time ON generated_bids (company_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_generated_bids_company_project ON generated_bids (company_id, project_id)",
+        "CREATE INDEX IF NOT EXISTS idx_generated_bids_company_status ON generated_bids (company_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_stored_files_company_time ON stored_files (company_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_stored_files_sha256 ON stored_files (sha256)",
+        "CREATE INDEX IF NOT EXISTS idx_stored_files_company_kind ON stored_files (company_id, kind)",
+    ]
+    for statement in index_statements:
+        cursor.execute(statement)
+    print("索引创建成功")
     
     # 提交事务
     conn.commit()
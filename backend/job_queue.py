@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+
+# 后台任务调度：固定数量的worker从队列取任务，按租户限制并发数
+# 任务状态本身持久化在仓储中（BidGenerationTask），调度器只负责执行与取消
+
+logger = logging.getLogger(__name__)
+
+Job = Tuple[str, str]  # (company_id, task_id)
+JobHandler = Callable[[str, str], Awaitable[None]]
+
+
+class JobScheduler:
+    def __init__(self, handler: JobHandler, workers: int = 4, per_tenant_limit: int = 2):
+        self.handler = handler
+        self.workers = workers
+        self.per_tenant_limit = per_tenant_limit
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._running: Dict[str, int] = defaultdict(int)
+        # 超出租户并发上限的任务暂存于此，该租户有任务结束时再放回队列
+        self._deferred: Dict[str, Deque[Job]] = defaultdict(deque)
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._queued: Set[str] = set()
+        self._cancelled: Set[str] = set()
+        # 停止调度器时被中断的任务应保持可恢复，而不是标记为已取消
+        self.stopping = False
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self.stopping = False
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        self.stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        for job in list(self._jobs.values()):
+            job.cancel()
+        await asyncio.gather(*self._workers, *self._jobs.values(), return_exceptions=True)
+        self._workers = []
+        self._jobs.clear()
+
+    def submit(self, company_id: str, task_id: str) -> None:
+        if task_id in self._queued or task_id in self._jobs:
+            return
+        self._cancelled.discard(task_id)
+        self._queued.add(task_id)
+        self._queue.put_nowait((company_id, task_id))
+
+    def cancel(self, task_id: str) -> bool:
+        # 排队中的任务直接跳过；执行中的任务在下一个await点被中断
+        job = self._jobs.get(task_id)
+        if job is not None:
+            job.cancel()
+            return True
+        if task_id in self._queued:
+            self._cancelled.add(task_id)
+            return True
+        return False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "workers": self.workers,
+            "per_tenant_limit": self.per_tenant_limit,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": len(self._jobs),
+            "deferred": sum(len(d) for d in self._deferred.values()),
+            "running_by_tenant": {k: v for k, v in self._running.items() if v},
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            company_id, task_id = await self._queue.get()
+            if task_id in self._cancelled:
+                self._cancelled.discard(task_id)
+                self._queued.discard(task_id)
+                continue
+            if self._running[company_id] >= self.per_tenant_limit:
+                self._deferred[company_id].append((company_id, task_id))
+                continue
+            self._queued.discard(task_id)
+            self._running[company_id] += 1
+            job = asyncio.create_task(self.handler(company_id, task_id))
+            self._jobs[task_id] = job
+            try:
+                await job
+            except asyncio.CancelledError:
+                # worker自身被取消（停止调度器）时，等待中的任务也会被连带取消，必须继续抛出，
+                # 否则 stop() 的 gather 永远等不到worker结束；只有任务单独被取消（cancel接口）时才吞掉
+                current = asyncio.current_task()
+                if self.stopping or not job.cancelled() or (hasattr(current, "cancelling") and current.cancelling()):
+                    raise
+            except Exception:
+                logger.exception("后台任务执行失败：%s", task_id)
+            finally:
+                self._jobs.pop(task_id, None)
+                self._running[company_id] -= 1
+                deferred = self._deferred.get(company_id)
+                if deferred:
+                    self._queue.put_nowait(deferred.popleft())
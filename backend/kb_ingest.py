@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from embedding import Embedder
+
+
+# 知识库批量导入流水线：切片 -> 去重 -> 批量向量化 -> 批量写入
+# 各阶段之间是有界队列，向量化或写入跟不上时上游（直至请求体读取）会被阻塞，内存占用与导入规模无关
+
+# 中文句末标点（含全角/半角），切分后标点保留在句尾
+SENTENCE_END = re.compile(r"(?<=[。！？!?；;…])")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\r\n\s*\r\n")
+
+
+def split_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    # 按段落、句子切分后合并为不超过 chunk_size 字的切片；相邻切片重叠末尾若干完整句子（不超过 overlap 字）
+    sentences: List[str] = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        for line in paragraph.splitlines():
+            for sentence in SENTENCE_END.split(line.strip()):
+                sentence = sentence.strip()
+                # 超长句子（如无标点的表格行）按长度硬切
+                while len(sentence) > chunk_size:
+                    sentences.append(sentence[:chunk_size])
+                    sentence = sentence[chunk_size:]
+                if sentence:
+                    sentences.append(sentence)
+        sentences.append("")  # 段落边界
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    for sentence in sentences:
+        if not sentence:
+            # 段落结束时若当前切片已过半则收尾，尽量不跨段落
+            if length >= chunk_size // 2:
+                chunks.append("".join(current))
+                current, length = [], 0
+            continue
+        if current and length + len(sentence) > chunk_size:
+            chunks.append("".join(current))
+            tail: List[str] = []
+            tail_length = 0
+            for previous in reversed(current):
+                if tail_length + len(previous) > overlap or tail_length + len(previous) + len(sentence) > chunk_size:
+                    break
+                tail.insert(0, previous)
+                tail_length += len(previous)
+            current, length = tail, tail_length
+        current.append(sentence)
+        length += len(sentence)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def content_hash(text: str) -> str:
+    # 忽略空白与全半角差异
+    return hashlib.sha256(" ".join(unicodedata.normalize("NFKC", text).split()).encode()).hexdigest()
+
+
+class IngestItem:
+    __slots__ = ("content", "metadata", "tenant_id", "embedding", "content_hash")
+
+    def __init__(self, content: str, metadata: Dict[str, Any], tenant_id: str, embedding: Optional[Sequence[float]], digest: str):
+        self.content = content
+        self.metadata = metadata
+        self.tenant_id = tenant_id
+        self.embedding = embedding
+        self.content_hash = digest
+
+
+# write(company_id, items, vectors)：把一批切片写入仓储与向量索引
+Writer = Callable[[str, List[IngestItem], np.ndarray], Awaitable[None]]
+
+_END = object()
+
+
+class KnowledgeIngestor:
+    def __init__(
+        self,
+        embedder: Embedder,
+        write: Writer,
+        batch_size: int = 64,
+        queue_size: int = 4,
+        chunk_size: int = 500,
+        overlap: int = 50,
+    ):
+        self.embedder = embedder
+        self._write = write
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        # 每个公司已入库切片的内容哈希 -> 切片数，首次导入时由调用方加载
+        self._hashes: Dict[str, Dict[str, int]] = {}
+        self._embed_seconds = 0.0
+        self._embedded_total = 0
+        self._inserted_total = 0
+        self._duplicates_total = 0
+        self._jobs_total = 0
+
+    def loaded(self, company_id: str) -> bool:
+        return company_id in self._hashes
+
+    def load(self, company_id: str, hashes: Sequence[str]) -> None:
+        counts: Dict[str, int] = {}
+        for digest in hashes:
+            counts[digest] = counts.get(digest, 0) + 1
+        self._hashes[company_id] = counts
+
+    def add(self, company_id: str, digest: str) -> None:
+        counts = self._hashes.get(company_id)
+        if counts is not None:
+            counts[digest] = counts.get(digest, 0) + 1
+
+    def discard(self, company_id: str, digest: Optional[str]) -> None:
+        counts = self._hashes.get(company_id)
+        if counts is None or digest not in counts:
+            return
+        counts[digest] -= 1
+        if not counts[digest]:
+            del counts[digest]
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        started = time.perf_counter()
+        vectors = await asyncio.get_running_loop().run_in_executor(None, self.embedder.embed, list(texts))
+        self._embed_seconds += time.perf_counter() - started
+        self._embedded_total += len(texts)
+        return vectors
+
+    async def ingest(self, company_id: str, documents: AsyncIterator[Dict[str, Any]], split: bool = True) -> Dict[str, Any]:
+        # documents 产出 {content, metadata, tenant_id, embedding}；带 embedding 的文档视为已切好的切片
+        if company_id not in self._hashes:
+            raise RuntimeError("内容哈希未加载")
+        known = self._hashes[company_id]
+        reserved: Set[str] = set()
+        result = {"documents": 0, "chunks": 0, "duplicates": 0, "inserted": 0, "embedded": 0}
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        started = time.perf_counter()
+
+        async def produce():
+            batch: List[IngestItem] = []
+            async for document in documents:
+                result["documents"] += 1
+                embedding = document.get("embedding")
+                pieces = [document["content"]] if embedding or not split else split_text(document["content"], self.chunk_size, self.overlap)
+                for piece in pieces:
+                    result["chunks"] += 1
+                    digest = content_hash(piece)
+                    if digest in known or digest in reserved:
+                        result["duplicates"] += 1
+                        continue
+                    reserved.add(digest)
+                    batch.append(IngestItem(piece, dict(document.get("metadata") or {}), document["tenant_id"], embedding, digest))
+                    if len(batch) >= self.batch_size:
+                        await embed_queue.put(batch)
+                        batch = []
+            if batch:
+                await embed_queue.put(batch)
+            await embed_queue.put(_END)
+
+        async def embed_stage():
+            while True:
+                batch = await embed_queue.get()
+                if batch is _END:
+                    await write_queue.put(_END)
+                    return
+                pending = [i for i, item in enumerate(batch) if item.embedding is None]
+                vectors = np.zeros((len(batch), self.embedder.dim), dtype=np.float32)
+                if pending:
+                    vectors[pending] = await self.embed([batch[i].content for i in pending])
+                    result["embedded"] += len(pending)
+                for i, item in enumerate(batch):
+                    if item.embedding is not None:
+                        if len(item.embedding) != self.embedder.dim:
+                            raise ValueError(f"向量维度应为{self.embedder.dim}，实际为{len(item.embedding)}")
+                        vectors[i] = item.embedding
+                await write_queue.put((batch, vectors))
+
+        async def write_stage():
+            while True:
+                entry = await write_queue.get()
+                if entry is _END:
+                    return
+                batch, vectors = entry
+                await self._write(company_id, batch, vectors)
+                for item in batch:
+                    known[item.content_hash] = known.get(item.content_hash, 0) + 1
+                result["inserted"] += len(batch)
+
+        self._jobs_total += 1
+        tasks = [asyncio.ensure_future(stage()) for stage in (produce, embed_stage, write_stage)]
+        try:
+            # 任一阶段失败时取消其余阶段，已写入的批次保留
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._inserted_total += result["inserted"]
+            self._duplicates_total += result["duplicates"]
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "batch_size": self.batch_size,
+            "jobs_total": self._jobs_total,
+            "inserted_total": self._inserted_total,
+            "duplicates_total": self._duplicates_total,
+            "embedded_total": self._embedded_total,
+            "embed_texts_per_second": round(self._embedded_total / self._embed_seconds, 1) if self._embed_seconds else 0.0,
+            "tenants_loaded": len(self._hashes),
+        }
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+
+# 本地大模型推理客户端：共享HTTP连接池 + 并发请求微批 + 按租户限流/超时 + 逐token流式返回
+# 支持两种服务端协议：
+#   openai  - vLLM 等OpenAI兼容服务的 /v1/completions，一次请求携带多条prompt，流式结果按 choices[].index 分发
+#   ollama  - Ollama 的 /api/generate，不支持批量，每条prompt单独请求
+# 测试与压测可使用 mock_llm_server.py 提供的模拟服务
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+_END = object()
+
+
+class _Request:
+    __slots__ = ("prompt", "queue", "cancelled", "enqueued_at", "first_token_at")
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.cancelled = False
+        self.enqueued_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+
+BatchKey = Tuple[int, float]
+
+
+class LLMClient:
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api: str = "openai",
+        max_connections: int = 32,
+        batch_size: int = 8,
+        batch_window: float = 0.01,
+        tenant_concurrency: int = 8,
+        timeout: float = 120.0,
+        max_tokens: int = 1024,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if api not in ("openai", "ollama"):
+            raise ValueError(f"不支持的推理服务协议：{api}")
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api = api
+        self.max_connections = max_connections
+        # ollama 不支持一次请求多条prompt
+        self.batch_size = batch_size if api == "openai" else 1
+        self.batch_window = batch_window
+        self.tenant_concurrency = tenant_concurrency
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        # 相同生成参数的请求才能合并为一批
+        self._pending: Dict[BatchKey, List[_Request]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._batches: Set[asyncio.Task] = set()
+        self._tenant_slots: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        # 指标
+        self._requests_total = 0
+        self._batches_total = 0
+        self._errors_total = 0
+        self._timeouts_total = 0
+        self._chunks_total = 0
+        self._ttft_seconds_total = 0.0
+        self._ttft_count = 0
+
+    async def start(self) -> None:
+        if self._http is not None:
+            return
+        # 连接池在所有请求间共享，保持长连接
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=self._transport,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+        )
+
+    async def close(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def stream(
+        self,
+        company_id: str,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        # 逐段产出生成文本；排队等待租户额度的时间也计入超时
+        if self._http is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        slots = self._tenant_slots.get(company_id)
+        if slots is None:
+            slots = self._tenant_slots[company_id] = asyncio.Semaphore(self.tenant_concurrency)
+        try:
+            await asyncio.wait_for(slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts_total += 1
+            raise LLMTimeoutError("等待推理并发额度超时")
+        self._in_flight[company_id] += 1
+        self._requests_total += 1
+        request = _Request(prompt)
+        try:
+            self._enqueue((max_tokens or self.max_tokens, temperature), request)
+            while True:
+                remaining = deadline - loop.time()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    item = await asyncio.wait_for(request.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    self._timeouts_total += 1
+                    raise LLMTimeoutError("模型推理超时")
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # 调用方提前结束（如浏览器断开）时，批处理会丢弃该请求的后续输出
+            request.cancelled = True
+            self._in_flight[company_id] -= 1
+            slots.release()
+
+    async def generate(self, company_id: str, prompt: str, max_tokens: Optional[int] = None, temperature: float = 0.3) -> str:
+        parts = []
+        async for text in self.stream(company_id, prompt, max_tokens, temperature):
+            parts.append(text)
+        return "".join(parts)
+
+    def _enqueue(self, key: BatchKey, request: _Request) -> None:
+        batch = self._pending.setdefault(key, [])
+        batch.append(request)
+        if len(batch) >= self.batch_size:
+            self._dispatch(key)
+        elif len(batch) == 1:
+            # 第一条请求到达后等待一个很短的窗口，收集同时到达的其他请求
+            self._timers[key] = asyncio.get_running_loop().call_later(self.batch_window, self._dispatch, key)
+
+    def _dispatch(self, key: BatchKey) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        self._batches_total += 1
+        task = asyncio.get_running_loop().create_task(self._run_batch(key, batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, key: BatchKey, batch: List[_Request]) -> None:
+        try:
+            if self.api == "openai":
+                await self._run_openai(key, batch)
+            else:
+                await self._run_ollama(key, batch[0])
+        except asyncio.CancelledError:
+            for request in batch:
+                request.queue.put_nowait(LLMError("推理请求已取消"))
+            raise
+        except Exception as e:
+            self._errors_total += 1
+            logger.warning("模型推理失败：%s", e)
+            error = e if isinstance(e, LLMError) else LLMError("AI服务不可用")
+            for request in batch:
+                request.queue.put_nowait(error)
+        finally:
+            for request in batch:
+                request.queue.put_nowait(_END)
+
+    def _deliver(self, request: _Request, text: str) -> None:
+        if request.cancelled or not text:
+            return
+        if request.first_token_at is None:
+            request.first_token_at = time.perf_counter()
+            self._ttft_seconds_total += request.first_token_at - request.enqueued_at
+            self._ttft_count += 1
+        self._chunks_total += 1
+        request.queue.put_nowait(text)
+
+    async def _run_openai(self, key: BatchKey, batch: List[_Request]) -> None:
+        payload = {
+            "model": self.model,
+            "prompt": [request.prompt for request in batch],
+            "max_tokens": key[0],
+            "temperature": key[1],
+            "stream": True,
+        }
+        async with self._http.stream("POST", "/v1/completions", json=payload) as response:
+            if response.status_code != 200:
+                raise LLMError(f"模型服务返回错误：HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                for choice in json.loads(data).get("choices", ()):
+                    index = choice.get("index", 0)
+                    if index < len(batch):
+                        self._deliver(batch[index], choice.get("text", ""))
+                if all(request.cancelled for request in batch):
+                    # 所有调用方都已放弃，提前断开以释放模型算力
+                    break
+
+    async def _run_ollama(self, key: BatchKey, request: _Request) -> None:
+        payload = {
+            "model": self.model,
+            "prompt": request.prompt,
+            "stream": True,
+            "options": {"num_predict": key[0], "temperature": key[1]},
+        }
+        async with self._http.stream("POST", "/api/generate", json=payload) as response:
+            if response.status_code != 200:
+                raise LLMError(f"模型服务返回错误：HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                self._deliver(request, chunk.get("response", ""))
+                if chunk.get("done") or request.cancelled:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "api": self.api,
+            "model": self.model,
+            "batch_size": self.batch_size,
+            "requests_total": self._requests_total,
+            "batches_total": self._batches_total,
+            "avg_batch_size": round(self._requests_total / self._batches_total, 2) if self._batches_total else 0.0,
+            "errors_total": self._errors_total,
+            "timeouts_total": self._timeouts_total,
+            "chunks_total": self._chunks_total,
+            "avg_ttft_ms": round(self._ttft_seconds_total / self._ttft_count * 1000, 2) if self._ttft_count else 0.0,
+            "in_flight_by_tenant": {k: v for k, v in self._in_flight.items() if v},
+        }
@@ -0,0 +1,396 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import linecache
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 请求级性能指标：按路由统计延迟直方图、请求/响应大小、并发中请求数，
+# 仓储、操作日志、AI调用、序列化等环节以 span 计时；所有指标可按公司(租户)汇总
+# 以 Prometheus 文本格式导出，另提供采样分析器与 tracemalloc 快照用于排查热点
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# 当前请求的上下文：中间件创建，鉴权后写入公司ID；用可变字典是为了让线程池中的调用也能看到
+_request_context: "contextvars.ContextVar[Optional[Dict[str, Any]]]" = contextvars.ContextVar("request_context", default=None)
+
+
+def set_tenant(company_id: str) -> None:
+    context = _request_context.get()
+    if context is not None:
+        context["tenant"] = company_id
+
+
+def current_tenant() -> Optional[str]:
+    context = _request_context.get()
+    return context["tenant"] if context is not None else None
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # 非累计计数，导出时再累加；最后一格为 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        # 按桶内线性插值估算分位数
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+def _labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metrics:
+    def __init__(self, namespace: str = "medibid"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._request_size: Dict[Tuple[str, str], Histogram] = {}
+        self._response_size: Dict[Tuple[str, str], Histogram] = {}
+        self._status: Counter = Counter()
+        self._in_flight: Counter = Counter()
+        self._spans: Dict[str, Histogram] = {}
+        # 按公司汇总：请求数、耗时、响应字节数，以及各 span 的耗时
+        self._tenant_requests: Counter = Counter()
+        self._tenant_seconds: Counter = Counter()
+        self._tenant_bytes: Counter = Counter()
+        self._tenant_spans: Counter = Counter()
+        self._tenant_span_calls: Counter = Counter()
+        # 其他组件的指标（如AI准入控制的排队深度），导出时调用
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Sequence[str], Dict[Tuple, float]]]]] = []
+
+    def request_started(self, method: str) -> None:
+        with self._lock:
+            self._in_flight[method] += 1
+
+    def request_finished(
+        self, method: str, route: str, status: int, seconds: float, request_bytes: int, response_bytes: int, tenant: Optional[str]
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            self._in_flight[method] -= 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._request_size[key] = Histogram(SIZE_BUCKETS)
+                self._response_size[key] = Histogram(SIZE_BUCKETS)
+            self._latency[key].observe(seconds)
+            self._request_size[key].observe(request_bytes)
+            self._response_size[key].observe(response_bytes)
+            self._status[(method, route, status)] += 1
+            if tenant is not None:
+                self._tenant_requests[tenant] += 1
+                self._tenant_seconds[tenant] += seconds
+                self._tenant_bytes[tenant] += response_bytes
+
+    def observe_span(self, name: str, seconds: float, tenant: Optional[str] = None) -> None:
+        tenant = tenant or current_tenant()
+        with self._lock:
+            histogram = self._spans.get(name)
+            if histogram is None:
+                histogram = self._spans[name] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            if tenant is not None:
+                self._tenant_spans[(tenant, name)] += seconds
+                self._tenant_span_calls[(tenant, name)] += 1
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_span(name, time.perf_counter() - started)
+
+    def instrument(self, obj: Any, prefix: str, methods: Iterable[str]) -> Any:
+        # 把对象上的异步方法（含异步生成器）替换为带计时的版本，span 名为 前缀.方法名
+        for method in methods:
+            original = getattr(obj, method)
+            setattr(obj, method, self._timed(original, f"{prefix}.{method}"))
+        return obj
+
+    def _timed(self, func, name: str):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def generator_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                finally:
+                    self.observe_span(name, time.perf_counter() - started)
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.observe_span(name, time.perf_counter() - started)
+
+        return wrapper
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Sequence[str], Dict[Tuple, float]]]]) -> None:
+        # collector 返回 (指标名, 类型, 说明, 标签名, {标签值: 数值})
+        self._collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        ns = self.namespace
+        lines: List[str] = []
+        with self._lock:
+            lines += [f"# HELP {ns}_http_requests_total HTTP请求数", f"# TYPE {ns}_http_requests_total counter"]
+            for (method, route, status), n in sorted(self._status.items()):
+                lines.append(f"{ns}_http_requests_total{_labels(('method', 'route', 'status'), (method, route, status))} {n}")
+            # 路由匹配发生在中间件之内，处理中的请求只能按方法统计
+            lines += [f"# HELP {ns}_http_requests_in_flight 处理中的请求数", f"# TYPE {ns}_http_requests_in_flight gauge"]
+            for method, n in sorted(self._in_flight.items()):
+                lines.append(f"{ns}_http_requests_in_flight{_labels(('method',), (method,))} {n}")
+            for metric, histograms, help_text in (
+                ("http_request_duration_seconds", self._latency, "请求处理耗时"),
+                ("http_request_size_bytes", self._request_size, "请求体大小"),
+                ("http_response_size_bytes", self._response_size, "响应体大小"),
+            ):
+                lines += [f"# HELP {ns}_{metric} {help_text}", f"# TYPE {ns}_{metric} histogram"]
+                for (method, route), histogram in sorted(histograms.items()):
+                    self._render_histogram(lines, f"{ns}_{metric}", ("method", "route"), (method, route), histogram)
+            lines += [f"# HELP {ns}_span_duration_seconds 内部环节耗时", f"# TYPE {ns}_span_duration_seconds histogram"]
+            for name, histogram in sorted(self._spans.items()):
+                self._render_histogram(lines, f"{ns}_span_duration_seconds", ("span",), (name,), histogram)
+            for metric, counter, help_text in (
+                ("tenant_requests_total", self._tenant_requests, "各公司请求数"),
+                ("tenant_request_seconds_total", self._tenant_seconds, "各公司请求总耗时"),
+                ("tenant_response_bytes_total", self._tenant_bytes, "各公司响应总字节数"),
+            ):
+                lines += [f"# HELP {ns}_{metric} {help_text}", f"# TYPE {ns}_{metric} counter"]
+                for tenant, value in sorted(counter.items()):
+                    lines.append(f"{ns}_{metric}{_labels(('tenant',), (tenant,))} {value}")
+            lines += [f"# HELP {ns}_tenant_span_seconds_total 各公司内部环节总耗时", f"# TYPE {ns}_tenant_span_seconds_total counter"]
+            for (tenant, name), value in sorted(self._tenant_spans.items()):
+                lines.append(f"{ns}_tenant_span_seconds_total{_labels(('tenant', 'span'), (tenant, name))} {value}")
+        for collector in self._collectors:
+            for metric, kind, help_text, label_names, samples in collector():
+                lines += [f"# HELP {ns}_{metric} {help_text}", f"# TYPE {ns}_{metric} {kind}"]
+                for label_values, value in sorted(samples.items()):
+                    lines.append(f"{ns}_{metric}{_labels(label_names, label_values)} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(lines: List[str], name: str, label_names, label_values, histogram: Histogram) -> None:
+        cumulative = 0
+        for bound, n in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(tuple(label_names) + ('le',), tuple(label_values) + (bound,))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, label_values)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(label_names, label_values)} {histogram.count}")
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        # 供管理接口查看：按总耗时排序的路由、span 与公司
+        def describe(histogram: Histogram) -> Dict[str, Any]:
+            return {
+                "count": histogram.count,
+                "total_seconds": round(histogram.sum, 3),
+                "p50_ms": round(histogram.quantile(0.5) * 1000, 2),
+                "p95_ms": round(histogram.quantile(0.95) * 1000, 2),
+                "p99_ms": round(histogram.quantile(0.99) * 1000, 2),
+            }
+
+        with self._lock:
+            routes = sorted(self._latency.items(), key=lambda item: item[1].sum, reverse=True)[:top]
+            spans = sorted(self._spans.items(), key=lambda item: item[1].sum, reverse=True)[:top]
+            tenants = self._tenant_seconds.most_common(top)
+            return {
+                "in_flight": dict(self._in_flight),
+                "routes": [
+                    {
+                        "method": method,
+                        "route": route,
+                        **describe(histogram),
+                        "avg_response_bytes": round(self._response_size[(method, route)].sum / histogram.count) if histogram.count else 0,
+                    }
+                    for (method, route), histogram in routes
+                ],
+                "spans": [{"span": name, **describe(histogram)} for name, histogram in spans],
+                "tenants": [
+                    {
+                        "tenant": tenant,
+                        "requests": self._tenant_requests[tenant],
+                        "total_seconds": round(seconds, 3),
+                        "response_bytes": self._tenant_bytes[tenant],
+                        "top_spans": sorted(
+                            (
+                                {"span": name, "total_seconds": round(value, 3), "calls": self._tenant_span_calls[(t, name)]}
+                                for (t, name), value in self._tenant_spans.items()
+                                if t == tenant
+                            ),
+                            key=lambda s: s["total_seconds"],
+                            reverse=True,
+                        )[:5],
+                    }
+                    for tenant, seconds in tenants
+                ],
+            }
+
+
+class MetricsMiddleware:
+    # 纯ASGI中间件：与路由处理在同一任务中执行，鉴权依赖写入的公司ID在请求结束时可见
+
+    def __init__(self, app, metrics: Metrics, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.metrics = metrics
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        context = {"tenant": None}
+        token = _request_context.set(context)
+        state = {"status": 500, "request_bytes": 0, "response_bytes": 0}
+        self.metrics.request_started(method)
+        started = time.perf_counter()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            # 未匹配到路由的请求（404等）归为一类，避免任意路径造成标签数量膨胀
+            route = getattr(scope.get("route"), "path", None) or "(unmatched)"
+            self.metrics.request_finished(
+                method,
+                route,
+                state["status"],
+                time.perf_counter() - started,
+                state["request_bytes"],
+                state["response_bytes"],
+                context["tenant"],
+            )
+            _request_context.reset(token)
+
+
+class SamplingProfiler:
+    # 采样分析器：后台线程按固定间隔抓取目标线程（事件循环所在线程）的调用栈，
+    # 汇总为折叠栈（flamegraph.pl / speedscope 可直接读取）与函数自身耗时排行
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+
+    def profile(self, seconds: float, interval: float, thread_id: int) -> Dict[str, Any]:
+        with self._lock:
+            if self.running:
+                raise RuntimeError("已有分析任务在运行")
+            self.running = True
+        try:
+            stacks: Counter = Counter()
+            own: Counter = Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    names = []
+                    while frame is not None:
+                        code = frame.f_code
+                        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    names.reverse()
+                    stacks[";".join(names)] += 1
+                    own[names[-1]] += 1
+                    samples += 1
+                time.sleep(interval)
+            return {
+                "samples": samples,
+                "interval_ms": interval * 1000,
+                "top_functions": [{"function": name, "samples": n, "ratio": round(n / samples, 4)} for name, n in own.most_common(30)],
+                "collapsed": "\n".join(f"{stack} {n}" for stack, n in stacks.most_common()),
+            }
+        finally:
+            self.running = False
+
+
+class AllocationTracker:
+    # tracemalloc 快照：启动后每次快照与上一次比较，返回增长最多的分配位置
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._previous = None
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._previous = None
+
+    def snapshot(self, limit: int = 20) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("内存跟踪未启动")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        top = [
+            {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ]
+        growth = []
+        if self._previous is not None:
+            growth = [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in snapshot.compare_to(self._previous, "lineno")[:limit]
+            ]
+        self._previous = snapshot
+        return {"traced_bytes": current, "peak_bytes": peak, "top": top, "growth_since_last": growth}
@@ -0,0 +1,127 @@
+# 模拟本地大模型服务，用于测试与压测，不加载任何模型
+#
+# 兼容 vLLM(OpenAI) 的 /v1/completions 与 Ollama 的 /api/generate，支持流式输出
+# 用法（在 backend 目录下执行）：
+#   uvicorn mock_llm_server:app --port 8001
+#   LLM_BASE_URL=http://localhost:8001 uvicorn main:app --port 8000
+#
+# 延迟模型：每个HTTP请求先等待 MOCK_PREFILL_MS（预填充），之后每 MOCK_TOKEN_MS 为批内所有prompt各产出一个token
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import List, Union
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+MOCK_PREFILL_MS = float(os.getenv("MOCK_PREFILL_MS", "50"))
+MOCK_TOKEN_MS = float(os.getenv("MOCK_TOKEN_MS", "10"))
+# 同时处理的HTTP请求数上限，模拟推理服务的调度槽位；0表示不限制
+MOCK_MAX_REQUESTS = int(os.getenv("MOCK_MAX_REQUESTS", "0"))
+
+app = FastAPI()
+request_slots = None
+
+
+class CompletionRequest(BaseModel):
+    model: str = "mock"
+    prompt: Union[str, List[str]]
+    max_tokens: int = 256
+    temperature: float = 0.0
+    stream: bool = False
+
+
+class OllamaOptions(BaseModel):
+    num_predict: int = 256
+    temperature: float = 0.0
+
+
+class OllamaRequest(BaseModel):
+    model: str = "mock"
+    prompt: str
+    stream: bool = True
+    options: OllamaOptions = OllamaOptions()
+
+
+def mock_tokens(prompt: str, max_tokens: int) -> List[str]:
+    # 确定性输出：复述prompt的最后一行，按字切分为token
+    source = f"【模拟生成】{prompt.strip().splitlines()[-1] if prompt.strip() else ''}"
+    return [source[i % len(source)] for i in range(max_tokens)]
+
+
+async def generate_steps(prompts: List[str], max_tokens: int):
+    # 逐步产出 [(prompt序号, token)]
+    global request_slots
+    if request_slots is None and MOCK_MAX_REQUESTS > 0:
+        request_slots = asyncio.Semaphore(MOCK_MAX_REQUESTS)
+    if request_slots is not None:
+        await request_slots.acquire()
+    try:
+        await asyncio.sleep(MOCK_PREFILL_MS / 1000)
+        outputs = [mock_tokens(p, max_tokens) for p in prompts]
+        for step in range(max_tokens):
+            if step:
+                await asyncio.sleep(MOCK_TOKEN_MS / 1000)
+            yield [(i, tokens[step]) for i, tokens in enumerate(outputs)]
+    finally:
+        if request_slots is not None:
+            request_slots.release()
+
+
+@app.post("/v1/completions")
+async def completions(request: CompletionRequest):
+    prompts = [request.prompt] if isinstance(request.prompt, str) else request.prompt
+    completion_id = f"cmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if not request.stream:
+        texts = [[] for _ in prompts]
+        async for step in generate_steps(prompts, request.max_tokens):
+            for index, token in step:
+                texts[index].append(token)
+        return {
+            "id": completion_id,
+            "object": "text_completion",
+            "created": created,
+            "model": request.model,
+            "choices": [
+                {"index": i, "text": "".join(t), "finish_reason": "length"} for i, t in enumerate(texts)
+            ],
+        }
+
+    async def event_stream():
+        async for step in generate_steps(prompts, request.max_tokens):
+            chunk = {
+                "id": completion_id,
+                "object": "text_completion",
+                "created": created,
+                "model": request.model,
+                "choices": [{"index": i, "text": token, "finish_reason": None} for i, token in step],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.post("/api/generate")
+async def ollama_generate(request: OllamaRequest):
+    async def ndjson_stream():
+        async for step in generate_steps([request.prompt], request.options.num_predict):
+            yield json.dumps({"model": request.model, "response": step[0][1], "done": False}, ensure_ascii=False) + "\n"
+        yield json.dumps({"model": request.model, "response": "", "done": True}) + "\n"
+
+    if request.stream:
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+    texts = []
+    async for step in generate_steps([request.prompt], request.options.num_predict):
+        texts.append(step[0][1])
+    return {"model": request.model, "response": "".join(texts), "done": True}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+
+# 进程内发布/订阅，用于向SSE连接推送任务状态变化
+# 多worker部署时可切换为Redis（PUBSUB_URL=redis://...），接口保持一致
+
+
+class Subscription:
+    def __init__(self, broker: "Broker", channel: str, maxsize: int):
+        self.broker = broker
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        # 消费过慢时丢弃最旧的消息，只保证最新状态送达
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        await self.broker.unsubscribe(self)
+
+
+class Broker:
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, maxsize: int = 16) -> Subscription:
+        raise NotImplementedError
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryBroker(Broker):
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.deliver(message)
+
+    async def subscribe(self, channel: str, maxsize: int = 16) -> Subscription:
+        subscription = Subscription(self, channel, maxsize)
+        self._subscribers[channel].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+
+class RedisBroker(Broker):
+    # 每个进程一条Redis订阅连接，收到消息后在本进程内扇出
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._pubsub = self._redis.pubsub()
+        self._local = InMemoryBroker()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self._redis.publish(channel, json.dumps(message, ensure_ascii=False, default=str))
+
+    async def subscribe(self, channel: str, maxsize: int = 16) -> Subscription:
+        if channel not in self._local._subscribers:
+            await self._pubsub.subscribe(channel)
+        subscription = await self._local.subscribe(channel, maxsize)
+        subscription.broker = self
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        await self._local.unsubscribe(subscription)
+        if subscription.channel not in self._local._subscribers:
+            await self._pubsub.unsubscribe(subscription.channel)
+
+    async def _read(self) -> None:
+        while True:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                continue
+            channel = message["channel"].decode() if isinstance(message["channel"], bytes) else message["channel"]
+            await self._local.publish(channel, json.loads(message["data"]))
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        await self._pubsub.close()
+        await self._redis.close()
+
+
+def create_broker(url: Optional[str] = None) -> Broker:
+    if url and url.startswith("redis://"):
+        return RedisBroker(url)
+    return InMemoryBroker()
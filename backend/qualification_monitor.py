@@ -0,0 +1,179 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+# 资质到期监控：所有公司的下一次状态变化（valid -> expiring -> expired）放在一个最小堆中，
+# 后台任务睡眠到堆顶时间点再翻转状态，无需定期全表扫描
+# 每个公司另按到期时间维护有序列表，支持“N天内到期”区间查询；单个资质的状态查询为字典查找
+
+logger = logging.getLogger(__name__)
+
+VALID = "valid"
+EXPIRING = "expiring"
+EXPIRED = "expired"
+
+# 区间查询时用作上界的资质ID（大于任何实际ID）
+MAX_ID = "\uffff"
+
+# on_change(company_id, qualification_id, status)
+StatusCallback = Callable[[str, str, str], Awaitable[None]]
+
+
+class _Entry:
+    __slots__ = ("company_id", "id", "name", "expires_at", "status", "version")
+
+    def __init__(self, company_id: str, qualification_id: str, name: str, expires_at: float, status: str, version: int):
+        self.company_id = company_id
+        self.id = qualification_id
+        self.name = name
+        self.expires_at = expires_at
+        self.status = status
+        self.version = version
+
+
+class QualificationMonitor:
+    def __init__(self, on_change: StatusCallback, warning_days: int = 30, max_sleep: float = 3600.0):
+        self._on_change = on_change
+        self.warning_seconds = warning_days * 86400
+        # 最长睡眠时间，避免系统时钟调整后长时间不醒
+        self.max_sleep = max_sleep
+        # (触发时间, 序号, 资质ID, 版本, 目标状态)；资质更新或删除后旧事件因版本不符被跳过
+        self._heap: List[Tuple[float, int, str, int, str]] = []
+        self._seq = itertools.count()
+        self._entries: Dict[str, _Entry] = {}
+        self._timelines: Dict[str, List[Tuple[float, str]]] = {}
+        self._expired: Dict[str, Set[str]] = {}
+        self._versions = itertools.count(1)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._transitions_total = 0
+
+    def status_at(self, expires_at: float, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        if expires_at <= now:
+            return EXPIRED
+        if expires_at - self.warning_seconds <= now:
+            return EXPIRING
+        return VALID
+
+    def upsert(self, company_id: str, qualification_id: str, name: str, expiry_date: datetime) -> str:
+        # 返回当前状态，调用方写库前据此设置 status
+        self._discard(qualification_id)
+        now = time.time()
+        expires_at = expiry_date.timestamp()
+        entry = _Entry(company_id, qualification_id, name, expires_at, self.status_at(expires_at, now), next(self._versions))
+        self._entries[qualification_id] = entry
+        bisect.insort(self._timelines.setdefault(company_id, []), (expires_at, qualification_id))
+        if entry.status == EXPIRED:
+            self._expired.setdefault(company_id, set()).add(qualification_id)
+        if entry.status == VALID:
+            self._push(expires_at - self.warning_seconds, entry, EXPIRING)
+        if entry.status != EXPIRED:
+            self._push(expires_at, entry, EXPIRED)
+        return entry.status
+
+    def remove(self, qualification_id: str) -> None:
+        self._discard(qualification_id)
+
+    def _discard(self, qualification_id: str) -> None:
+        entry = self._entries.pop(qualification_id, None)
+        if entry is None:
+            return
+        timeline = self._timelines[entry.company_id]
+        index = bisect.bisect_left(timeline, (entry.expires_at, qualification_id))
+        if index < len(timeline) and timeline[index][1] == qualification_id:
+            del timeline[index]
+        self._expired.get(entry.company_id, set()).discard(qualification_id)
+
+    def _push(self, due: float, entry: _Entry, status: str) -> None:
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            # 频繁更新留下的过期事件过多时重建堆
+            self._heap = [e for e in self._heap if e[2] in self._entries and self._entries[e[2]].version == e[3]]
+            heapq.heapify(self._heap)
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, next(self._seq), entry.id, entry.version, status))
+        if self._wakeup is not None and (earliest is None or due < earliest):
+            self._wakeup.set()
+
+    def status(self, qualification_id: str) -> Optional[str]:
+        entry = self._entries.get(qualification_id)
+        return entry.status if entry is not None else None
+
+    def is_valid(self, company_id: str, qualification_id: str) -> bool:
+        entry = self._entries.get(qualification_id)
+        return entry is not None and entry.company_id == company_id and entry.status != EXPIRED
+
+    def has_expired(self, company_id: str) -> bool:
+        return bool(self._expired.get(company_id))
+
+    def expiring(self, company_id: str, within_seconds: float, include_expired: bool = False) -> List[Dict[str, Any]]:
+        # 按到期时间升序返回 [当前, 当前+within] 内到期的资质；include_expired 时包含已过期的
+        timeline = self._timelines.get(company_id, [])
+        now = time.time()
+        start = 0 if include_expired else bisect.bisect_right(timeline, (now, MAX_ID))
+        end = bisect.bisect_right(timeline, (now + within_seconds, MAX_ID))
+        result = []
+        for expires_at, qualification_id in timeline[start:end]:
+            entry = self._entries[qualification_id]
+            result.append({
+                "id": entry.id,
+                "name": entry.name,
+                "expiry_date": datetime.fromtimestamp(expires_at),
+                "status": entry.status,
+                "days_left": int((expires_at - now) // 86400),
+            })
+        return result
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # 先清除唤醒信号再处理堆：处理期间（含 await 回调）新加入的事件会重新置位，不会被漏掉
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, qualification_id, version, status = heapq.heappop(self._heap)
+                entry = self._entries.get(qualification_id)
+                if entry is None or entry.version != version or entry.status == status:
+                    continue
+                entry.status = status
+                if status == EXPIRED:
+                    self._expired.setdefault(entry.company_id, set()).add(qualification_id)
+                self._transitions_total += 1
+                try:
+                    await self._on_change(entry.company_id, qualification_id, status)
+                except Exception:
+                    logger.exception("资质状态更新失败：%s", qualification_id)
+            timeout = min(self._heap[0][0] - time.time(), self.max_sleep) if self._heap else self.max_sleep
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = {VALID: 0, EXPIRING: 0, EXPIRED: 0}
+        for entry in self._entries.values():
+            statuses[entry.status] += 1
+        return {
+            "tracked": len(self._entries),
+            "tenants": len(self._timelines),
+            "pending_events": len(self._heap),
+            "next_event_at": datetime.fromtimestamp(self._heap[0][0]).isoformat() if self._heap else None,
+            "transitions_total": self._transitions_total,
+            "by_status": statuses,
+        }
@@ -0,0 +1,711 @@
+import base64
+import bisect
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from db import Database
+
+
+# 仓储层：按公司(租户)分区，主键哈希索引 + 二级索引
+# 所有接口均为异步，便于内存实现与数据库实现互换
+
+# 游标分页的键：(排序字段值, id)
+PageKey = Tuple[Any, str]
+
+# 多行VALUES写入：每条语句的行数上限；PostgreSQL协议单条语句最多32767个参数
+INSERT_BATCH_ROWS = 1000
+MAX_QUERY_PARAMS = 32767
+
+
+class Repository:
+    # 仓储抽象基类，具体实现见 InMemoryRepository / PostgresRepository
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        indexes: Sequence[str] = (),
+        order_by: Optional[str] = None,
+        unique: Sequence[str] = (),
+        partition_key: str = "company_id",
+        primary_key: Sequence[str] = ("id",),
+    ):
+        self.model = model
+        self.indexes = tuple(indexes)
+        self.order_by = order_by
+        self.unique = tuple(unique)
+        self.partition_key = partition_key
+        # 数据库主键列；分区表的主键必须包含分区列（如 operation_logs 为 (company_id, created_at, id)），
+        # 写入冲突时按它判断。记录仍以 id 唯一标识
+        self.primary_key = tuple(primary_key)
+        annotation = model.model_fields[order_by].annotation if order_by else None
+        self._order_is_datetime = annotation is datetime or datetime in get_args(annotation)
+
+    def encode_cursor(self, key: PageKey) -> str:
+        value, record_id = key
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([value, record_id], ensure_ascii=False).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> PageKey:
+        try:
+            value, record_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if self._order_is_datetime:
+                value = datetime.fromisoformat(value)
+            return value, str(record_id)
+        except (ValueError, TypeError):
+            raise ValueError("无效的分页游标")
+
+    def page_key(self, record: BaseModel) -> PageKey:
+        return getattr(record, self.order_by), record.id
+
+    async def add(self, record: BaseModel) -> BaseModel:
+        raise NotImplementedError
+
+    async def add_many(self, records: Sequence[BaseModel]) -> None:
+        for record in records:
+            await self.add(record)
+
+    async def append_many(self, records: Sequence[BaseModel]) -> None:
+        # 只追加写入（调用方保证主键不重复），实现可以跳过冲突检查
+        await self.add_many(records)
+
+    async def get(self, company_id: str, record_id: str) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    async def get_by_id(self, record_id: str) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    async def find_unique(self, field: str, value: Any) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    async def list(
+        self,
+        company_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        **filters: Any,
+    ) -> List[BaseModel]:
+        raise NotImplementedError
+
+    async def list_all(self, **filters: Any) -> List[BaseModel]:
+        # 跨租户查询，仅用于启动恢复等后台场景
+        raise NotImplementedError
+
+    async def partitions(self) -> List[str]:
+        # 有数据的全部公司ID
+        raise NotImplementedError
+
+    def scan(self, company_id: str, columns: Sequence[str], batch_size: int = 1000) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        # 按主键顺序分批读取一个公司的指定列（不构造模型、不读其他大字段），用于启动对齐等后台场景
+        raise NotImplementedError
+
+    async def page(
+        self,
+        company_id: str,
+        limit: int,
+        after: Optional[PageKey] = None,
+        descending: bool = False,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+        **filters: Any,
+    ) -> Tuple[List[BaseModel], Optional[PageKey]]:
+        # 按 (order_by, id) 做键集分页，返回 (当前页, 下一页起点)；没有下一页时起点为None
+        # fields 只是提示，实现可以只读取这些列（及分页所需的列）
+        raise NotImplementedError
+
+    async def update(self, company_id: str, record_id: str, record: BaseModel) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    async def update_where(
+        self, company_id: str, record_id: str, expected: Dict[str, Any], changes: Dict[str, Any]
+    ) -> Optional[BaseModel]:
+        # 条件更新（比较并交换）：当前行的 expected 字段全部相等时才写入 changes，返回更新后的记录；
+        # 记录不存在或条件不满足时返回 None。多个worker争抢同一条记录时只有一个能成功
+        raise NotImplementedError
+
+    async def delete(self, company_id: str, record_id: str) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    async def delete_many(self, company_id: str, record_ids: Sequence[str]) -> int:
+        deleted = 0
+        for record_id in record_ids:
+            if await self.delete(company_id, record_id) is not None:
+                deleted += 1
+        return deleted
+
+    async def count(self, company_id: str) -> int:
+        raise NotImplementedError
+
+    async def is_empty(self) -> bool:
+        # 跨租户判断表中是否没有任何记录，用于首次启动时写入初始数据
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def transaction(self):
+        # 多条写入需要整体成功或整体失败时使用；内存实现的写入不会中途失败，无需事务
+        yield
+
+
+class _Partition:
+    # 单个公司的数据分区
+    __slots__ = ("rows", "secondary", "keys", "timeline")
+
+    def __init__(self, indexes: Iterable[str]):
+        self.rows: Dict[str, BaseModel] = {}
+        # 二级索引：字段 -> 值 -> 有序id集合（用dict保持插入顺序）
+        self.secondary: Dict[str, Dict[Any, Dict[str, None]]] = {f: {} for f in indexes}
+        # 记录每行写入索引时的键值，原地修改对象后也能正确重建索引
+        self.keys: Dict[str, Tuple[Any, ...]] = {}
+        # 时间索引：按 (order_by, id) 排序，支持二分查找范围
+        self.timeline: List[Tuple[Any, str]] = []
+
+
+class InMemoryRepository(Repository):
+    # 内存实现：按id查找O(1)，与租户数量无关
+
+    def __init__(self, model: Type[BaseModel], **kwargs: Any):
+        super().__init__(model, **kwargs)
+        self._partitions: Dict[str, _Partition] = {}
+        # 全局主键索引：id -> 所属分区
+        self._owner: Dict[str, str] = {}
+        # 全局唯一索引：字段 -> 值 -> id
+        self._unique: Dict[str, Dict[Any, str]] = {f: {} for f in self.unique}
+
+    def _partition(self, company_id: str) -> _Partition:
+        part = self._partitions.get(company_id)
+        if part is None:
+            part = self._partitions[company_id] = _Partition(self.indexes)
+        return part
+
+    def _index_keys(self, record: BaseModel) -> Tuple[Any, ...]:
+        keys = tuple(getattr(record, f) for f in self.indexes)
+        if self.order_by:
+            keys += (getattr(record, self.order_by),)
+        return keys + tuple(getattr(record, f) for f in self.unique)
+
+    def _link(self, part: _Partition, record: BaseModel) -> None:
+        keys = self._index_keys(record)
+        part.keys[record.id] = keys
+        for field, value in zip(self.indexes, keys):
+            part.secondary[field].setdefault(value, {})[record.id] = None
+        if self.order_by:
+            bisect.insort(part.timeline, (keys[len(self.indexes)], record.id))
+        for field, value in zip(self.unique, keys[-len(self.unique):] if self.unique else ()):
+            self._unique[field][value] = record.id
+
+    def _unlink(self, part: _Partition, record_id: str) -> None:
+        keys = part.keys.pop(record_id)
+        for field, value in zip(self.indexes, keys):
+            bucket = part.secondary[field].get(value)
+            if bucket is not None:
+                bucket.pop(record_id, None)
+                if not bucket:
+                    del part.secondary[field][value]
+        if self.order_by:
+            entry = (keys[len(self.indexes)], record_id)
+            pos = bisect.bisect_left(part.timeline, entry)
+            if pos < len(part.timeline) and part.timeline[pos] == entry:
+                del part.timeline[pos]
+        for field, value in zip(self.unique, keys[-len(self.unique):] if self.unique else ()):
+            if self._unique[field].get(value) == record_id:
+                del self._unique[field][value]
+
+    async def add(self, record: BaseModel) -> BaseModel:
+        company_id = getattr(record, self.partition_key)
+        old_owner = self._owner.get(record.id)
+        if old_owner is not None:
+            # 相同主键视为覆盖写入
+            await self.delete(old_owner, record.id)
+        part = self._partition(company_id)
+        part.rows[record.id] = record
+        self._owner[record.id] = company_id
+        self._link(part, record)
+        return record
+
+    async def get(self, company_id: str, record_id: str) -> Optional[BaseModel]:
+        part = self._partitions.get(company_id)
+        if part is None:
+            return None
+        return part.rows.get(record_id)
+
+    async def get_by_id(self, record_id: str) -> Optional[BaseModel]:
+        company_id = self._owner.get(record_id)
+        if company_id is None:
+            return None
+        return self._partitions[company_id].rows.get(record_id)
+
+    async def find_unique(self, field: str, value: Any) -> Optional[BaseModel]:
+        record_id = self._unique[field].get(value)
+        if record_id is None:
+            return None
+        return await self.get_by_id(record_id)
+
+    async def list(
+        self,
+        company_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        **filters: Any,
+    ) -> List[BaseModel]:
+        part = self._partitions.get(company_id)
+        if part is None:
+            return []
+        filters = {k: v for k, v in filters.items() if v is not None}
+
+        # 选择命中行数最少的二级索引作为驱动集合
+        candidates: Optional[Iterable[str]] = None
+        for field, value in filters.items():
+            if field not in part.secondary:
+                continue
+            bucket = part.secondary[field].get(value, {})
+            if candidates is None or len(bucket) < len(candidates):
+                candidates = bucket
+
+        if self.order_by and (start is not None or end is not None or candidates is None):
+            # 时间范围：二分定位后顺序扫描
+            lo = 0 if start is None else bisect.bisect_left(part.timeline, (start,))
+            hi = len(part.timeline)
+            if end is not None:
+                hi = bisect.bisect_right(part.timeline, (end, "\uffff"))
+            ids: Iterable[str] = (rid for _, rid in part.timeline[lo:hi])
+            if candidates is not None:
+                allowed = candidates
+                ids = (rid for rid in ids if rid in allowed)
+        elif candidates is not None:
+            ids = list(candidates)
+        else:
+            ids = part.rows.keys()
+
+        rows = part.rows
+        result = []
+        for rid in ids:
+            record = rows[rid]
+            if all(getattr(record, k) == v for k, v in filters.items()):
+                result.append(record)
+        return result
+
+    async def list_all(self, **filters: Any) -> List[BaseModel]:
+        result = []
+        for company_id in list(self._partitions):
+            result.extend(await self.list(company_id, **filters))
+        return result
+
+    async def partitions(self) -> List[str]:
+        return [company_id for company_id, part in self._partitions.items() if part.rows]
+
+    async def scan(self, company_id: str, columns: Sequence[str], batch_size: int = 1000) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        part = self._partitions.get(company_id)
+        if part is None:
+            return
+        ids = sorted(part.rows)
+        for start in range(0, len(ids), batch_size):
+            yield [tuple(getattr(part.rows[i], c) for c in columns) for i in ids[start:start + batch_size] if i in part.rows]
+
+    async def page(
+        self,
+        company_id: str,
+        limit: int,
+        after: Optional[PageKey] = None,
+        descending: bool = False,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+        **filters: Any,
+    ) -> Tuple[List[BaseModel], Optional[PageKey]]:
+        if not self.order_by:
+            raise ValueError("该仓储未配置排序字段，不支持游标分页")
+        part = self._partitions.get(company_id)
+        if part is None:
+            return [], None
+        filters = {k: v for k, v in filters.items() if v is not None}
+        timeline = part.timeline
+
+        # 时间范围与游标都在时间索引上二分定位
+        lo = 0 if start is None else bisect.bisect_left(timeline, (start,))
+        hi = len(timeline) if end is None else bisect.bisect_right(timeline, (end, "\uffff"))
+        if after is not None:
+            if descending:
+                hi = min(hi, bisect.bisect_left(timeline, after))
+            else:
+                lo = max(lo, bisect.bisect_right(timeline, after))
+
+        candidates: Optional[Dict[str, None]] = None
+        for field, value in filters.items():
+            if field in part.secondary:
+                bucket = part.secondary[field].get(value, {})
+                if candidates is None or len(bucket) < len(candidates):
+                    candidates = bucket
+
+        position = len(self.indexes)
+        if candidates is not None and len(candidates) * 8 < hi - lo:
+            # 过滤条件选择性高：只对命中的行按键排序，不扫描时间索引
+            low_key = timeline[lo] if lo < hi else None
+            high_key = timeline[hi - 1] if lo < hi else None
+            keys = sorted(
+                key for key in ((part.keys[rid][position], rid) for rid in candidates)
+                if low_key is not None and low_key <= key <= high_key
+            )
+            ordered: Iterable[PageKey] = reversed(keys) if descending else keys
+        else:
+            ordered = (timeline[i] for i in (range(hi - 1, lo - 1, -1) if descending else range(lo, hi)))
+
+        rows = part.rows
+        result = []
+        for _, rid in ordered:
+            record = rows[rid]
+            if all(getattr(record, k) == v for k, v in filters.items()):
+                result.append(record)
+                if len(result) > limit:
+                    break
+        if len(result) > limit:
+            result = result[:limit]
+            return result, self.page_key(result[-1])
+        return result, None
+
+    async def update(self, company_id: str, record_id: str, record: BaseModel) -> Optional[BaseModel]:
+        part = self._partitions.get(company_id)
+        if part is None or record_id not in part.rows:
+            return None
+        self._unlink(part, record_id)
+        part.rows[record_id] = record
+        self._link(part, record)
+        return record
+
+    async def update_where(
+        self, company_id: str, record_id: str, expected: Dict[str, Any], changes: Dict[str, Any]
+    ) -> Optional[BaseModel]:
+        # 检查与写入之间没有await，在事件循环内是原子的
+        part = self._partitions.get(company_id)
+        current = part.rows.get(record_id) if part else None
+        if current is None or any(getattr(current, k) != v for k, v in expected.items()):
+            return None
+        updated = current.model_copy(update=changes)
+        self._unlink(part, record_id)
+        part.rows[record_id] = updated
+        self._link(part, updated)
+        # 返回副本：调用方修改返回的对象不能绕过条件直接改动仓储中的记录
+        return updated.model_copy()
+
+    async def delete(self, company_id: str, record_id: str) -> Optional[BaseModel]:
+        part = self._partitions.get(company_id)
+        if part is None or record_id not in part.rows:
+            return None
+        self._unlink(part, record_id)
+        del self._owner[record_id]
+        return part.rows.pop(record_id)
+
+    async def count(self, company_id: str) -> int:
+        part = self._partitions.get(company_id)
+        return len(part.rows) if part else 0
+
+    async def is_empty(self) -> bool:
+        return not self._owner
+
+
+class PostgresRepository(Repository):
+    # PostgreSQL实现，表结构见 init_db.py
+    # 通过 db.Database 的异步连接池访问，主键与 (company_id, 二级索引字段) 上均建有B树索引
+
+    def __init__(self, model: Type[BaseModel], table: str, database: Database, **kwargs: Any):
+        super().__init__(model, **kwargs)
+        self.table = table
+        self.database = database
+        self.columns = list(model.model_fields)
+        # JSONB / vector 列统一经由text传参和读取，避免依赖额外的类型编解码器
+        self._column_casts: Dict[str, str] = {}
+        for name, field in model.model_fields.items():
+            annotation = field.annotation
+            if get_origin(annotation) is Union:
+                # Optional[X] 取出X
+                annotation = next(a for a in get_args(annotation) if a is not type(None))
+            if annotation is dict or get_origin(annotation) is dict:
+                self._column_casts[name] = "jsonb"
+            elif get_origin(annotation) is list:
+                self._column_casts[name] = "vector"
+        self._json_columns = set(self._column_casts)
+        self._select_sql = "SELECT {} FROM {}".format(
+            ", ".join(f"{c}::text" if c in self._json_columns else c for c in self.columns), table
+        )
+        self._returning = self._select_sql[len("SELECT "):self._select_sql.index(" FROM ")]
+        self._insert_sql = self._build_insert()
+        # 整批的多行INSERT语句（尾批行数不定，临时生成）
+        self._insert_batch_sql: Optional[str] = None
+
+    def _placeholder(self, column: str, position: int) -> str:
+        if column in self._column_casts:
+            return f"${position}::text::{self._column_casts[column]}"
+        return f"${position}"
+
+    def _build_insert(self, rows: int = 1) -> str:
+        width = len(self.columns)
+        values = ", ".join(
+            "(" + ", ".join(self._placeholder(c, row * width + i) for i, c in enumerate(self.columns, 1)) + ")"
+            for row in range(rows)
+        )
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in self.columns if c not in self.primary_key)
+        return (
+            f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES {values} "
+            f"ON CONFLICT ({', '.join(self.primary_key)}) DO UPDATE SET {updates}"
+        )
+
+    def _to_param(self, column: str, value: Any) -> Any:
+        if column in self._json_columns and value is not None:
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def _to_params(self, record: BaseModel) -> List[Any]:
+        return [self._to_param(column, getattr(record, column)) for column in self.columns]
+
+    def _from_row(self, row: Optional[Sequence[Any]]) -> Optional[BaseModel]:
+        if row is None:
+            return None
+        data = dict(zip(self.columns, row))
+        for column in self._json_columns:
+            if isinstance(data.get(column), str):
+                data[column] = json.loads(data[column])
+        return self.model(**data)
+
+    async def add(self, record: BaseModel) -> BaseModel:
+        await self.database.execute(self._insert_sql, *self._to_params(record))
+        return record
+
+    async def add_many(self, records: Sequence[BaseModel]) -> None:
+        # 多行VALUES，每批一条语句；同一语句内主键重复会使 ON CONFLICT 报错，保留最后一条
+        unique = list({record.id: record for record in records}.values())
+        batch = max(1, min(INSERT_BATCH_ROWS, MAX_QUERY_PARAMS // len(self.columns)))
+        for start in range(0, len(unique), batch):
+            chunk = unique[start:start + batch]
+            if len(chunk) < batch:
+                sql = self._build_insert(len(chunk))
+            else:
+                if self._insert_batch_sql is None:
+                    self._insert_batch_sql = self._build_insert(batch)
+                sql = self._insert_batch_sql
+            await self.database.execute(sql, *[value for record in chunk for value in self._to_params(record)])
+
+    async def append_many(self, records: Sequence[BaseModel]) -> None:
+        if self._json_columns:
+            # JSONB/vector 列依赖SQL中的类型转换，仍走INSERT
+            await self.add_many(records)
+            return
+        await self.database.copy_records(self.table, self.columns, [self._to_params(r) for r in records])
+
+    async def get(self, company_id: str, record_id: str) -> Optional[BaseModel]:
+        sql = f"{self._select_sql} WHERE {self.partition_key} = $1 AND id = $2"
+        return self._from_row(await self.database.fetchrow(sql, company_id, record_id))
+
+    async def get_by_id(self, record_id: str) -> Optional[BaseModel]:
+        sql = f"{self._select_sql} WHERE id = $1"
+        return self._from_row(await self.database.fetchrow(sql, record_id))
+
+    async def find_unique(self, field: str, value: Any) -> Optional[BaseModel]:
+        if field not in self.unique:
+            raise ValueError(f"{field} 不是唯一索引字段")
+        sql = f"{self._select_sql} WHERE {field} = $1"
+        return self._from_row(await self.database.fetchrow(sql, value))
+
+    async def list(
+        self,
+        company_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        **filters: Any,
+    ) -> List[BaseModel]:
+        clauses = [f"{self.partition_key} = $1"]
+        params: List[Any] = [company_id]
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self.columns:
+                raise ValueError(f"未知的过滤字段：{field}")
+            params.append(value)
+            clauses.append(f"{field} = ${len(params)}")
+        if self.order_by and start is not None:
+            params.append(start)
+            clauses.append(f"{self.order_by} >= ${len(params)}")
+        if self.order_by and end is not None:
+            params.append(end)
+            clauses.append(f"{self.order_by} <= ${len(params)}")
+        sql = f"{self._select_sql} WHERE {' AND '.join(clauses)}"
+        if self.order_by:
+            sql += f" ORDER BY {self.order_by}, id"
+        rows = await self.database.fetch(sql, *params)
+        return [self._from_row(row) for row in rows]
+
+    async def list_all(self, **filters: Any) -> List[BaseModel]:
+        clauses = []
+        params: List[Any] = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self.columns:
+                raise ValueError(f"未知的过滤字段：{field}")
+            params.append(value)
+            clauses.append(f"{field} = ${len(params)}")
+        sql = self._select_sql
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        rows = await self.database.fetch(sql, *params)
+        return [self._from_row(row) for row in rows]
+
+    async def partitions(self) -> List[str]:
+        # 递归CTE逐个跳到下一个公司ID（松散索引扫描），只访问 (company_id, ...) 索引，不扫描整表
+        key = self.partition_key
+        sql = (
+            f"WITH RECURSIVE parts AS ("
+            f"SELECT min({key}) AS k FROM {self.table} "
+            f"UNION ALL SELECT (SELECT min({key}) FROM {self.table} WHERE {key} > parts.k) FROM parts WHERE parts.k IS NOT NULL"
+            f") SELECT k FROM parts WHERE k IS NOT NULL"
+        )
+        return [row[0] for row in await self.database.fetch(sql)]
+
+    async def scan(self, company_id: str, columns: Sequence[str], batch_size: int = 1000) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        unknown = [c for c in columns if c not in self.columns]
+        if unknown:
+            raise ValueError(f"未知字段：{', '.join(unknown)}")
+        # 按 (公司, id) 键集分页，每批一条索引范围查询
+        select = ", ".join(["id", *columns])
+        sql = (
+            f"SELECT {select} FROM {self.table} WHERE {self.partition_key} = $1 AND id > $2 "
+            f"ORDER BY id LIMIT $3"
+        )
+        after = ""
+        while True:
+            rows = await self.database.fetch(sql, company_id, after, batch_size)
+            if not rows:
+                return
+            after = rows[-1][0]
+            yield [tuple(row)[1:] for row in rows]
+            if len(rows) < batch_size:
+                return
+
+    async def page(
+        self,
+        company_id: str,
+        limit: int,
+        after: Optional[PageKey] = None,
+        descending: bool = False,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+        **filters: Any,
+    ) -> Tuple[List[BaseModel], Optional[PageKey]]:
+        if not self.order_by:
+            raise ValueError("该仓储未配置排序字段，不支持游标分页")
+        clauses = [f"{self.partition_key} = $1"]
+        params: List[Any] = [company_id]
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self.columns:
+                raise ValueError(f"未知的过滤字段：{field}")
+            params.append(value)
+            clauses.append(f"{field} = ${len(params)}")
+        if start is not None:
+            params.append(start)
+            clauses.append(f"{self.order_by} >= ${len(params)}")
+        if end is not None:
+            params.append(end)
+            clauses.append(f"{self.order_by} <= ${len(params)}")
+        if after is not None:
+            # 行值比较可直接利用 (company_id, order_by, id) 复合索引
+            params.extend(after)
+            clauses.append(f"({self.order_by}, id) {'<' if descending else '>'} (${len(params) - 1}, ${len(params)})")
+        params.append(limit + 1)
+        direction = "DESC" if descending else "ASC"
+
+        columns = self.columns
+        if fields:
+            # 只读取需要的列，避免大字段（如生成内容）参与传输
+            wanted = set(fields) | {"id", self.order_by}
+            columns = [c for c in self.columns if c in wanted]
+        select = ", ".join(f"{c}::text" if c in self._json_columns else c for c in columns)
+        sql = (
+            f"SELECT {select} FROM {self.table} WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {self.order_by} {direction}, id {direction} LIMIT ${len(params)}"
+        )
+        rows = await self.database.fetch(sql, *params)
+        if columns is self.columns:
+            records = [self._from_row(row) for row in rows]
+        else:
+            records = []
+            for row in rows:
+                data = dict(zip(columns, row))
+                for column in self._json_columns.intersection(data):
+                    if isinstance(data[column], str):
+                        data[column] = json.loads(data[column])
+                # 部分列的记录不做校验，只用于按字段投影输出
+                records.append(self.model.model_construct(**data))
+        if len(records) > limit:
+            records = records[:limit]
+            return records, self.page_key(records[-1])
+        return records, None
+
+    async def update(self, company_id: str, record_id: str, record: BaseModel) -> Optional[BaseModel]:
+        assignments = []
+        params: List[Any] = []
+        for column, value in zip(self.columns, self._to_params(record)):
+            if column == "id":
+                continue
+            params.append(value)
+            assignments.append(f"{column} = {self._placeholder(column, len(params))}")
+        params.extend([company_id, record_id])
+        sql = (
+            f"UPDATE {self.table} SET {', '.join(assignments)} "
+            f"WHERE {self.partition_key} = ${len(params) - 1} AND id = ${len(params)}"
+        )
+        status = await self.database.execute(sql, *params)
+        # asyncpg返回形如 "UPDATE 1" 的状态串
+        return record if status.split()[-1] != "0" else None
+
+    async def update_where(
+        self, company_id: str, record_id: str, expected: Dict[str, Any], changes: Dict[str, Any]
+    ) -> Optional[BaseModel]:
+        unknown = [c for c in (*expected, *changes) if c not in self.columns]
+        if unknown:
+            raise ValueError(f"未知字段：{', '.join(unknown)}")
+        params: List[Any] = [company_id, record_id]
+        assignments = []
+        for column, value in changes.items():
+            params.append(self._to_param(column, value))
+            assignments.append(f"{column} = {self._placeholder(column, len(params))}")
+        conditions = [f"{self.partition_key} = $1", "id = $2"]
+        for column, value in expected.items():
+            params.append(self._to_param(column, value))
+            # NULL 也参与比较（例如尚未被任何worker领取的任务）
+            conditions.append(f"{column} IS NOT DISTINCT FROM {self._placeholder(column, len(params))}")
+        sql = (
+            f"UPDATE {self.table} SET {', '.join(assignments)} "
+            f"WHERE {' AND '.join(conditions)} RETURNING {self._returning}"
+        )
+        return self._from_row(await self.database.fetchrow(sql, *params))
+
+    async def delete(self, company_id: str, record_id: str) -> Optional[BaseModel]:
+        sql = f"DELETE FROM {self.table} WHERE {self.partition_key} = $1 AND id = $2 RETURNING {self._returning}"
+        return self._from_row(await self.database.fetchrow(sql, company_id, record_id))
+
+    async def delete_many(self, company_id: str, record_ids: Sequence[str]) -> int:
+        if not record_ids:
+            return 0
+        sql = f"DELETE FROM {self.table} WHERE {self.partition_key} = $1 AND id = ANY($2::text[])"
+        status = await self.database.execute(sql, company_id, list(record_ids))
+        return int(status.split()[-1])
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.database.transaction():
+            yield
+
+    async def count(self, company_id: str) -> int:
+        sql = f"SELECT count(*) FROM {self.table} WHERE {self.partition_key} = $1"
+        row = await self.database.fetchrow(sql, company_id)
+        return row[0]
+
+    async def is_empty(self) -> bool:
+        return await self.database.fetchrow(f"SELECT 1 FROM {self.table} LIMIT 1") is None
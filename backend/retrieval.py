@@ -0,0 +1,359 @@
+import asyncio
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+# 知识库混合检索：BM25倒排索引（英文数字整词 + 中文字二元组）与向量索引分别召回，
+# 融合排序后交给重排模型精排。适合型号（如 SOMATOM-go.Top）、参数名等向量检索不敏感的精确匹配
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*|[一-鿿]+")
+
+# 查询扩展：标书常用的简称与同义表述
+DEFAULT_EXPANSIONS = {
+    "维保": ["维修", "保养", "售后"],
+    "售后": ["维修", "服务", "响应时间"],
+    "响应": ["响应时间", "到场"],
+    "培训": ["操作培训", "维修培训"],
+    "质保": ["保修", "质保期"],
+    "装机": ["安装", "调试"],
+    "业绩": ["案例", "中标"],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(unicodedata.normalize("NFKC", text).lower()):
+        word = match.group()
+        if word[0] < "一":
+            tokens.append(word)
+            # 型号等复合词同时索引各组成部分
+            parts = re.split(r"[-_./]", word)
+            if len(parts) > 1:
+                tokens.extend(p for p in parts if p)
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i: i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def expand_query(text: str, expansions: Optional[Dict[str, List[str]]] = None) -> str:
+    extra = [term for key, terms in (expansions or DEFAULT_EXPANSIONS).items() if key in text for term in terms]
+    return " ".join([text] + extra) if extra else text
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        # 出现在过半文档中的词区分度很低，查询中还有其他词时跳过以减少倒排表扫描
+        self.max_df_ratio = max_df_ratio
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._terms: Dict[str, Tuple[str, ...]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: str, text: str) -> None:
+        if doc_id in self._lengths:
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._terms[doc_id] = tuple(counts)
+        length = sum(counts.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: str) -> bool:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return False
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        return True
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        n = len(self._lengths)
+        if not n:
+            return []
+        terms = [t for t in set(tokenize(query)) if t in self._postings]
+        selective = [t for t in terms if len(self._postings[t]) <= n * self.max_df_ratio]
+        terms = selective or terms
+        avg_length = self._total_length / n
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings[term]
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class LexicalIndexManager:
+    # 按公司维护BM25索引，首次检索时由调用方从仓储加载，之后随切片增删增量维护
+
+    def __init__(self, **index_options: Any):
+        self.index_options = index_options
+        self._indexes: Dict[str, BM25Index] = {}
+
+    def loaded(self, company_id: str) -> bool:
+        return company_id in self._indexes
+
+    def load(self, company_id: str, documents: Iterable[Tuple[str, str]]) -> None:
+        index = BM25Index(**self.index_options)
+        for doc_id, text in documents:
+            index.add(doc_id, text)
+        self._indexes[company_id] = index
+
+    def add(self, company_id: str, documents: Iterable[Tuple[str, str]]) -> None:
+        index = self._indexes.get(company_id)
+        if index is None:
+            return
+        for doc_id, text in documents:
+            index.add(doc_id, text)
+
+    def remove(self, company_id: str, doc_id: str) -> None:
+        index = self._indexes.get(company_id)
+        if index is not None:
+            index.remove(doc_id)
+
+    def search(self, company_id: str, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        index = self._indexes.get(company_id)
+        return index.search(query, k) if index is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tenants": len(self._indexes),
+            "documents": sum(len(index) for index in self._indexes.values()),
+            "terms": sum(len(index._postings) for index in self._indexes.values()),
+        }
+
+
+# 重排模型：输入 (查询, 段落) 对，输出相关性分数（越大越相关）
+class Reranker:
+    name = ""
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        raise NotImplementedError
+
+
+class OverlapReranker(Reranker):
+    # 确定性桩实现：查询词在段落中的覆盖率，不加载模型，用于测试与开发
+    name = "overlap"
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        scores = []
+        for query, passage in pairs:
+            query_terms = set(tokenize(query))
+            passage_terms = set(tokenize(passage))
+            if not query_terms or not passage_terms:
+                scores.append(0.0)
+                continue
+            hit = len(query_terms & passage_terms)
+            scores.append(hit / len(query_terms) + hit / (len(passage_terms) * 10))
+        return scores
+
+
+class BGEReranker(Reranker):
+    # 本地 BGE 交叉编码器重排模型（需安装 FlagEmbedding）
+    name = "bge-reranker"
+
+    def __init__(self, model_path: str = "BAAI/bge-reranker-v2-m3", device: Optional[str] = None, batch_size: int = 32, max_length: int = 512):
+        self.model_path = model_path
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from FlagEmbedding import FlagReranker
+
+                    self._model = FlagReranker(self.model_path, use_fp16=self.device != "cpu", device=self.device)
+        return self._model
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        if not pairs:
+            return []
+        scores = self._load().compute_score([list(p) for p in pairs], batch_size=self.batch_size, max_length=self.max_length)
+        return [float(s) for s in np.atleast_1d(scores)]
+
+
+def create_reranker(backend: str = "overlap", model_path: Optional[str] = None, device: Optional[str] = None) -> Reranker:
+    if backend == "bge-reranker":
+        return BGEReranker(model_path or "BAAI/bge-reranker-v2-m3", device=device)
+    if backend == "overlap":
+        return OverlapReranker()
+    raise ValueError(f"不支持的重排后端：{backend}，有效值为：overlap, bge-reranker")
+
+
+class RerankBatcher:
+    # 同时到达的多个检索请求的候选段落合并为一次模型调用（在线程池中执行）
+
+    def __init__(self, reranker: Reranker, max_pairs: int = 64, window: float = 0.005):
+        self.reranker = reranker
+        self.max_pairs = max_pairs
+        self.window = window
+        self._pending: List[Tuple[List[Tuple[str, str]], asyncio.Future]] = []
+        self._pending_pairs = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+        self._requests_total = 0
+        self._batches_total = 0
+        self._pairs_total = 0
+        self._seconds_total = 0.0
+
+    async def score(self, query: str, passages: Sequence[str]) -> List[float]:
+        if not passages:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(([(query, p) for p in passages], future))
+        self._pending_pairs += len(passages)
+        self._requests_total += 1
+        if self._pending_pairs >= self.max_pairs:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_pairs = self._pending, [], 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch: List[Tuple[List[Tuple[str, str]], asyncio.Future]]) -> None:
+        pairs = [pair for request_pairs, _ in batch for pair in request_pairs]
+        started = time.perf_counter()
+        try:
+            scores = await asyncio.get_running_loop().run_in_executor(None, self.reranker.score, pairs)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._batches_total += 1
+        self._pairs_total += len(pairs)
+        self._seconds_total += time.perf_counter() - started
+        offset = 0
+        for request_pairs, future in batch:
+            if not future.done():
+                future.set_result(scores[offset: offset + len(request_pairs)])
+            offset += len(request_pairs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reranker": self.reranker.name,
+            "requests_total": self._requests_total,
+            "batches_total": self._batches_total,
+            "avg_pairs_per_batch": round(self._pairs_total / self._batches_total, 2) if self._batches_total else 0.0,
+            "avg_batch_ms": round(self._seconds_total / self._batches_total * 1000, 2) if self._batches_total else 0.0,
+        }
+
+
+# vector_search(company_id, vector, k, mode, nprobe) -> [(id, score)]；fetch(company_id, ids) -> {id: 带content属性的记录}
+VectorSearch = Callable[[str, Sequence[float], int, str, int], Awaitable[List[Tuple[str, float]]]]
+Fetch = Callable[[str, List[str]], Awaitable[Dict[str, Any]]]
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+class HybridRetriever:
+    def __init__(
+        self,
+        lexical: LexicalIndexManager,
+        vector_search: VectorSearch,
+        fetch: Fetch,
+        reranker: RerankBatcher,
+        expansions: Optional[Dict[str, List[str]]] = None,
+        rrf_k: int = 60,
+    ):
+        self.lexical = lexical
+        self._vector_search = vector_search
+        self._fetch = fetch
+        self.reranker = reranker
+        self.expansions = expansions or DEFAULT_EXPANSIONS
+        self.rrf_k = rrf_k
+
+    def fuse(
+        self,
+        lexical_hits: List[Tuple[str, float]],
+        vector_hits: List[Tuple[str, float]],
+        fusion: str = "rrf",
+        alpha: float = 0.5,
+    ) -> List[Tuple[str, float]]:
+        # rrf：按排名倒数融合，不受两路分数量纲影响；weighted：各路分数按最大值归一化后加权，alpha为向量一路的权重
+        scores: Dict[str, float] = {}
+        for weight, hits in ((1 - alpha, lexical_hits), (alpha, vector_hits)):
+            if not hits:
+                continue
+            top = max(score for _, score in hits) or 1.0
+            for rank, (doc_id, score) in enumerate(hits):
+                value = 1.0 / (self.rrf_k + rank + 1) if fusion == "rrf" else weight * score / top
+                scores[doc_id] = scores.get(doc_id, 0.0) + value
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    async def search(
+        self,
+        company_id: str,
+        query: str,
+        vector: Optional[Sequence[float]] = None,
+        top_k: int = 5,
+        candidates: int = 20,
+        fusion: str = "rrf",
+        alpha: float = 0.5,
+        rerank: bool = True,
+        mode: str = "auto",
+        nprobe: int = 8,
+    ) -> List[Dict[str, Any]]:
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"无效的融合方式，有效值为：{', '.join(FUSION_METHODS)}")
+        lexical_hits = self.lexical.search(company_id, expand_query(query, self.expansions), candidates)
+        vector_hits = await self._vector_search(company_id, vector, candidates, mode, nprobe) if vector is not None else []
+        fused = self.fuse(lexical_hits, vector_hits, fusion, alpha)[:candidates]
+        records = await self._fetch(company_id, [doc_id for doc_id, _ in fused])
+        fused = [(doc_id, score) for doc_id, score in fused if doc_id in records]
+        lexical_scores = dict(lexical_hits)
+        vector_scores = dict(vector_hits)
+        rerank_scores: List[Optional[float]] = [None] * len(fused)
+        if rerank and len(fused) > 1:
+            rerank_scores = await self.reranker.score(query, [records[doc_id].content for doc_id, _ in fused])
+            order = sorted(range(len(fused)), key=lambda i: rerank_scores[i], reverse=True)
+        else:
+            order = list(range(len(fused)))
+        return [
+            {
+                "id": fused[i][0],
+                "record": records[fused[i][0]],
+                "score": float(rerank_scores[i]) if rerank_scores[i] is not None else fused[i][1],
+                "fused_score": fused[i][1],
+                "lexical_score": lexical_scores.get(fused[i][0]),
+                "vector_score": vector_scores.get(fused[i][0]),
+            }
+            for i in order[:top_k]
+        ]
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import re
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import Executor
+from typing import AsyncIterator, Deque, Dict, List, Tuple
+from xml.etree import ElementTree
+
+
+# 招标文件解析：按页(或段落块)切分后在进程池中并行解析，逐批产出RFP项
+# 支持 PDF(pypdf)、Word .docx、纯文本(以换页符\f分页)；旧版Word(.doc)不是zip格式，无法解析，直接拒绝
+# .docx 只流式读取一遍 word/document.xml，按段落块写成以换页符分页的临时纯文本，之后各批按字节区间读取
+
+
+# Word没有物理分页，按固定段落数切块
+DOCX_PARAGRAPHS_PER_PAGE = 40
+READ_BLOCK_SIZE = 1024 * 1024
+
+OPERATOR_ALIASES = {
+    "≥": ">=",
+    ">=": ">=",
+    "≤": "<=",
+    "<=": "<=",
+    ">": ">",
+    "<": "<",
+    "=": "=",
+    "不低于": ">=",
+    "不少于": ">=",
+    "不小于": ">=",
+    "大于等于": ">=",
+    "大于": ">",
+    "高于": ">",
+    "不高于": "<=",
+    "不大于": "<=",
+    "不超过": "<=",
+    "小于等于": "<=",
+    "小于": "<",
+    "低于": "<",
+}
+
+_operator_pattern = "|".join(sorted((re.escape(op) for op in OPERATOR_ALIASES), key=len, reverse=True))
+PARAM_PATTERN = re.compile(
+    r"^\s*(?:[\d.]+[、.)）]?\s*)?[★▲*]?\s*"
+    r"(?P<key>[一-龥A-Za-z][^:：≥≤<>=\n]{0,40}?)\s*[:：]?\s*"
+    rf"(?P<op>{_operator_pattern})\s*(?P<value>[^，。；;\n]+)"
+)
+QUALIFICATION_PATTERN = re.compile(r"(注册证|许可证|备案凭证|营业执照|资质证书|授权书|资格证明|ISO\s*\d+)")
+DISQUALIFICATION_PATTERN = re.compile(r"(废标|无效投标|否决投标|投标无效|不予受理)")
+
+# 对应 rfp_items 表的 VARCHAR(100)
+MAX_VALUE_LENGTH = 100
+
+PageRef = Tuple[int, int]
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# 旧版Word等OLE复合文档的文件头
+OLE_MAGIC = b"\xd0\xcf\x11\xe0"
+UNSUPPORTED_DOC = "不支持旧版Word(.doc)文件，请另存为.docx后上传"
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".doc":
+        raise ValueError(UNSUPPORTED_DOC)
+    if not ext:
+        # 内容寻址存储中的文件没有扩展名，按文件头判断
+        with open(path, "rb") as f:
+            head = f.read(4)
+        if head == b"%PDF":
+            return "pdf"
+        if head == b"PK\x03\x04":
+            return "docx"
+        if head == OLE_MAGIC:
+            raise ValueError(UNSUPPORTED_DOC)
+        return "text"
+    if ext == ".pdf":
+        return "pdf"
+    if ext == ".docx":
+        return "docx"
+    return "text"
+
+
+def docx_to_text(path: str) -> str:
+    # 流式解析正文XML（含表格中的段落），每 DOCX_PARAGRAPHS_PER_PAGE 段插入一个换页符；返回临时文本文件路径
+    fd, text_path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml, os.fdopen(fd, "w", encoding="utf-8") as out:
+            count = 0
+            for _, element in ElementTree.iterparse(xml, events=("end",)):
+                if element.tag != f"{WORD_NS}p":
+                    continue
+                parts = []
+                for node in element.iter():
+                    if node.tag == f"{WORD_NS}t" and node.text:
+                        parts.append(node.text)
+                    elif node.tag == f"{WORD_NS}tab":
+                        parts.append("\t")
+                    elif node.tag in (f"{WORD_NS}br", f"{WORD_NS}cr"):
+                        parts.append("\n")
+                element.clear()
+                if count and count % DOCX_PARAGRAPHS_PER_PAGE == 0:
+                    out.write("\f")
+                out.write("".join(parts) + "\n")
+                count += 1
+    except BaseException:
+        os.remove(text_path)
+        raise
+    return text_path
+
+
+def split_pages(path: str) -> Tuple[str, List[PageRef]]:
+    # 返回 (按页读取的来源文件, 页面引用)；来源与 path 不同时是临时文件，由调用方用完后删除
+    source = docx_to_text(path) if detect_format(path) == "docx" else path
+    try:
+        return source, scan_pages(source)
+    except BaseException:
+        if source != path:
+            os.remove(source)
+        raise
+
+
+def scan_pages(path: str) -> List[PageRef]:
+    # 只做分页定位，不抽取正文，返回每页的引用
+    fmt = detect_format(path)
+    if fmt == "pdf":
+        from pypdf import PdfReader
+
+        return [(i, i + 1) for i in range(len(PdfReader(path).pages))]
+    if fmt == "docx":
+        raise ValueError("Word文档需先经 split_pages 转为纯文本")
+    # 纯文本：流式扫描换页符，记录每页的字节区间
+    pages = []
+    start = offset = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            pos = block.find(b"\f")
+            while pos != -1:
+                pages.append((start, offset + pos))
+                start = offset + pos + 1
+                pos = block.find(b"\f", pos + 1)
+            offset += len(block)
+    if offset > start:
+        pages.append((start, offset))
+    return pages
+
+
+def read_pages(path: str, refs: List[PageRef]) -> List[str]:
+    fmt = detect_format(path)
+    if fmt == "pdf":
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        return [reader.pages[start].extract_text() or "" for start, _ in refs]
+    if fmt == "docx":
+        raise ValueError("Word文档需先经 split_pages 转为纯文本")
+    texts = []
+    with open(path, "rb") as f:
+        for start, end in refs:
+            f.seek(start)
+            texts.append(f.read(end - start).decode("utf-8", errors="ignore"))
+    return texts
+
+
+def extract_items(text: str) -> List[Dict[str, str]]:
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if DISQUALIFICATION_PATTERN.search(line):
+            keyword = DISQUALIFICATION_PATTERN.search(line).group(1)
+            items.append({"section_type": "disqualification", "content": line, "extracted_key": keyword, "extracted_value": line[:MAX_VALUE_LENGTH], "operator": ""})
+            continue
+        match = PARAM_PATTERN.match(line)
+        if match:
+            items.append({
+                "section_type": "technical_param",
+                "content": line,
+                "extracted_key": match.group("key").strip()[:MAX_VALUE_LENGTH],
+                "extracted_value": match.group("value").strip()[:MAX_VALUE_LENGTH],
+                "operator": OPERATOR_ALIASES[match.group("op")],
+            })
+            continue
+        qualification = QUALIFICATION_PATTERN.search(line)
+        if qualification:
+            items.append({"section_type": "qualification", "content": line, "extracted_key": qualification.group(1), "extracted_value": line[:MAX_VALUE_LENGTH], "operator": ""})
+    return items
+
+
+def parse_pages(path: str, refs: List[PageRef]) -> List[Dict[str, str]]:
+    # 在子进程中执行：读取一批页面并抽取RFP项
+    items = []
+    for text in read_pages(path, refs):
+        items.extend(extract_items(text))
+    return items
+
+
+async def parse_rfp(
+    path: str,
+    executor: Executor,
+    pages_per_task: int = 5,
+    max_in_flight: int = 8,
+) -> AsyncIterator[List[Dict[str, str]]]:
+    # 按页序逐批产出解析结果；同时在途的任务数有上限，内存占用与文件页数无关
+    # 先完成的后续批次在窗口中等待前面的批次，写入的RFP项顺序与文件顺序一致
+    loop = asyncio.get_running_loop()
+    source, refs = await loop.run_in_executor(executor, split_pages, path)
+    pending: Deque[asyncio.Future] = deque()
+    try:
+        batches = [refs[i: i + pages_per_task] for i in range(0, len(refs), pages_per_task)]
+        next_batch = 0
+        while next_batch < len(batches) or pending:
+            while next_batch < len(batches) and len(pending) < max_in_flight:
+                pending.append(loop.run_in_executor(executor, parse_pages, source, batches[next_batch]))
+                next_batch += 1
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+        if source != path:
+            os.remove(source)
@@ -0,0 +1,193 @@
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from http_cache import ResourceVersions
+
+# RFP项存储：招标文件的抽取结果按项目整体读写，单个招标文件通常有数百到数千行
+# 写入：新增走仓储的批量追加（PostgreSQL为COPY），修改走多行VALUES的 INSERT ... ON CONFLICT，删除按主键数组一条语句完成
+# 读取：按项目缓存全部RFP项，并建立 section_type、(section_type, extracted_key) 索引；偏离表、标书生成按类型或参数名取数不再查库
+# 修订版招标文件重新解析时按自然键 (section_type, extracted_key) 与现有行比对，只写入变化的行，未变化的行保留原ID
+# 缓存按项目LRU淘汰；写入后更新项目的资源版本号并丢弃缓存，读取时版本不一致则重新加载（多worker部署时版本号共享）
+# 一次操作的多条语句（整体替换、差异同步、分批写入）在同一事务中执行，失败时项目的RFP项保持原样；
+# 版本号在提交后才更新，避免其他请求在提交前按新版本缓存旧数据
+
+COMPARED_FIELDS = ("content", "extracted_value", "operator")
+
+
+class ProjectItems:
+    __slots__ = ("rows", "by_section", "by_key", "version")
+
+    def __init__(self, items: Sequence[BaseModel], version: Optional[str]):
+        # 保持写入顺序
+        self.rows: Dict[str, BaseModel] = {}
+        self.by_section: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self.by_key: Dict[Tuple[str, str], Dict[str, None]] = defaultdict(dict)
+        self.version = version
+        for item in items:
+            self.rows[item.id] = item
+            self.by_section[item.section_type][item.id] = None
+            self.by_key[(item.section_type, item.extracted_key)][item.id] = None
+
+    def query(self, section_type: Optional[str] = None, extracted_key: Optional[str] = None) -> List[BaseModel]:
+        if extracted_key is not None:
+            if section_type is not None:
+                ids = self.by_key.get((section_type, extracted_key), {})
+            else:
+                ids = [rid for (_, key), bucket in self.by_key.items() if key == extracted_key for rid in bucket]
+        elif section_type is not None:
+            ids = self.by_section.get(section_type, {})
+        else:
+            return list(self.rows.values())
+        return [self.rows[rid] for rid in ids]
+
+
+def _fingerprint(item: BaseModel) -> Tuple[Any, ...]:
+    return tuple(getattr(item, f) for f in COMPARED_FIELDS)
+
+
+def diff_items(existing: Sequence[BaseModel], incoming: Sequence[BaseModel]) -> Tuple[List[BaseModel], List[BaseModel], List[str], int]:
+    # 返回 (新增, 修改（沿用原ID）, 删除的ID, 未变化行数)
+    # 同一自然键下先配对内容完全相同的行，剩余的按内容排序两两配对为修改，多出的新增或删除
+    old_groups: Dict[Tuple[str, str], List[BaseModel]] = defaultdict(list)
+    new_groups: Dict[Tuple[str, str], List[BaseModel]] = defaultdict(list)
+    for item in existing:
+        old_groups[(item.section_type, item.extracted_key)].append(item)
+    for item in incoming:
+        new_groups[(item.section_type, item.extracted_key)].append(item)
+
+    inserted: List[BaseModel] = []
+    updated: List[BaseModel] = []
+    deleted: List[str] = []
+    unchanged = 0
+    for key in old_groups.keys() | new_groups.keys():
+        old_items = old_groups.get(key, [])
+        new_items = new_groups.get(key, [])
+        unmatched: Dict[Tuple[Any, ...], List[BaseModel]] = defaultdict(list)
+        for item in old_items:
+            unmatched[_fingerprint(item)].append(item)
+        remaining_new = []
+        for item in new_items:
+            candidates = unmatched.get(_fingerprint(item))
+            if candidates:
+                candidates.pop()
+                unchanged += 1
+            else:
+                remaining_new.append(item)
+        remaining_old = sorted((item for items in unmatched.values() for item in items), key=_fingerprint)
+        remaining_new.sort(key=_fingerprint)
+        for old, new in zip(remaining_old, remaining_new):
+            updated.append(new.model_copy(update={"id": old.id}))
+        inserted.extend(remaining_new[len(remaining_old):])
+        deleted.extend(item.id for item in remaining_old[len(remaining_new):])
+    return inserted, updated, deleted, unchanged
+
+
+class RFPItemStore:
+    def __init__(self, repository, versions: ResourceVersions, max_projects: int = 256):
+        self.repository = repository
+        self.versions = versions
+        self.max_projects = max_projects
+        self._projects: "OrderedDict[Tuple[str, str], ProjectItems]" = OrderedDict()
+        self._hits = 0
+        self._loads = 0
+        self._rows_written = 0
+
+    @staticmethod
+    def _resource(project_id: str) -> str:
+        return f"rfp_items:{project_id}"
+
+    async def _project(self, company_id: str, project_id: str) -> ProjectItems:
+        key = (company_id, project_id)
+        # 先读版本再读数据，加载期间发生的写入会在下次读取时触发重新加载
+        version = await self.versions.get(company_id, self._resource(project_id))
+        cached = self._projects.get(key)
+        if cached is not None and cached.version == version:
+            self._projects.move_to_end(key)
+            self._hits += 1
+            return cached
+        self._loads += 1
+        items = await self.repository.list(company_id, project_id=project_id)
+        cached = ProjectItems(items, version)
+        self._projects[key] = cached
+        self._projects.move_to_end(key)
+        while len(self._projects) > self.max_projects:
+            self._projects.popitem(last=False)
+        return cached
+
+    async def _changed(self, company_id: str, project_id: str, rows: int) -> None:
+        self._rows_written += rows
+        await self.versions.bump(company_id, self._resource(project_id))
+        self._projects.pop((company_id, project_id), None)
+
+    async def list(self, company_id: str, project_id: str, section_type: Optional[str] = None, extracted_key: Optional[str] = None) -> List[BaseModel]:
+        return (await self._project(company_id, project_id)).query(section_type, extracted_key)
+
+    async def get(self, company_id: str, project_id: str, item_id: str) -> Optional[BaseModel]:
+        return (await self._project(company_id, project_id)).rows.get(item_id)
+
+    async def insert_many(self, company_id: str, project_id: str, items: Sequence[BaseModel]) -> int:
+        if not items:
+            return 0
+        async with self.repository.transaction():
+            await self.repository.append_many(items)
+        await self._changed(company_id, project_id, len(items))
+        return len(items)
+
+    async def update(self, company_id: str, project_id: str, item: BaseModel) -> Optional[BaseModel]:
+        if await self.get(company_id, project_id, item.id) is None:
+            return None
+        await self.repository.update(company_id, item.id, item)
+        await self._changed(company_id, project_id, 1)
+        return item
+
+    async def delete(self, company_id: str, project_id: str, item_ids: Optional[Sequence[str]] = None, section_type: Optional[str] = None) -> int:
+        # 不指定ID时删除项目（指定类型）的全部RFP项
+        project = await self._project(company_id, project_id)
+        if item_ids is None:
+            item_ids = [item.id for item in project.query(section_type)]
+        else:
+            item_ids = [rid for rid in item_ids if rid in project.rows]
+        if not item_ids:
+            return 0
+        deleted = await self.repository.delete_many(company_id, item_ids)
+        await self._changed(company_id, project_id, deleted)
+        return deleted
+
+    async def replace(self, company_id: str, project_id: str, items: Sequence[BaseModel]) -> Dict[str, int]:
+        existing = list((await self._project(company_id, project_id)).rows)
+        deleted = 0
+        async with self.repository.transaction():
+            if existing:
+                deleted = await self.repository.delete_many(company_id, existing)
+            if items:
+                await self.repository.append_many(items)
+        if deleted or items:
+            await self._changed(company_id, project_id, deleted + len(items))
+        return {"inserted": len(items), "updated": 0, "deleted": deleted, "unchanged": 0}
+
+    async def sync(self, company_id: str, project_id: str, items: Sequence[BaseModel]) -> Dict[str, int]:
+        # 差异写入：以 items 为项目的完整RFP项集合
+        existing = list((await self._project(company_id, project_id)).rows.values())
+        inserted, updated, deleted, unchanged = diff_items(existing, items)
+        async with self.repository.transaction():
+            if deleted:
+                await self.repository.delete_many(company_id, deleted)
+            if updated:
+                await self.repository.add_many(updated)
+            if inserted:
+                await self.repository.append_many(inserted)
+        if inserted or updated or deleted:
+            await self._changed(company_id, project_id, len(inserted) + len(updated) + len(deleted))
+        return {"inserted": len(inserted), "updated": len(updated), "deleted": len(deleted), "unchanged": unchanged}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached_projects": len(self._projects),
+            "cached_rows": sum(len(p.rows) for p in self._projects.values()),
+            "max_projects": self.max_projects,
+            "hits": self._hits,
+            "loads": self._loads,
+            "rows_written": self._rows_written,
+        }
@@ -0,0 +1,159 @@
+import json
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, Optional, Sequence, Tuple, Type
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+# 快速响应序列化：热点GET接口直接返回编码好的JSON字节，跳过FastAPI对返回值的 jsonable_encoder 逐字段转换与响应模型二次校验
+# 记录由pydantic-core按模型声明直接编码（model_dump_json 不重新校验）；其他内容用orjson编码（未安装时退回标准库json）
+# 不可变记录（已定稿的标书、操作日志）的编码结果按 (模型, 公司, ID, 版本) 缓存字节，重复请求直接拼接
+# 大列表分批编码、流式输出，不在内存中拼出完整的JSON字符串
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"无法序列化的类型：{type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RecordEncoder:
+    # 不可变记录的编码缓存按字节数上限做LRU淘汰；版本函数返回None表示该记录当前可变，不缓存
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, timer: Optional[Callable[[], Any]] = None):
+        self.max_bytes = max_bytes
+        self._timer = timer or nullcontext
+        self._versions: Dict[Type[BaseModel], Callable[[BaseModel], Optional[Hashable]]] = {}
+        self._entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def cache_when(self, model: Type[BaseModel], version: Callable[[BaseModel], Optional[Hashable]]) -> None:
+        self._versions[model] = version
+
+    def _cache_key(self, record: BaseModel) -> Optional[Tuple]:
+        version = self._versions.get(type(record))
+        if version is None:
+            return None
+        value = version(record)
+        if value is None:
+            return None
+        return type(record), getattr(record, "company_id", None), record.id, value
+
+    def encode(self, record: Any) -> bytes:
+        with self._timer():
+            return self._encode(record)
+
+    def _encode(self, record: Any) -> bytes:
+        if not isinstance(record, BaseModel):
+            return dumps(record)
+        key = self._cache_key(record)
+        if key is None:
+            return record.model_dump_json().encode("utf-8")
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return data
+            self._misses += 1
+        data = record.model_dump_json().encode("utf-8")
+        if len(data) > self.max_bytes // 16:
+            # 单条过大的记录不占用缓存
+            return data
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+                    self._evictions += 1
+        return data
+
+    def encode_array(self, records: Iterable[Any]) -> bytes:
+        with self._timer():
+            return b"[" + b",".join([self._encode(record) for record in records]) + b"]"
+
+    async def iter_array(self, records: Sequence[Any], batch_size: int) -> AsyncIterator[bytes]:
+        # 每批单独编码并发送，批与批之间让出事件循环
+        yield b"["
+        for start in range(0, len(records), batch_size):
+            with self._timer():
+                chunk = b",".join([self._encode(record) for record in records[start:start + batch_size]])
+            yield chunk if start == 0 else b"," + chunk
+        yield b"]"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "encoder": "orjson" if orjson is not None else "json",
+                "cached_records": len(self._entries),
+                "cached_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+def _passthrough_headers(response: Optional[Response]) -> Dict[str, str]:
+    # 依赖注入的 Response 上设置的头（如分页游标）；直接返回响应对象时FastAPI不会自动合并
+    if response is None:
+        return {}
+    return {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+
+
+def record_response(encoder: RecordEncoder, record: Any, response: Optional[Response] = None) -> Response:
+    return Response(encoder.encode(record), media_type=JSON_MEDIA_TYPE, headers=_passthrough_headers(response))
+
+
+def records_response(
+    encoder: RecordEncoder,
+    records: Sequence[Any],
+    response: Optional[Response] = None,
+    stream_threshold: int = 500,
+    batch_size: int = 200,
+) -> Response:
+    # 行数较少时一次编码（带Content-Length），超过阈值时分批流式输出
+    headers = _passthrough_headers(response)
+    if len(records) < stream_threshold:
+        return Response(encoder.encode_array(records), media_type=JSON_MEDIA_TYPE, headers=headers)
+    return StreamingResponse(encoder.iter_array(list(records), batch_size), media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,196 @@
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from deviation import DeviationEngine, normalize_param_name
+
+
+# 产品参数索引：按 (公司, 产品型号, 规范化参数名) 组织，数值在写入时预先解析
+# 参数名先规范化再做同义词/别名解析，例如“探测器排数/层数”与“探测器排数”归为同一键
+# 每个公司的索引记录所对应的资源版本号（product_specs）。本worker写入时增量更新索引并记录新版本，
+# 前提是索引正好处于写入前的版本；版本有跳跃（其他worker写入过）或读取前发现版本不一致时整体重新加载；
+# 绕过接口直接改库时由 max_age 兜底
+
+
+# 每组第一个名称为标准名
+DEFAULT_SYNONYMS: List[Sequence[str]] = [
+    ("探测器排数", "探测器排数/层数", "探测器层数", "探测器排数层数", "探测器物理排数"),
+    ("机架孔径", "扫描孔径", "机架孔径尺寸"),
+    ("球管热容量", "球管阳极热容量", "阳极热容量"),
+    ("球管散热率", "球管阳极散热率", "阳极散热率", "阳极最大散热率"),
+    ("发生器功率", "高压发生器功率", "高压发生器最大功率", "发生器最大输出功率"),
+    ("机架旋转时间", "旋转时间", "最快旋转时间", "最短旋转时间", "机架最快旋转时间"),
+    ("空间分辨率", "高对比度分辨率", "高对比分辨率"),
+    ("低对比度分辨率", "低对比分辨率", "密度分辨率"),
+    ("磁场强度", "主磁场强度", "场强"),
+    ("梯度场强", "最大梯度场强", "梯度强度"),
+    ("切换率", "梯度切换率", "最大切换率"),
+]
+
+# 别名中常见的并列分隔符，例如“排数/层数”
+ALIAS_SEPARATORS = ("/", "或")
+
+
+class SynonymTable:
+    def __init__(self, groups: Iterable[Sequence[str]] = DEFAULT_SYNONYMS):
+        self._canonical: Dict[str, str] = {}
+        for group in groups:
+            self.add_group(group)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "SynonymTable":
+        # 可选的JSON文件：[["标准名", "别名1", ...], ...]，在默认同义词基础上追加
+        table = cls()
+        if path:
+            with open(path, encoding="utf-8") as f:
+                for group in json.load(f):
+                    table.add_group(group)
+        return table
+
+    def add_group(self, group: Sequence[str]) -> None:
+        if not group:
+            return
+        canonical = normalize_param_name(group[0])
+        for name in group:
+            self._canonical[normalize_param_name(name)] = canonical
+
+    def resolve(self, name: str) -> str:
+        key = normalize_param_name(name)
+        if key in self._canonical:
+            return self._canonical[key]
+        # 未登记的组合名按第一个可识别的分项归并，否则取第一个分项
+        for separator in ALIAS_SEPARATORS:
+            if separator in key:
+                parts = [part for part in key.split(separator) if part]
+                for part in parts:
+                    if part in self._canonical:
+                        return self._canonical[part]
+                if parts:
+                    return parts[0]
+        return key
+
+
+class _TenantSpecs:
+    def __init__(self, resolve, version: Optional[str]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.engine = DeviationEngine(name_key=resolve)
+        # 参数ID -> 参数，保持写入顺序，用于分页
+        self.specs: Dict[str, object] = {}
+        # 型号 -> 有序参数ID集合
+        self.by_model: Dict[str, Dict[str, None]] = {}
+        # 参数ID -> 搜索文本（参数名、比对键、参数值）
+        self.search_text: Dict[str, str] = {}
+
+
+class ProductSpecIndex:
+    def __init__(self, synonyms: Optional[SynonymTable] = None, max_age: float = 300.0):
+        self.synonyms = synonyms or SynonymTable()
+        self.max_age = max_age
+        self._tenants: Dict[str, _TenantSpecs] = {}
+
+    def current(self, company_id: str, version: Optional[str]) -> bool:
+        tenant = self._tenants.get(company_id)
+        return (
+            tenant is not None
+            and tenant.version == version
+            and time.monotonic() - tenant.loaded_at < self.max_age
+        )
+
+    def load(self, company_id: str, specs: Iterable, version: Optional[str] = None) -> None:
+        tenant = _TenantSpecs(self.synonyms.resolve, version)
+        for spec in specs:
+            self._insert(tenant, spec)
+        self._tenants[company_id] = tenant
+
+    def invalidate(self, company_id: str) -> None:
+        self._tenants.pop(company_id, None)
+
+    def apply(self, company_id: str, previous: Optional[str], version: str, upsert=None, remove=None) -> bool:
+        # 本worker写入后的增量更新：previous/version 为 ResourceVersions.bump 的返回值
+        # 未加载的公司不处理，首次使用时整体加载；版本跳跃时丢弃索引，返回是否已增量应用
+        tenant = self._tenants.get(company_id)
+        if tenant is None:
+            return False
+        if tenant.version != previous:
+            self.invalidate(company_id)
+            return False
+        if remove is not None and remove.id in tenant.specs:
+            self._delete(tenant, tenant.specs[remove.id])
+        if upsert is not None:
+            existing = tenant.specs.get(upsert.id)
+            if existing is not None:
+                self._delete(tenant, existing)
+            self._insert(tenant, upsert)
+        tenant.version = version
+        return True
+
+    def engine(self, company_id: str) -> DeviationEngine:
+        return self._tenants[company_id].engine
+
+    def query(
+        self,
+        company_id: str,
+        product_model: Optional[str] = None,
+        is_core_param: Optional[bool] = None,
+        q: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> Tuple[int, List]:
+        # 返回 (总数, 当前页)
+        tenant = self._tenants[company_id]
+        if product_model is not None:
+            ids: Iterable[str] = tenant.by_model.get(product_model, {})
+        else:
+            ids = tenant.specs
+        needle = q.strip().lower() if q else ""
+        # 只含符号的关键字规范化后为空串，空串是任何文本的子串，不能参与匹配
+        alias = self.synonyms.resolve(needle) if needle else ""
+        if needle and not alias:
+            raise ValueError("搜索关键字不能只包含符号")
+        total = 0
+        page = []
+        for spec_id in ids:
+            spec = tenant.specs[spec_id]
+            if is_core_param is not None and spec.is_core_param != is_core_param:
+                continue
+            if needle:
+                text = tenant.search_text[spec_id]
+                if needle not in text and alias not in text:
+                    continue
+            if offset <= total < offset + limit:
+                page.append(spec)
+            total += 1
+        return total, page
+
+    def stats(self, company_id: str) -> Dict[str, int]:
+        tenant = self._tenants.get(company_id)
+        if tenant is None:
+            return {"specs": 0, "models": 0}
+        return {"specs": len(tenant.specs), "models": len(tenant.by_model)}
+
+    def _insert(self, tenant: _TenantSpecs, spec) -> None:
+        key = tenant.engine.add_spec(spec)
+        tenant.specs[spec.id] = spec
+        tenant.by_model.setdefault(spec.product_model, {})[spec.id] = None
+        tenant.search_text[spec.id] = "\n".join((spec.param_name.lower(), key, spec.param_value.lower()))
+
+    def _delete(self, tenant: _TenantSpecs, spec) -> None:
+        tenant.engine.remove_spec(spec)
+        tenant.specs.pop(spec.id, None)
+        tenant.search_text.pop(spec.id, None)
+        model_ids = tenant.by_model.get(spec.product_model)
+        if model_ids is None:
+            return
+        model_ids.pop(spec.id, None)
+        if not model_ids:
+            del tenant.by_model[spec.product_model]
+            return
+        # 同型号下若有别名指向同一比对键的其他参数，恢复其条目
+        key = self.synonyms.resolve(spec.param_name)
+        if tenant.engine.lookup(spec.product_model, spec.param_name) is None:
+            for other_id in model_ids:
+                other = tenant.specs[other_id]
+                if self.synonyms.resolve(other.param_name) == key:
+                    tenant.engine.add_spec(other)
+                    break
@@ -0,0 +1,5 @@
+# 后端模块是平铺的顶层模块（与 main.py 相同的导入方式），测试从 backend 目录导入
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
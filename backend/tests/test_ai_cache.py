@@ -0,0 +1,76 @@
+import pytest
+
+from ai_cache import ResultCache, normalize_text
+
+
+@pytest.mark.parametrize("a, b", [
+    ("保修期，不少于 3 年。", "保修期不少于3年"),
+    ("响应时间：2小时！", "响应时间2小时"),
+    ("１，０００台", "1,000台"),
+    ("Warranty 3 Years", "warranty3years"),
+])
+def test_normalize_ignores_punctuation_and_width(a, b):
+    assert normalize_text(a) == normalize_text(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("保修期不少于1.5年", "保修期不少于15年"),
+    ("响应时间2.4小时", "响应时间24小时"),
+    ("数量1,5台", "数量15台"),
+    ("分辨率0.5 mm", "分辨率05mm"),
+])
+def test_normalize_keeps_numeric_separators(a, b):
+    assert normalize_text(a) != normalize_text(b)
+
+
+def test_numeric_near_duplicate_is_a_miss():
+    cache = ResultCache(similarity_threshold=0.0)
+    cache.put("c1", ("s",), "保修期不少于1.5年", "一年半")
+    assert cache.get("c1", ("s",), "保修期不少于15年") is None
+    assert cache.get("c1", ("s",), "保修期，不少于 1.5 年") == "一年半"
+
+
+def test_tenants_and_scopes_are_isolated():
+    cache = ResultCache()
+    cache.put("c1", ("s", 0), "文本", "v")
+    assert cache.get("c2", ("s", 0), "文本") is None
+    assert cache.get("c1", ("s", 1), "文本") is None
+    assert cache.get("c1", ("s", 0), "文本") == "v"
+
+
+def test_invalidate_bumps_version_and_clears():
+    cache = ResultCache()
+    cache.put("c1", ("s",), "文本", "v")
+    cache.invalidate("c1")
+    assert cache.kb_version("c1") == 1
+    assert cache.get("c1", ("s",), "文本") is None
+
+
+def test_lru_eviction_per_tenant():
+    cache = ResultCache(max_entries=2)
+    cache.put("c1", ("s",), "a", 1)
+    cache.put("c1", ("s",), "b", 2)
+    cache.get("c1", ("s",), "a")
+    cache.put("c1", ("s",), "c", 3)
+    assert cache.get("c1", ("s",), "b") is None
+    assert cache.get("c1", ("s",), "a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = ResultCache(ttl=-1)
+    cache.put("c1", ("s",), "a", 1)
+    assert cache.get("c1", ("s",), "a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_semantic_hit_only_when_enabled():
+    exact = ResultCache(similarity_threshold=0.0)
+    exact.put("c1", ("s",), "a", 1, vector=[1.0, 0.0])
+    assert exact.get("c1", ("s",), "b", vector=[1.0, 0.01]) is None
+
+    semantic = ResultCache(similarity_threshold=0.9)
+    semantic.put("c1", ("s",), "a", 1, vector=[1.0, 0.0])
+    assert semantic.get("c1", ("s",), "b", vector=[1.0, 0.01]) == 1
+    assert semantic.get("c1", ("s",), "c", vector=[0.0, 1.0]) is None
+    assert semantic.stats("c1")["semantic_hits"] == 1
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from auth import AuthError, TokenAuthenticator, hash_password, is_password_hash, verify_password
+
+
+USERS = {
+    "u1": {"id": "u1", "company_id": "c1", "role": "admin"},
+    "u2": {"id": "u2", "company_id": "c1", "role": "user"},
+}
+
+
+class Resolver:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, user_id):
+        self.calls.append(user_id)
+        user = USERS.get(user_id)
+        return dict(user) if user else None
+
+
+@pytest.fixture
+def resolver():
+    return Resolver()
+
+
+@pytest.fixture
+def authenticator(resolver):
+    return TokenAuthenticator("secret", resolver)
+
+
+def authenticate(authenticator, token):
+    return asyncio.run(authenticator.authenticate(token))
+
+
+def test_password_hash_round_trip():
+    stored = hash_password("123456")
+    assert is_password_hash(stored)
+    assert stored != hash_password("123456")
+    assert verify_password("123456", stored)
+    assert not verify_password("1234567", stored)
+
+
+def test_verify_legacy_plaintext_and_malformed_hash():
+    assert not is_password_hash("123456")
+    assert verify_password("123456", "123456")
+    assert not verify_password("654321", "123456")
+    assert not verify_password("123456", "scrypt$broken")
+    assert not verify_password("123456", "scrypt$16384$8$1$!!!$!!!")
+
+
+def test_issue_and_decode(authenticator):
+    claims = authenticator.decode(authenticator.issue(USERS["u1"]))
+    assert claims["sub"] == "u1"
+    assert claims["cid"] == "c1"
+    assert claims["exp"] > claims["iat"]
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda t: t[:-2] + ("AA" if not t.endswith("AA") else "BB"),
+    lambda t: t.rsplit(".", 1)[0] + ".签名",
+    lambda t: "x" + t,
+    lambda t: t.rsplit(".", 1)[0],
+    lambda t: "",
+])
+def test_decode_rejects_tampered_tokens(authenticator, tamper):
+    with pytest.raises(AuthError):
+        authenticator.decode(tamper(authenticator.issue(USERS["u1"])))
+
+
+def test_decode_rejects_other_secret(authenticator, resolver):
+    token = TokenAuthenticator("other", resolver).issue(USERS["u1"])
+    with pytest.raises(AuthError):
+        authenticator.decode(token)
+
+
+def test_decode_rejects_expired(resolver):
+    authenticator = TokenAuthenticator("secret", resolver, expires_seconds=-1)
+    with pytest.raises(AuthError, match="过期"):
+        authenticator.decode(authenticator.issue(USERS["u1"]))
+
+
+def test_authenticate_caches_resolved_user(authenticator, resolver):
+    token = authenticator.issue(USERS["u1"])
+    assert authenticate(authenticator, token)["id"] == "u1"
+    assert authenticate(authenticator, token)["id"] == "u1"
+    assert resolver.calls == ["u1"]
+    assert authenticator.stats()["hits"] == 1
+    assert authenticator.stats()["misses"] == 1
+
+
+def test_authenticate_unknown_user(authenticator):
+    with pytest.raises(AuthError):
+        authenticate(authenticator, authenticator.issue({"id": "gone", "company_id": "c1"}))
+
+
+def test_cache_evicts_least_recently_used(resolver):
+    authenticator = TokenAuthenticator("secret", resolver, cache_size=1)
+    first, second = authenticator.issue(USERS["u1"]), authenticator.issue(USERS["u2"])
+    authenticate(authenticator, first)
+    authenticate(authenticator, second)
+    assert authenticator.stats()["cached_tokens"] == 1
+    authenticate(authenticator, first)
+    assert resolver.calls == ["u1", "u2", "u1"]
+
+
+def test_revoke_token(authenticator):
+    token, other = authenticator.issue(USERS["u1"]), authenticator.issue(USERS["u1"])
+    authenticate(authenticator, token)
+    authenticator.revoke(token)
+    with pytest.raises(AuthError):
+        authenticate(authenticator, token)
+    assert authenticate(authenticator, other)["id"] == "u1"
+
+
+def test_revoke_user_invalidates_earlier_tokens(authenticator):
+    cached, uncached = authenticator.issue(USERS["u1"]), authenticator.issue(USERS["u1"])
+    authenticate(authenticator, cached)
+    authenticator.revoke_user("u1")
+    for token in (cached, uncached):
+        with pytest.raises(AuthError):
+            authenticate(authenticator, token)
+    assert authenticate(authenticator, authenticator.issue(USERS["u2"]))["id"] == "u2"
+
+
+def test_revoke_user_right_after_issue(authenticator):
+    for _ in range(200):
+        token = authenticator.issue(USERS["u1"])
+        authenticator.revoke_user("u1")
+        with pytest.raises(AuthError):
+            authenticate(authenticator, token)
+
+
+def test_invalidate_user_resolves_again(authenticator, resolver):
+    token = authenticator.issue(USERS["u1"])
+    authenticate(authenticator, token)
+    authenticator.invalidate_user("u1")
+    assert authenticate(authenticator, token)["id"] == "u1"
+    assert resolver.calls == ["u1", "u1"]
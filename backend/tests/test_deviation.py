@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import pytest
+
+from deviation import OP_EQ, OP_GE, OP_LE, OP_RANGE, DeviationEngine, parse_quantity, parse_requirement
+
+
+def spec(model, name, value, spec_id=None):
+    return SimpleNamespace(product_model=model, param_name=name, param_value=value, id=spec_id)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10mm", (10.0, "length")),
+    ("1.5 cm", (15.0, "length")),
+    ("5W", (0.005, "power")),
+    ("2kW", (2.0, "power")),
+    ("100mW", (1e-4, "power")),
+    ("1MW", (1000.0, "power")),
+    ("100mw", (100.0, "unit:mw")),
+    ("3.0T", (3.0, "field")),
+    ("5 mT", (0.005, "field")),
+    ("64排/128层", (64.0, "rows")),
+    ("120kV", (120.0, "voltage")),
+    ("2小时", (7200.0, "time")),
+    ("64", (64.0, "scalar")),
+    ("无", None),
+])
+def test_parse_quantity(text, expected):
+    result = parse_quantity(text)
+    if expected is None:
+        assert result is None
+    else:
+        assert result[0] == pytest.approx(expected[0])
+        assert result[1] == expected[1]
+
+
+@pytest.mark.parametrize("operator, value, expected", [
+    (">=", "64排", (OP_GE, 64.0, 64.0, "rows")),
+    ("", "≥64排", (OP_GE, 64.0, 64.0, "rows")),
+    ("", "不低于5kW", (OP_GE, 5.0, 5.0, "power")),
+    ("<=", "0.5s", (OP_LE, 0.5, 0.5, "time")),
+    ("=", "3.0T", (OP_EQ, 3.0, 3.0, "field")),
+    ("=", "0.5~10mm", (OP_RANGE, 0.5, 10.0, "length")),
+    ("", "0.5 ~ 10 mm", (OP_RANGE, 0.5, 10.0, "length")),
+    (">=", "1.5-3T", (OP_RANGE, 1.5, 3.0, "field")),
+    ("=", "0.5mm至1cm", (OP_RANGE, 0.5, 10.0, "length")),
+    ("=", "10~2", (OP_RANGE, 2.0, 10.0, "scalar")),
+    ("=", "0.5mm~1s", None),
+    ("", "64排", None),
+    ("≈", "64排", None),
+    ("=", "符合要求", None),
+])
+def test_parse_requirement(operator, value, expected):
+    result = parse_requirement(operator, value)
+    if expected is None:
+        assert result is None
+    else:
+        assert result[0] == expected[0]
+        assert result[1] == pytest.approx(expected[1])
+        assert result[2] == pytest.approx(expected[2])
+        assert result[3] == expected[3]
+
+
+@pytest.fixture
+def engine():
+    return DeviationEngine([
+        spec("A", "探测器排数", "64排"),
+        spec("A", "发生器功率", "80kW"),
+        spec("A", "层厚", "0.5mm"),
+        spec("A", "激光功率", "100mW"),
+        spec("B", "探测器排数", "128排"),
+        spec("B", "发生器功率", "50kW"),
+        spec("B", "层厚", "12mm"),
+        spec("B", "激光功率", "1W"),
+    ])
+
+
+@pytest.mark.parametrize("requirement, expected", [
+    (("探测器排数", ">=", "64排"), {"A": "无偏离", "B": "正偏离"}),
+    (("★探测器排数：", ">", "64排"), {"A": "负偏离", "B": "正偏离"}),
+    (("发生器功率", ">=", "60kW"), {"A": "正偏离", "B": "负偏离"}),
+    (("发生器功率", "<=", "80 kW"), {"A": "无偏离", "B": "正偏离"}),
+    (("层厚", "=", "0.5~10mm"), {"A": "无偏离", "B": "负偏离"}),
+    (("激光功率", "<=", "500mW"), {"A": "正偏离", "B": "负偏离"}),
+    (("发生器功率", "", "60kW"), {"A": "需人工确认", "B": "需人工确认"}),
+    (("发生器功率", ">=", "60s"), {"A": "需人工确认", "B": "需人工确认"}),
+    (("孔径", ">=", "70cm"), {"A": "需人工确认", "B": "需人工确认"}),
+])
+def test_compare(engine, requirement, expected):
+    results = engine.compare([requirement])
+    assert {model: r["table"][0]["deviation"] for model, r in results.items()} == expected
+
+
+def test_compare_summary_and_best_model(engine):
+    requirements = [("探测器排数", ">=", "64排"), ("发生器功率", ">=", "60kW"), ("孔径", ">=", "70cm")]
+    results = engine.compare(requirements)
+    assert results["A"]["deviation_summary"] == {
+        "positive": 1, "negative": 0, "no_deviation": 1, "need_review": 1, "total": 3,
+    }
+    assert DeviationEngine.best_model(results) == "A"
+    assert list(engine.compare(requirements, ["B"])) == ["B"]
+
+
+def test_remove_spec_only_removes_its_own_entry():
+    first = spec("A", "功率", "5kW", "1")
+    engine = DeviationEngine([first])
+    engine.remove_spec(spec("A", "功率", "5kW", "2"))
+    assert engine.lookup("A", "功率")[0] == 5.0
+    engine.remove_spec(first)
+    assert engine.lookup("A", "功率") is None
+    assert engine.models == []
+
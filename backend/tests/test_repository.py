@@ -0,0 +1,196 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from repository import InMemoryRepository, PostgresRepository
+
+
+class Log(BaseModel):
+    id: str
+    company_id: str
+    content: str
+    created_at: datetime
+
+
+class Chunk(BaseModel):
+    id: str
+    company_id: str
+    metadata: dict
+    embedding: Optional[list] = None
+
+
+class Task(BaseModel):
+    id: str
+    company_id: str
+    status: str
+    worker_id: Optional[str] = None
+    created_at: datetime
+
+
+class FakeDatabase:
+    # 记录执行的SQL与参数，按顺序返回预设的结果
+    def __init__(self, results=()):
+        self.calls = []
+        self.results = list(results)
+
+    async def _next(self, sql, args):
+        self.calls.append((sql, args))
+        return self.results.pop(0) if self.results else None
+
+    async def fetch(self, sql, *args):
+        return await self._next(sql, args) or []
+
+    async def fetchrow(self, sql, *args):
+        return await self._next(sql, args)
+
+    async def execute(self, sql, *args):
+        return await self._next(sql, args) or "UPDATE 0"
+
+
+T0 = datetime(2024, 1, 1)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def task(n, company_id="c1", status="pending", worker_id=None):
+    return Task(id=f"t{n:02d}", company_id=company_id, status=status, worker_id=worker_id, created_at=T0 + timedelta(minutes=n))
+
+
+@pytest.fixture
+def tasks():
+    repo = InMemoryRepository(Task, indexes=("status",), order_by="created_at")
+    for n in range(10):
+        run(repo.add(task(n, status="done" if n % 3 == 0 else "pending")))
+    run(repo.add(task(50, company_id="c2")))
+    return repo
+
+
+def test_insert_conflicts_on_primary_key():
+    sql = PostgresRepository(Chunk, "knowledge_chunks", None)._insert_sql
+    assert "ON CONFLICT (id) DO UPDATE SET company_id = EXCLUDED.company_id" in sql
+
+
+def test_partitioned_table_conflicts_on_composite_key():
+    repo = PostgresRepository(Log, "operation_logs", None, primary_key=("company_id", "created_at", "id"))
+    sql = repo._build_insert(2)
+    assert sql.endswith("ON CONFLICT (company_id, created_at, id) DO UPDATE SET content = EXCLUDED.content")
+    assert "VALUES ($1, $2, $3, $4), ($5, $6, $7, $8)" in sql
+
+
+def test_in_memory_list_filters_and_time_range(tasks):
+    assert [t.id for t in run(tasks.list("c1", status="done"))] == ["t00", "t03", "t06", "t09"]
+    window = run(tasks.list("c1", start=T0 + timedelta(minutes=2), end=T0 + timedelta(minutes=4), status="pending"))
+    assert [t.id for t in window] == ["t02", "t04"]
+    assert run(tasks.list("c3")) == []
+    assert len(run(tasks.list_all(status="pending"))) == 7
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_in_memory_page_walks_every_row_once(tasks, descending):
+    seen, after = [], None
+    while True:
+        rows, after = run(tasks.page("c1", 3, after=after, descending=descending, status="pending"))
+        seen.extend(t.id for t in rows)
+        if after is None:
+            break
+    expected = [f"t{n:02d}" for n in range(10) if n % 3]
+    assert seen == (expected[::-1] if descending else expected)
+
+
+def test_cursor_round_trip(tasks):
+    key = tasks.page_key(task(4))
+    assert tasks.decode_cursor(tasks.encode_cursor(key)) == key
+    with pytest.raises(ValueError):
+        tasks.decode_cursor("not-a-cursor")
+
+
+def test_in_memory_update_where_is_compare_and_set(tasks):
+    claimed = run(tasks.update_where("c1", "t01", {"status": "pending", "worker_id": None}, {"status": "running", "worker_id": "w1"}))
+    assert claimed.worker_id == "w1"
+    assert run(tasks.update_where("c1", "t01", {"status": "pending", "worker_id": None}, {"worker_id": "w2"})) is None
+    assert run(tasks.update_where("c2", "t01", {"status": "running"}, {"status": "done"})) is None
+    # 修改返回的对象不影响仓储中的记录，二级索引随条件更新同步
+    claimed.status = "failed"
+    assert run(tasks.get("c1", "t01")).status == "running"
+    assert [t.id for t in run(tasks.list("c1", status="running"))] == ["t01"]
+
+
+def test_in_memory_scan_partitions_and_is_empty(tasks):
+    batches = []
+
+    async def collect():
+        async for batch in tasks.scan("c1", ("status",), batch_size=4):
+            batches.append(batch)
+
+    run(collect())
+    assert [len(b) for b in batches] == [4, 4, 2]
+    assert batches[0][0] == ("done",)
+    assert sorted(run(tasks.partitions())) == ["c1", "c2"]
+    assert not run(tasks.is_empty())
+    empty = InMemoryRepository(Task)
+    assert run(empty.is_empty())
+    run(empty.add(task(1)))
+    run(empty.delete("c1", "t01"))
+    assert run(empty.is_empty())
+    assert run(empty.partitions()) == []
+
+
+def test_postgres_update_where_sql():
+    database = FakeDatabase()
+    repo = PostgresRepository(Task, "bid_tasks", database)
+    assert run(repo.update_where("c1", "t1", {"status": "pending", "worker_id": None}, {"status": "running"})) is None
+    sql, args = database.calls[0]
+    assert sql.startswith("UPDATE bid_tasks SET status = $3 WHERE company_id = $1 AND id = $2 AND status IS NOT DISTINCT FROM $4 AND worker_id IS NOT DISTINCT FROM $5 RETURNING ")
+    assert args == ("c1", "t1", "running", "pending", None)
+    with pytest.raises(ValueError):
+        run(repo.update_where("c1", "t1", {"missing": 1}, {"status": "running"}))
+
+
+def test_postgres_update_where_encodes_json_columns():
+    database = FakeDatabase()
+    repo = PostgresRepository(Chunk, "knowledge_chunks", database)
+    run(repo.update_where("c1", "k1", {}, {"metadata": {"来源": "标书"}}))
+    sql, args = database.calls[0]
+    assert "metadata = $3::text::jsonb" in sql
+    assert args[2] == '{"来源": "标书"}'
+
+
+def test_postgres_page_sql_uses_row_comparison():
+    database = FakeDatabase()
+    repo = PostgresRepository(Task, "bid_tasks", database, order_by="created_at")
+    run(repo.page("c1", 20, after=(T0, "t05"), descending=True, status="pending", worker_id=None))
+    sql, args = database.calls[0]
+    assert "WHERE company_id = $1 AND status = $2 AND (created_at, id) < ($3, $4)" in sql
+    assert sql.endswith("ORDER BY created_at DESC, id DESC LIMIT $5")
+    assert args == ("c1", "pending", T0, "t05", 21)
+    with pytest.raises(ValueError):
+        run(repo.page("c1", 20, missing="x"))
+
+
+def test_postgres_scan_pages_by_id():
+    database = FakeDatabase([[("a", 1), ("b", 2)], [("c", 3)]])
+    repo = PostgresRepository(Task, "bid_tasks", database)
+    batches = []
+
+    async def collect():
+        async for batch in repo.scan("c1", ("status",), batch_size=2):
+            batches.append(batch)
+
+    run(collect())
+    assert batches == [[(1,), (2,)], [(3,)]]
+    assert [call[1] for call in database.calls] == [("c1", "", 2), ("c1", "b", 2)]
+    assert database.calls[0][0] == "SELECT id, status FROM bid_tasks WHERE company_id = $1 AND id > $2 ORDER BY id LIMIT $3"
+
+
+def test_postgres_partitions_and_is_empty():
+    database = FakeDatabase([[("c1",), ("c2",)], None])
+    repo = PostgresRepository(Task, "bid_tasks", database)
+    assert run(repo.partitions()) == ["c1", "c2"]
+    assert "WITH RECURSIVE" in database.calls[0][0]
+    assert run(repo.is_empty())
+    assert database.calls[1][0] == "SELECT 1 FROM bid_tasks LIMIT 1"
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import rfp_parser
+from rfp_parser import detect_format, extract_items, parse_rfp, read_pages, split_pages
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def write_docx(path, paragraphs, table_rows=()):
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    rows = "".join(f"<w:tr><w:tc><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:tc></w:tr>" for text in table_rows)
+    if rows:
+        body += f"<w:tbl>{rows}</w:tbl>"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {W}><w:body>{body}</w:body></w:document>")
+
+
+def test_extract_items():
+    items = extract_items("1. ★探测器排数：≥64排\n未按要求提供授权书的，按无效投标处理。\n须提供医疗器械注册证")
+    assert [(i["section_type"], i["extracted_key"], i["operator"]) for i in items] == [
+        ("technical_param", "探测器排数", ">="),
+        ("disqualification", "无效投标", ""),
+        ("qualification", "注册证", ""),
+    ]
+
+
+def test_docx_is_split_once_into_text_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(rfp_parser, "DOCX_PARAGRAPHS_PER_PAGE", 2)
+    path = str(tmp_path / "rfp.docx")
+    write_docx(path, ["第一段", "第二段", "第三段"], ["孔径≥70cm"])
+    source, refs = split_pages(path)
+    try:
+        assert source != path
+        assert read_pages(source, refs) == ["第一段\n第二段\n", "第三段\n孔径≥70cm\n"]
+    finally:
+        os.remove(source)
+
+
+def test_legacy_doc_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        detect_format(str(tmp_path / "rfp.doc"))
+    blob = tmp_path / "blob"
+    blob.write_bytes(rfp_parser.OLE_MAGIC + b"\0" * 64)
+    with pytest.raises(ValueError):
+        detect_format(str(blob))
+
+
+def test_batches_are_yielded_in_page_order(tmp_path, monkeypatch):
+    path = tmp_path / "rfp.txt"
+    path.write_text("\f".join(f"参数{n}≥{n}mm" for n in range(20)), encoding="utf-8")
+    parse_pages = rfp_parser.parse_pages
+
+    def slow_first(source, refs):
+        # 第一批最慢，后面的批次先完成
+        if refs[0][0] == 0:
+            time.sleep(0.1)
+        return parse_pages(source, refs)
+
+    monkeypatch.setattr(rfp_parser, "parse_pages", slow_first)
+
+    async def collect():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return [item["extracted_key"] async for batch in parse_rfp(str(path), executor, pages_per_task=3, max_in_flight=4) for item in batch]
+
+    assert asyncio.run(collect()) == [f"参数{n}" for n in range(20)]
+
+
+def test_docx_temp_text_is_removed_after_parsing(tmp_path, monkeypatch):
+    path = str(tmp_path / "rfp.docx")
+    write_docx(path, ["功率≥5kW"])
+    created = []
+    to_text = rfp_parser.docx_to_text
+    monkeypatch.setattr(rfp_parser, "docx_to_text", lambda p: created.append(to_text(p)) or created[-1])
+
+    async def collect():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return [batch async for batch in parse_rfp(path, executor)]
+
+    batches = asyncio.run(collect())
+    assert batches[0][0]["extracted_value"] == "5kW"
+    assert not os.path.exists(created[0])
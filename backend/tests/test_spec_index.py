@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+from spec_index import ProductSpecIndex
+
+
+def spec(spec_id, model, name, value, core=False):
+    return SimpleNamespace(id=spec_id, company_id="c1", product_model=model, param_name=name, param_value=value, is_core_param=core)
+
+
+@pytest.fixture
+def index():
+    index = ProductSpecIndex()
+    index.load("c1", [spec("1", "M1", "探测器排数", "64排"), spec("2", "M1", "功率", "80kW", True)], "v0")
+    return index
+
+
+def test_apply_in_sequence_updates_incrementally(index):
+    assert index.apply("c1", "v0", "v1", upsert=spec("3", "M2", "孔径", "70cm"))
+    assert index.current("c1", "v1")
+    assert index.query("c1", product_model="M2")[0] == 1
+
+    assert index.apply("c1", "v1", "v2", upsert=spec("3", "M3", "孔径", "80cm"))
+    assert index.query("c1", product_model="M2")[0] == 0
+    assert index.engine("c1").lookup("M3", "孔径")[2] == "80cm"
+
+    assert index.apply("c1", "v2", "v3", remove=spec("1", "M1", "探测器排数", "64排"))
+    assert index.query("c1")[0] == 2
+
+
+def test_apply_after_version_skip_drops_index(index):
+    assert not index.apply("c1", "v5", "v6", upsert=spec("3", "M2", "孔径", "70cm"))
+    assert not index.current("c1", "v6")
+    assert not index.apply("c1", "v6", "v7", upsert=spec("4", "M2", "孔径", "70cm"))
+
+
+def test_current_expires_after_max_age():
+    index = ProductSpecIndex(max_age=0)
+    index.load("c1", [], "v0")
+    assert not index.current("c1", "v0")
+
+
+def test_query_filters_and_synonyms(index):
+    assert index.query("c1", is_core_param=True)[0] == 1
+    assert index.query("c1", q="排数")[0] == 1
+    assert [s.id for s in index.query("c1", offset=1, limit=1)[1]] == ["2"]
+    with pytest.raises(ValueError):
+        index.query("c1", q="*")
@@ -0,0 +1,293 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# 知识库向量索引：每个租户一块连续的float32矩阵（行向量已L2归一化，内积即余弦相似度）
+# 支持精确暴力检索（exact）与倒排聚类近似检索（IVF，ann），增量插入/删除，落盘持久化
+
+
+class VectorIndex:
+    def __init__(self, dim: int, nlist: int = 0, ivf_min_size: int = 20000, capacity: int = 1024):
+        self.dim = dim
+        # nlist为0时按 sqrt(n) 自动选择聚类中心数
+        self.nlist = nlist
+        self.ivf_min_size = ivf_min_size
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._rows: Dict[str, int] = {}
+        self._size = 0  # 已使用的行数（含已删除的墓碑行）
+        # IVF结构
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.full(capacity, -1, dtype=np.int32)
+        self._lists: List[List[int]] = []
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        assign = np.full(capacity, -1, dtype=np.int32)
+        assign[: self._size] = self._assign[: self._size]
+        self._vectors, self._alive, self._assign = vectors, alive, assign
+        self._ids.extend([None] * (capacity - len(self._ids)))
+
+    def add(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"向量维度应为{self.dim}，实际为{matrix.shape[1]}")
+        matrix = self._normalize(matrix)
+        with self._lock:
+            for record_id in ids:
+                if record_id in self._rows:
+                    self._remove_row(self._rows.pop(record_id))
+            start = self._size
+            self._grow(start + len(ids))
+            end = start + len(ids)
+            self._vectors[start:end] = matrix
+            self._alive[start:end] = True
+            for offset, record_id in enumerate(ids):
+                self._ids[start + offset] = record_id
+                self._rows[record_id] = start + offset
+            self._size = end
+            if self.trained:
+                self._assign_rows(np.arange(start, end))
+            self._maybe_train()
+
+    def remove(self, record_id: str) -> bool:
+        with self._lock:
+            row = self._rows.pop(record_id, None)
+            if row is None:
+                return False
+            self._remove_row(row)
+            # 墓碑行超过一半时压缩矩阵
+            if self._size > 1024 and len(self._rows) < self._size // 2:
+                self._compact()
+            return True
+
+    def _remove_row(self, row: int) -> None:
+        self._alive[row] = False
+        self._ids[row] = None
+        cluster = self._assign[row]
+        if cluster >= 0:
+            self._lists[cluster].remove(row)
+            self._assign[row] = -1
+
+    def _compact(self) -> None:
+        rows = np.flatnonzero(self._alive[: self._size])
+        ids = [self._ids[r] for r in rows]
+        vectors = self._vectors[rows].copy()
+        capacity = max(1024, len(rows) * 2)
+        self._vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        self._vectors[: len(rows)] = vectors
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[: len(rows)] = True
+        self._ids = ids + [None] * (capacity - len(ids))
+        self._rows = {record_id: i for i, record_id in enumerate(ids)}
+        self._size = len(rows)
+        self._assign = np.full(capacity, -1, dtype=np.int32)
+        if self.trained:
+            self._lists = [[] for _ in range(len(self._centroids))]
+            self._assign_rows(np.arange(self._size))
+
+    def _maybe_train(self) -> None:
+        count = len(self._rows)
+        if count < self.ivf_min_size:
+            return
+        # 数据量翻倍后重新聚类，保证各倒排表长度均衡
+        if not self.trained or count >= 2 * self._trained_size:
+            self.train()
+
+    def train(self, iterations: int = 10, sample_size: int = 50000, seed: int = 0) -> None:
+        with self._lock:
+            rows = np.flatnonzero(self._alive[: self._size])
+            if len(rows) == 0:
+                return
+            nlist = self.nlist or max(1, int(np.sqrt(len(rows))))
+            nlist = min(nlist, len(rows))
+            rng = np.random.default_rng(seed)
+            sample = rows if len(rows) <= sample_size else rng.choice(rows, sample_size, replace=False)
+            data = self._vectors[sample]
+            centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+            # 球面k-means：以内积作为相似度
+            for _ in range(iterations):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = data[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+            self._centroids = centroids.astype(np.float32)
+            self._lists = [[] for _ in range(nlist)]
+            self._assign[:] = -1
+            self._assign_rows(rows)
+            self._trained_size = len(rows)
+
+    def _assign_rows(self, rows: np.ndarray, batch: int = 8192) -> None:
+        for begin in range(0, len(rows), batch):
+            chunk = rows[begin: begin + batch]
+            labels = np.argmax(self._vectors[chunk] @ self._centroids.T, axis=1)
+            self._assign[chunk] = labels
+            for row, label in zip(chunk.tolist(), labels.tolist()):
+                self._lists[label].append(row)
+
+    def search(self, query: Sequence[float], k: int = 5, mode: str = "auto", nprobe: int = 8) -> List[Tuple[str, float]]:
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        if q.shape[0] != self.dim:
+            raise ValueError(f"向量维度应为{self.dim}，实际为{q.shape[0]}")
+        q = self._normalize(q)
+        with self._lock:
+            if mode == "auto":
+                mode = "ann" if self.trained else "exact"
+            if mode == "ann" and self.trained:
+                probes = np.argsort(-(self._centroids @ q))[:nprobe]
+                candidate_lists = [self._lists[c] for c in probes.tolist() if self._lists[c]]
+                if not candidate_lists:
+                    return []
+                rows = np.concatenate([np.asarray(lst, dtype=np.int64) for lst in candidate_lists])
+                scores = self._vectors[rows] @ q
+            else:
+                rows = np.arange(self._size)
+                scores = self._vectors[: self._size] @ q
+                scores = np.where(self._alive[: self._size], scores, -np.inf)
+            if len(rows) == 0:
+                return []
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (self._ids[rows[i]], float(scores[i]))
+                for i in top.tolist()
+                if np.isfinite(scores[i])
+            ]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            rows = np.flatnonzero(self._alive[: self._size])
+            arrays = {
+                "vectors": self._vectors[rows],
+                "ids": np.asarray([self._ids[r] for r in rows], dtype=str),
+                "params": np.asarray([self.dim, self.nlist, self.ivf_min_size, self._trained_size], dtype=np.int64),
+            }
+            if self.trained:
+                arrays["centroids"] = self._centroids
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        with np.load(path) as data:
+            dim, nlist, ivf_min_size, trained_size = data["params"].tolist()
+            vectors = data["vectors"]
+            index = cls(dim, nlist=nlist, ivf_min_size=ivf_min_size, capacity=max(1024, len(vectors) * 2))
+            count = len(vectors)
+            index._vectors[:count] = vectors
+            index._alive[:count] = True
+            ids = data["ids"].tolist()
+            index._ids[:count] = ids
+            index._rows = {record_id: i for i, record_id in enumerate(ids)}
+            index._size = count
+            if "centroids" in data:
+                index._centroids = data["centroids"].astype(np.float32)
+                index._lists = [[] for _ in range(len(index._centroids))]
+                index._assign_rows(np.arange(count))
+                index._trained_size = trained_size
+        return index
+
+
+class VectorIndexManager:
+    # 按租户管理向量索引
+
+    def __init__(self, directory: Optional[str] = None, **index_options):
+        self.directory = directory
+        self.index_options = index_options
+        self._indexes: Dict[str, VectorIndex] = {}
+        # 调用方在线程池中并发写入，同一租户的索引只能创建一次
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: str) -> Optional[VectorIndex]:
+        return self._indexes.get(tenant_id)
+
+    def add(self, tenant_id: str, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not ids:
+            return
+        index = self._indexes.get(tenant_id)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(tenant_id)
+                if index is None:
+                    index = self._indexes[tenant_id] = VectorIndex(len(vectors[0]), **self.index_options)
+        index.add(ids, vectors)
+
+    def remove(self, tenant_id: str, record_id: str) -> bool:
+        index = self._indexes.get(tenant_id)
+        return index.remove(record_id) if index else False
+
+    def search(self, tenant_id: str, query: Sequence[float], k: int = 5, mode: str = "auto", nprobe: int = 8) -> List[Tuple[str, float]]:
+        index = self._indexes.get(tenant_id)
+        if index is None or len(index) == 0:
+            return []
+        return index.search(query, k=k, mode=mode, nprobe=nprobe)
+
+    def tenants(self) -> List[str]:
+        return list(self._indexes)
+
+    def reconcile(
+        self,
+        tenant_id: str,
+        ids: Sequence[str],
+        load_vectors: Callable[[List[str]], Sequence[Sequence[float]]],
+    ) -> Dict[str, int]:
+        # 索引只在停机时落盘：以仓储中的切片ID为准，补上缺失的向量（进程异常退出前新增的），删除已不存在的
+        index = self._indexes.get(tenant_id)
+        present = set(index.ids()) if index is not None else set()
+        wanted = set(ids)
+        stale = present - wanted
+        for record_id in stale:
+            index.remove(record_id)
+        missing = [record_id for record_id in ids if record_id not in present]
+        if missing:
+            self.add(tenant_id, missing, load_vectors(missing))
+        return {"added": len(missing), "removed": len(stale)}
+
+    def save(self) -> None:
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for tenant_id, index in self._indexes.items():
+            index.save(os.path.join(self.directory, f"{tenant_id}.npz"))
+
+    def load(self) -> None:
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+                self._indexes[name[: -len(".npz")]] = VectorIndex.load(os.path.join(self.directory, name))
@@ -209,7 +209,7 @@ main() {
     # 激活虚拟环境并安装依赖
     source venv/bin/activate
     pip install --upgrade pip -i https://pypi.tuna.tsinghua.edu.cn/simple > /dev/null 2>&1
-    pip install fastapi uvicorn pydantic psycopg2-binary python-multipart python-dotenv pgvector -i https://pypi.tuna.tsinghua.edu.cn/simple > /dev/null 2>&1
+    pip install fastapi uvicorn pydantic psycopg2-binary asyncpg numpy pypdf python-docx python-multipart python-dotenv httpx pgvector -i https://pypi.tuna.tsinghua.edu.cn/simple > /dev/null 2>&1
     check_result $? "后端依赖安装完成"
     
     # 更新数据库连接配置
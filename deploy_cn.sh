@@ -259,7 +259,7 @@ main() {
     source venv/bin/activate
     pip install --upgrade pip -i https://pypi.tuna.tsinghua.edu.cn/simple > /dev/null 2>&1
     # 使用国内源安装依赖，包含pgvector
-    pip install fastapi uvicorn pydantic psycopg2-binary python-multipart python-dotenv pgvector -i https://pypi.tuna.tsinghua.edu.cn/simple > /dev/null 2>&1
+    pip install fastapi uvicorn pydantic psycopg2-binary asyncpg numpy pypdf python-docx python-multipart python-dotenv httpx pgvector -i https://pypi.tuna.tsinghua.edu.cn/simple > /dev/null 2>&1
     check_result $? "后端依赖安装完成"
     
     # 更新数据库连接配置